@@ -1,6 +1,6 @@
-from concurrent.futures import Future, ThreadPoolExecutor, wait
 import logging
 from utils.console_utils import make_command, run_bash_command
+from utils.executor_utils import DynamicExecutor, file_size
 from typing import List, Optional
 
 from pathlib import Path
@@ -24,25 +24,13 @@ class Aligner:
         
         if not align_dest.exists(): align_dest.mkdir(exist_ok=True, parents=True)
         
-        sentences_aligned = [x for x in sentence_alignment_dir.iterdir()]
+        sentences_aligned = [x for x in sentence_alignment_dir.iterdir() if x.is_file() and x.name.endswith(".align")]
 
-        batch = len(sentences_aligned)//self.max_worker + 1
+        def file_work(file: Path):
+            dest_file = align_dest / (file.name + ".bidirectional")
+            self.do_bidirectional_align_file(file, dest_file, **kwargs)
         
-        def batch_work(slice: int) -> str:
-            for file in sentences_aligned[batch*slice:batch*(slice+1)]:
-                if file.is_file() and file.name.endswith(".align"):
-                    dest_file = align_dest / (file.name + ".bidirectional")
-                    self.do_bidirectional_align_file(file, dest_file, **kwargs)
-        
-        futures: List[Future] = []
-        with ThreadPoolExecutor(max_workers=self.max_worker) as exe:
-            for i in range(self.max_worker):
-                futures.append(exe.submit(batch_work, i))
-        wait(futures)
-        exceptions = [future.exception() for future in futures if future.exception()]
-        
-        if exceptions:
-            raise Exception(exceptions)
+        DynamicExecutor(max_workers=self.max_worker).map(file_work, sentences_aligned, size=file_size)
 
     def do_bidirectional_align_file(self, sentence_align_dir: Path, alignment_dest: Path, **kwargs):
         """
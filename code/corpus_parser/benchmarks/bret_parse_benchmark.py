@@ -0,0 +1,40 @@
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    path = str(Path(__file__, "..", "..", "..").resolve())
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import argparse
+import time
+from pathlib import Path
+from corpus_parser.bret_parser import BretParser
+
+def benchmark_bret_parse(corpus_path: Path, repetitions: int = 200) -> float:
+    """
+    Measures the throughput of `BretParser.parse` over the .ann files in `corpus_path`
+    
+    corpus_path: Directory with the .ann and .txt files
+    repetitions: Amount of times each file is parsed
+    
+    returns: Parsed essays per second
+    """
+    parser = BretParser()
+    files = [(file, file.read_text()) for file in sorted(corpus_path.iterdir()) if parser._should_read_file(file)]
+    
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for file, content in files:
+            parser.parse(content, file)
+    elapsed = time.perf_counter() - start
+    
+    return len(files) * repetitions / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus_path", type=Path, default=Path(__file__, "..", "..", "test", "test_data", "test_bret").resolve())
+    parser.add_argument("--repetitions", type=int, default=200)
+    args = parser.parse_args()
+    
+    throughput = benchmark_bret_parse(args.corpus_path, args.repetitions)
+    print(f"BretParser.parse: {throughput:.1f} essays/s")
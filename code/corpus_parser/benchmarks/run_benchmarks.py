@@ -0,0 +1,192 @@
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    path = str(Path(__file__, "..", "..", "..").resolve())
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import argparse
+import gc
+import json
+import platform
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from corpus_parser.bret_parser import BretParser
+from corpus_parser.conll_parser import ConllParser
+from corpus_parser.parser import Parser
+from corpus_parser.benchmarks.synthetic_corpus import generate_bret_corpus, generate_conll_corpus
+from utils.tokenizer_utils import TokenizerService, set_default_tokenizer
+
+BASELINES_PATH = Path(__file__, "..", "baselines").resolve()
+
+# Scale of the synthetic corpora: (documents, propositions, relation_density)
+SCALES = {
+    "small": (50, 8, 0.5),
+    "medium": (500, 12, 0.5),
+    "large": (5000, 15, 0.5),
+}
+
+BenchmarkResult = Dict[str, float]
+
+def regex_word_tokenize(text: str, language: str = "english") -> List[str]:
+    return re.findall(r"\w+|[^\w\s]+", text)
+
+def regex_sent_tokenize(text: str, language: str = "english") -> List[str]:
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", text) if sentence]
+
+def measure(function: Callable[[], Any], documents: int, repetitions: int = 3) -> BenchmarkResult:
+    """
+    Runs `function` `repetitions` times and measures the best run time. The
+    peak memory is measured with tracemalloc in an extra run, so its overhead
+    doesn't affect the times.
+
+    function: Function to measure
+    documents: Documents processed on each call
+
+    returns: {"seconds", "documents_per_second", "peak_memory_mb"}
+    """
+    best = float("inf")
+    for _ in range(repetitions):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": best,
+        "documents_per_second": documents / best if best else float("inf"),
+        "peak_memory_mb": peak / 1024**2,
+    }
+
+def run_benchmarks(documents: int, propositions: int, relation_density: float, repetitions: int = 3,
+                   seed: int = 0, selected: Optional[List[str]] = None) -> Dict[str, BenchmarkResult]:
+    """
+    Generates the synthetic corpora and measures `parse_dir`, `parse`,
+    `from_dataframes` and `export_corpus_from_files` for the BRAT and CONLL parsers.
+
+    documents: Documents of each synthetic corpus
+    propositions: Argumentative units per document
+    relation_density: Probability of an argumentative unit having a relation
+    repetitions: Runs of each benchmark, the best time is kept
+    seed: Random seed of the generator
+    selected: Names of the benchmarks to run, all if None
+
+    returns: Maps benchmark name to its result
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_dir = Path(temp_dir)
+        corpora: Dict[str, Tuple[Parser, Path]] = {
+            "bret": (BretParser(), temp_dir / "bret"),
+            "conll": (ConllParser(), temp_dir / "conll"),
+        }
+        generate_bret_corpus(corpora["bret"][1], documents, propositions, relation_density, seed)
+        generate_conll_corpus(corpora["conll"][1], documents, propositions, relation_density, seed)
+
+        for name, (parser, corpus_path) in corpora.items():
+            # The other format is used as export target
+            target = corpora["conll" if name == "bret" else "bret"][0]
+            suffix = ".conll" if name == "bret" else ".ann"
+            files = [(file, file.read_text()) for file in sorted(corpus_path.iterdir()) if parser._should_read_file(file)]
+            parsed = parser.parse_dir(corpus_path)
+            representation = target.from_dataframes(parsed)
+
+            benchmarks = {
+                f"{name}.parse_dir": lambda: parser.parse_dir(corpus_path),
+                f"{name}.parse_dir_processes": lambda: parser.parse_dir(corpus_path, backend="process"),
+                f"{name}.parse": lambda: [parser.parse(content, file) for file, content in files],
+                f"{name}.from_dataframes": lambda: target.from_dataframes(parsed),
+                f"{name}.export_corpus_from_files": lambda: Parser.export_corpus_from_files(temp_dir / "export" / name, representation, suffix=suffix),
+            }
+            for benchmark, function in benchmarks.items():
+                if selected is None or benchmark in selected:
+                    results[benchmark] = measure(function, len(files), repetitions)
+    return results
+
+def compare_with_baseline(results: Dict[str, BenchmarkResult], baseline: Dict[str, BenchmarkResult], tolerance: float) -> List[str]:
+    """
+    Compares `results` against a `baseline`
+
+    tolerance: Allowed relative throughput decrease or memory increase
+
+    returns: Description of the regressions found
+    """
+    regressions = []
+    for benchmark, result in results.items():
+        if benchmark not in baseline:
+            continue
+        expected = baseline[benchmark]
+        if result["documents_per_second"] < expected["documents_per_second"] * (1 - tolerance):
+            regressions.append(f"{benchmark}: {result['documents_per_second']:.1f} docs/s, baseline {expected['documents_per_second']:.1f} docs/s")
+        if result["peak_memory_mb"] > expected["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(f"{benchmark}: {result['peak_memory_mb']:.2f} MB peak, baseline {expected['peak_memory_mb']:.2f} MB")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and peak memory benchmarks of the corpus parsers over synthetic corpora")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--documents", type=int, help="Overrides the documents of the scale")
+    parser.add_argument("--propositions", type=int, help="Overrides the propositions per document of the scale")
+    parser.add_argument("--relation_density", type=float, help="Overrides the relation density of the scale")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--benchmarks", nargs="*", help="Benchmarks to run, all by default")
+    parser.add_argument("--nltk", action="store_true", help="Use the nltk tokenizers instead of the regex ones")
+    parser.add_argument("--baseline", type=Path, help="Baseline file. Defaults to baselines/<scale>.json")
+    parser.add_argument("--save_baseline", action="store_true", help="Saves the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    if not args.nltk:
+        # Keeps the numbers about the parsers, nltk tokenization would dominate from_dataframes
+        set_default_tokenizer(TokenizerService(word_tokenizer=regex_word_tokenize, sent_tokenizer=regex_sent_tokenize))
+
+    documents, propositions, relation_density = SCALES[args.scale]
+    config = {
+        "documents": args.documents or documents,
+        "propositions": args.propositions or propositions,
+        "relation_density": args.relation_density if args.relation_density is not None else relation_density,
+        "repetitions": args.repetitions,
+        "seed": args.seed,
+        "tokenizer": "nltk" if args.nltk else "regex",
+    }
+    results = run_benchmarks(config["documents"], config["propositions"], config["relation_density"],
+                             args.repetitions, args.seed, args.benchmarks)
+
+    for benchmark, result in results.items():
+        print(f"{benchmark:45} {result['documents_per_second']:10.1f} docs/s {result['peak_memory_mb']:10.2f} MB peak")
+
+    baseline_path = args.baseline if args.baseline else BASELINES_PATH / f"{args.scale}.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps({
+            "config": config,
+            "machine": platform.platform(),
+            "python": platform.python_version(),
+            "results": results,
+        }, indent=2))
+        print(f"Baseline saved to {baseline_path}")
+    elif baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+        if baseline["config"] != config:
+            print(f"Baseline {baseline_path} was measured with a different configuration, skipping comparison")
+        else:
+            regressions = compare_with_baseline(results, baseline["results"], args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            if regressions:
+                sys.exit(1)
+            print("No regressions against the baseline")
@@ -0,0 +1,110 @@
+import random as rand
+from pathlib import Path
+from typing import List, Tuple
+
+WORDS = (
+    "the students should learn to cooperate because competition makes society more effective "
+    "however teachers believe that team work improves interpersonal skills and technology "
+    "changes the way people communicate with each other in their daily life"
+).split()
+
+PROP_TYPES = ("MajorClaim", "Claim", "Premise")
+RELATION_TYPES = ("supports", "attacks")
+
+def _sentence(rand_gen: rand.Random, min_words: int = 4, max_words: int = 20) -> List[str]:
+    """
+    Returns the words of a random sentence
+    """
+    return [rand_gen.choice(WORDS) for _ in range(rand_gen.randint(min_words, max_words))]
+
+def _document(rand_gen: rand.Random, propositions: int, relation_density: float) -> Tuple[List[Tuple[List[str], str]], List[Tuple[int, int, str]]]:
+    """
+    Returns the units of a random document and its relations.
+
+    returns: ([(unit words, prop_type or None)], [(source index, target index, relation_type)]).
+    The relation indexes are positions in the argumentative units, starting at 0
+    """
+    units = []
+    for _ in range(propositions):
+        if rand_gen.random() < 0.5:
+            units.append((_sentence(rand_gen, 2, 8), None))
+        units.append((_sentence(rand_gen), rand_gen.choice(PROP_TYPES)))
+    units.append((_sentence(rand_gen, 2, 8), None))
+
+    relations = []
+    for source in range(propositions):
+        if propositions > 1 and rand_gen.random() < relation_density:
+            target = rand_gen.choice([x for x in range(propositions) if x != source])
+            relations.append((source, target, rand_gen.choice(RELATION_TYPES)))
+    return units, relations
+
+def generate_bret_corpus(dest: Path, documents: int = 100, propositions: int = 10, relation_density: float = 0.5, seed: int = 0) -> List[Path]:
+    """
+    Creates a synthetic corpus in BRAT format in `dest`, a .ann and a .txt file per document.
+
+    dest: Destination directory. May not exist
+    documents: Amount of documents
+    propositions: Argumentative units per document
+    relation_density: Probability of an argumentative unit having a relation
+    seed: Random seed
+
+    returns: The created .ann files
+    """
+    rand_gen = rand.Random(seed)
+    dest.mkdir(parents=True, exist_ok=True)
+    files = []
+    for doc in range(documents):
+        units, relations = _document(rand_gen, propositions, relation_density)
+        text = ""
+        annotations = []
+        for words, prop_type in units:
+            unit_text = " ".join(words)
+            if prop_type:
+                annotations.append(f"T{len(annotations) + 1}\t{prop_type} {len(text)} {len(text) + len(unit_text)}\t{unit_text}")
+            text += unit_text + (".\n" if rand_gen.random() < 0.2 else ". ")
+        for i, (source, target, relation_type) in enumerate(relations, 1):
+            annotations.append(f"R{i}\t{relation_type} Arg1:T{source + 1} Arg2:T{target + 1}")
+
+        name = f"essay{doc:06}"
+        (dest / (name + ".txt")).write_text(text)
+        ann_file = dest / (name + ".ann")
+        ann_file.write_text("\n".join(annotations) + "\n")
+        files.append(ann_file)
+    return files
+
+def generate_conll_corpus(dest: Path, documents: int = 100, propositions: int = 10, relation_density: float = 0.5, seed: int = 0) -> List[Path]:
+    """
+    Creates a synthetic corpus in CONLL format in `dest`, a .conll file per document.
+
+    dest: Destination directory. May not exist
+    documents: Amount of documents
+    propositions: Argumentative units per document
+    relation_density: Probability of an argumentative unit having a relation
+    seed: Random seed
+
+    returns: The created .conll files
+    """
+    rand_gen = rand.Random(seed)
+    dest.mkdir(parents=True, exist_ok=True)
+    files = []
+    for doc in range(documents):
+        units, relations = _document(rand_gen, propositions, relation_density)
+        relation_of = {source: (target - source, relation_type) for source, target, relation_type in relations}
+        lines = []
+        prop_index = 0
+        for words, prop_type in units:
+            if prop_type is None:
+                lines.extend(f"{word}\tO" for word in words)
+            else:
+                distance, relation_type = relation_of.get(prop_index, (None, None))
+                tag = f"{prop_type}-{relation_type}-{distance}" if relation_type else prop_type
+                lines.append(f"{words[0]}\tB-{tag}")
+                lines.extend(f"{word}\tI-{tag}" for word in words[1:])
+                prop_index += 1
+            if rand_gen.random() < 0.3:
+                lines.append("") # Sentence separator
+
+        conll_file = dest / f"essay{doc:06}.conll"
+        conll_file.write_text("\n".join(lines) + "\n")
+        files.append(conll_file)
+    return files
@@ -1,8 +1,9 @@
 from cmath import nan
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 import re
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 from .parser import AnnotatedRawTextInfo, ArgumentationInfo, Parser
+import numpy as np
 import pandas as pd
 import logging as log
 
@@ -17,16 +18,30 @@ class BretParser(Parser):
     
     def __init__(self) -> None:
         super().__init__((".ann",))
+        self.dependency_files = (".txt",)
         self.argumentative_unit_regex = re.compile(self.ARGUMENTATIVE_UNIT)
         self.relation_regex = re.compile(self.RELATION)
 
-    def parse(self, content:str, file: Path, **kwargs) -> ArgumentationInfo:
+    def _original_text_file(self, file: PurePosixPath) -> PurePosixPath:
+        """
+        Returns the .txt file with the original text of the annotations in `file`
+        """
+        return file.with_name((".".join(file.name.split('.')[:-1]) if "." in file.name else file.name) + ".txt")
+
+    def _file_dependencies(self, file: PurePosixPath) -> List[PurePosixPath]:
+        return [self._original_text_file(file)]
+
+    def _parse_with_dependencies(self, content: str, file: Path, dependencies: List[str], **kwargs) -> ArgumentationInfo:
+        return self.parse(content, file, original_text=dependencies[0], **kwargs)
+
+    def parse(self, content:str, file: Path, original_text: Optional[str] = None, **kwargs) -> ArgumentationInfo:
         """
         Parse `content` returning DataFrames containing
         the argumentative unit and the relation information.
         
         content: text containing the content to parse
         file: Content's original file
+        original_text: Content of the original .txt file. Read from disk if it isn't given
         
         argumentative_units columns: 
           - `prop_id` Proposition ID inside the document
@@ -49,69 +64,88 @@ class BretParser(Parser):
         return: (argumentative_units, relations, non_argumentative_units)
         """
         content_lines = content.splitlines()
-        original_text_file = (file / ".." / ((".".join(file.name.split('.')[:-1]) if "." in file.name else file.name) + ".txt")).resolve()
-        original_text = original_text_file.read_text()
+        if original_text is None:
+            original_text = self._original_text_file(file).read_text()
 
-        argumentative_units = pd.DataFrame(columns=["prop_id", "prop_type", "prop_init", "prop_end", "prop_text"])
-        non_argumentative_units = pd.DataFrame(columns=["prop_init", "prop_end", "prop_text"])
-        relations = pd.DataFrame(columns=["relation_id", "relation_type", "prop_id_source", "prop_id_target"])
+        # Columns are accumulated in lists and every DataFrame is built once
+        units = {"prop_id": [], "prop_type": [], "prop_init": [], "prop_end": [], "prop_text": []}
+        relation_columns = {"relation_id": [], "relation_type": [], "prop_id_source": [], "prop_id_target": []}
         
         for i,line in enumerate(content_lines):
             argument_match = self.argumentative_unit_regex.match(line)
             if argument_match:
-                argument_dict = argument_match.groupdict()
-                
-                argument_dict["prop_id"] = int(argument_dict["prop_id"])
-                argument_dict["prop_init"] = int(argument_dict["prop_init"])
-                argument_dict["prop_end"] = int(argument_dict["prop_end"])
-                
-                argumentative_units = pd.concat([argumentative_units, pd.DataFrame(argument_dict, index=[0])], ignore_index=True)
+                prop_id, prop_type, prop_init, prop_end, prop_text = argument_match.group("prop_id", "prop_type", "prop_init", "prop_end", "prop_text")
+                units["prop_id"].append(int(prop_id))
+                units["prop_type"].append(prop_type)
+                units["prop_init"].append(int(prop_init))
+                units["prop_end"].append(int(prop_end))
+                units["prop_text"].append(prop_text)
                 continue
             relation_match = self.relation_regex.match(line)
             if relation_match:
-                argument_dict = relation_match.groupdict()
-                
-                argument_dict["relation_id"] = int(argument_dict["relation_id"])
-                argument_dict["prop_id_source"] = int(argument_dict["prop_id_source"])
-                argument_dict["prop_id_target"] = int(argument_dict["prop_id_target"])
-                
-                relations = pd.concat([relations, pd.DataFrame(argument_dict, index=[0])], ignore_index=True)
+                relation_id, relation_type, prop_id_source, prop_id_target = relation_match.group("relation_id", "relation_type", "prop_id_source", "prop_id_target")
+                relation_columns["relation_id"].append(int(relation_id))
+                relation_columns["relation_type"].append(relation_type)
+                relation_columns["prop_id_source"].append(int(prop_id_source))
+                relation_columns["prop_id_target"].append(int(prop_id_target))
                 continue
             log.warning(f"Line {i} file {file.name}. Match not found: {line}")
         
-        argumentative_units.sort_values(by="prop_init", inplace=True)
-        
-        order_ids = {old_id: new_id for new_id, old_id in enumerate(argumentative_units['prop_id'], start=1)}
-        argumentative_units['prop_id'] = argumentative_units['prop_id'].map(lambda x: order_ids[x])
-        relations['prop_id_source'] = relations['prop_id_source'].map(lambda x: order_ids[x])
-        relations['prop_id_target'] = relations['prop_id_target'].map(lambda x: order_ids[x])
-        
-        last_match = 0
-        for _, (_, _, prop_init, prop_end, _) in argumentative_units.iterrows():
-            if last_match < prop_init:
-                # Non argumentative gap
-                non_argument_dict = {
-                    "prop_init":last_match,
-                    "prop_end":prop_init,
-                    "prop_text":original_text[last_match:prop_init],
-                }
-                non_argumentative_units = pd.concat([non_argumentative_units, pd.DataFrame(non_argument_dict, index=[0])], ignore_index=True)
-                # last_match = prop_end
-            elif last_match == prop_init:
-                # Arguments together
-                pass
-            else:
-                log.warning("Inconsistency gap")
-            last_match = prop_end
+        prop_ids = np.array(units["prop_id"], dtype=np.int64)
+        prop_inits = np.array(units["prop_init"], dtype=np.int64)
+        prop_ends = np.array(units["prop_end"], dtype=np.int64)
+        
+        # Sort the units by position in the text
+        order = np.argsort(prop_inits, kind="stable")
+        prop_ids, prop_inits, prop_ends = prop_ids[order], prop_inits[order], prop_ends[order]
+        
+        # Remap the ids to their position in the text, 0 is the root node
+        sources = np.array(relation_columns["prop_id_source"], dtype=np.int64)
+        targets = np.array(relation_columns["prop_id_target"], dtype=np.int64)
+        max_id = max(prop_ids.max(initial=0), sources.max(initial=0), targets.max(initial=0))
+        order_ids = np.zeros(max_id + 1, dtype=np.int64)
+        order_ids[prop_ids] = np.arange(1, len(prop_ids) + 1)
+        
+        unknown_ids = set(sources[order_ids[sources] == 0]) | set(targets[order_ids[targets] == 0])
+        if unknown_ids:
+            raise KeyError(f"File {file.name}. Relations reference unknown propositions {sorted(unknown_ids)}")
+        
+        argumentative_units = pd.DataFrame({
+            "prop_id": order_ids[prop_ids],
+            "prop_type": [units["prop_type"][i] for i in order],
+            "prop_init": prop_inits,
+            "prop_end": prop_ends,
+            "prop_text": [units["prop_text"][i] for i in order],
+        }, columns=["prop_id", "prop_type", "prop_init", "prop_end", "prop_text"])
         
+        relations = pd.DataFrame({
+            "relation_id": np.array(relation_columns["relation_id"], dtype=np.int64),
+            "relation_type": relation_columns["relation_type"],
+            "prop_id_source": order_ids[sources],
+            "prop_id_target": order_ids[targets],
+        }, columns=["relation_id", "relation_type", "prop_id_source", "prop_id_target"])
+        
+        # Non argumentative gaps. Each unit is compared with the end of the previous one
+        last_matches = np.concatenate(([0], prop_ends[:-1]))
+        inconsistent = int((last_matches > prop_inits).sum())
+        if inconsistent:
+            log.warning(f"File {file.name}. {inconsistent} inconsistency gaps")
+        
+        gaps = last_matches < prop_inits
+        gap_inits = last_matches[gaps]
+        gap_ends = prop_inits[gaps]
+        
+        last_match = prop_ends[-1] if len(prop_ends) else 0
         if last_match != len(original_text):
             # If text ends in a non argumentative gap
-            non_argument_dict = {
-                "prop_init":last_match,
-                "prop_end":len(original_text),
-                "prop_text":original_text[last_match:len(original_text)],
-            }
-            non_argumentative_units = pd.concat([non_argumentative_units, pd.DataFrame(non_argument_dict, index=[0])], ignore_index=True)
+            gap_inits = np.append(gap_inits, last_match)
+            gap_ends = np.append(gap_ends, len(original_text))
+        
+        non_argumentative_units = pd.DataFrame({
+            "prop_init": gap_inits,
+            "prop_end": gap_ends,
+            "prop_text": [original_text[init:end] for init, end in zip(gap_inits.tolist(), gap_ends.tolist())],
+        }, columns=["prop_init", "prop_end", "prop_text"])
         
         return argumentative_units, relations, non_argumentative_units
 
@@ -126,46 +160,85 @@ class BretParser(Parser):
         returns: Bret annotated string, Raw text
         """
         
-        results = {}
-        default_gap = " "
-
-        argumentative_format = "T{prop_id}\t{prop_type} {prop_init} {prop_end}\t{prop_text}\n"
-        relation_format = "R{relation_id}\t{relation_type} Arg:T{prop_id_source} Arg:T{prop_id_target}\n"
+        return dict(self.iter_from_dataframes(dataframes.items()))
+    
+    def iter_from_dataframes(self, dataframes: Iterable[Tuple[str, ArgumentationInfo]]) -> Iterator[Tuple[str, AnnotatedRawTextInfo]]:
+        """
+        Lazy version of `from_dataframes`, only the current document is held in memory
         
-        for file_path_str, (argumentative_units, relations, non_argumentative_units) in dataframes.items():
-
-            result = ""
-            all_units = argumentative_units.append(non_argumentative_units, sort=True)
-            all_units.sort_values(by="prop_init", inplace=True)
-            all_units = all_units.reindex(columns=["prop_id", "prop_type", "prop_init", "prop_end", "prop_text"])
-            max_length = all_units["prop_end"].max()
-            
-            text = default_gap*max_length
-            
-            for index, (prop_id, prop_type, prop_init, prop_end, prop_text) in all_units.iterrows():
-                text = text[:prop_init] + prop_text + text[prop_end:]
-                if pd.notna(prop_id) and pd.notna(prop_type):
-                    to_write = argumentative_format.format_map({
-                        "prop_id": prop_id,
-                        "prop_type": prop_type,
-                        "prop_init": prop_init,
-                        "prop_end": prop_end,
-                        "prop_text": prop_text
-                    })
-                    result += to_write
-            
-            relations = relations.reindex(columns=["relation_id", "relation_type", "prop_id_source", "prop_id_target"])
-            
-            for index, (relation_id, relation_type, prop_id_source, prop_id_target) in relations.iterrows():
-                to_write = relation_format.format_map({
-                    "relation_id": relation_id,
-                    "relation_type": relation_type,
-                    "prop_id_source": prop_id_source,
-                    "prop_id_target": prop_id_target,
-                })
-                result += to_write
-            
-            results[file_path_str] = result, text
-        
-        return results
-    
\ No newline at end of file
+        dataframes: Iterator of (key, information)
+        
+        returns: Iterator of (key, (Bret annotated string, Raw text))
+        """
+        for file_path_str, info in dataframes:
+            yield file_path_str, self.__document_from_dataframes(*info)
+    
+    def export_from_dataframes(self, dest_address: Path, dataframes: Union[Dict[str, ArgumentationInfo], Iterable[Tuple[str, ArgumentationInfo]]], **kwargs):
+        """
+        Saves the corpus into dest_address. Each document is written as soon as it's
+        converted, see `Parser.export_from_dataframes`
+        """
+        items = dataframes.items() if isinstance(dataframes, Mapping) else dataframes
+        return Parser.export_corpus_from_files(dest_address, self.iter_from_dataframes(items), **kwargs)
+    
+    @staticmethod
+    def __document_from_dataframes(argumentative_units: pd.DataFrame, relations: pd.DataFrame, non_argumentative_units: pd.DataFrame) -> AnnotatedRawTextInfo:
+        """
+        Builds the .ann content and the text of a document. The units are written by
+        position in the text and the text is filled with their fragments, gaps without
+        units are spaces.
+        """
+        
+        # Each column is read once as an array, the rest works over plain arrays and lists
+        units = {column: argumentative_units[column].to_numpy() for column in ("prop_id", "prop_type", "prop_init", "prop_end", "prop_text")}
+        gaps = {column: non_argumentative_units[column].to_numpy() for column in ("prop_init", "prop_end", "prop_text")}
+        
+        # Units sorted by position, the argumentative ones first on ties
+        inits = np.concatenate((units["prop_init"], gaps["prop_init"])).astype(np.int64)
+        ends = np.concatenate((units["prop_end"], gaps["prop_end"])).astype(np.int64)
+        texts = units["prop_text"].tolist() + gaps["prop_text"].tolist()
+        order = np.argsort(inits, kind="stable")
+        
+        arguments = order[order < len(argumentative_units)]
+        arguments = arguments[pd.notna(units["prop_id"][arguments]) & pd.notna(units["prop_type"][arguments])]
+        lines = [
+            f"T{prop_id}\t{prop_type} {prop_init} {prop_end}\t{prop_text}\n" for prop_id, prop_type, prop_init, prop_end, prop_text in zip(
+                units["prop_id"][arguments].astype(np.int64).tolist(), units["prop_type"][arguments].tolist(),
+                inits[arguments].tolist(), ends[arguments].tolist(), [texts[i] for i in arguments.tolist()],
+            )
+        ]
+        lines.extend(
+            f"R{relation_id}\t{relation_type} Arg:T{prop_id_source} Arg:T{prop_id_target}\n" for relation_id, relation_type, prop_id_source, prop_id_target in zip(*(
+                relations[column].to_numpy().astype(np.int64).tolist() if column != "relation_type" else relations[column].tolist()
+                for column in ("relation_id", "relation_type", "prop_id_source", "prop_id_target")
+            ))
+        )
+        
+        return "".join(lines), BretParser.__text_from_fragments(inits[order], ends[order], [texts[i] for i in order.tolist()])
+    
+    @staticmethod
+    def __text_from_fragments(inits: np.ndarray, ends: np.ndarray, texts: List[str], default_gap: str = " ") -> str:
+        """
+        Rebuilds a text from its fragments sorted by `inits`. Each fragment replaces the
+        text between its init and end.
+        """
+        if not len(inits):
+            return ""
+        
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        previous_ends = np.concatenate(([0], ends[:-1]))
+        if (lengths == ends - inits).all() and (inits >= previous_ends).all():
+            # Fragments don't overlap and fit their positions, the gaps are joined in a single pass
+            gaps = (inits - previous_ends).tolist()
+            parts = []
+            for gap, text in zip(gaps, texts):
+                parts.append(default_gap*gap)
+                parts.append(text)
+            parts.append(default_gap*int(ends.max() - ends[-1]))
+            return "".join(parts)
+        
+        # Overlapping or resized fragments move the following positions, so they are replaced one by one
+        text = default_gap*int(ends.max())
+        for init, end, fragment in zip(inits.tolist(), ends.tolist(), texts):
+            text = text[:init] + fragment + text[end:]
+        return text
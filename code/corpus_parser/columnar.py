@@ -0,0 +1,87 @@
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columnar payloads are plain dictionaries of NumPy arrays and string tables.
+# They are much cheaper to pickle than DataFrames, so they are used to move
+# parse results between processes.
+ColumnarFrame = Dict[str, Any]
+ColumnarInfo = Tuple[ColumnarFrame, ColumnarFrame, ColumnarFrame]
+ArgumentationInfo = Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+
+def frame_to_columnar(frame: pd.DataFrame) -> ColumnarFrame:
+    """
+    Converts `frame` into a columnar payload. Numeric columns are stored as
+    NumPy arrays, the remaining columns are stored as int32 codes into a
+    table with the unique values of the column.
+
+    frame: DataFrame to convert
+
+    returns: The columnar payload
+    """
+    columns: Dict[str, tuple] = {}
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype.kind in "biuf":
+            columns[column] = ("array", values.to_numpy())
+        else:
+            codes, uniques = pd.factorize(values, sort=False)
+            columns[column] = ("table", codes.astype(np.int32), list(uniques))
+
+    index = None if isinstance(frame.index, pd.RangeIndex) else frame.index.to_numpy()
+
+    return {
+        "length": len(frame),
+        "order": list(frame.columns),
+        "index": index,
+        "columns": columns,
+    }
+
+def frame_from_columnar(payload: ColumnarFrame) -> pd.DataFrame:
+    """
+    Rebuilds the DataFrame represented by `payload`. Missing values in table
+    columns are restored as None.
+
+    payload: Columnar payload created with `frame_to_columnar`
+
+    returns: The DataFrame
+    """
+    data = {}
+    for column in payload["order"]:
+        kind, *values = payload["columns"][column]
+        if kind == "array":
+            data[column] = values[0]
+        else:
+            codes, uniques = values
+            column_values = np.full(payload["length"], None, dtype=object)
+            present = codes >= 0
+            if present.any():
+                table = np.empty(len(uniques), dtype=object)
+                table[:] = uniques
+                column_values[present] = table[codes[present]]
+            data[column] = column_values
+
+    index = payload["index"]
+    if index is None:
+        index = pd.RangeIndex(payload["length"])
+    return pd.DataFrame(data, columns=payload["order"], index=index)
+
+def info_to_columnar(info: ArgumentationInfo) -> ColumnarInfo:
+    """
+    Converts the three DataFrames of `info` into columnar payloads
+    """
+    return tuple(frame_to_columnar(frame) for frame in info)
+
+def info_from_columnar(payload: ColumnarInfo) -> ArgumentationInfo:
+    """
+    Rebuilds the ArgumentationInfo represented by `payload`
+    """
+    return tuple(frame_from_columnar(frame) for frame in payload)
+
+def is_argumentation_info(value: Any) -> bool:
+    """
+    Returns if `value` is an ArgumentationInfo, a parse result can also be a
+    list of tags when `get_tags` is used.
+    """
+    return isinstance(value, tuple) and len(value) == 3 and all(isinstance(x, pd.DataFrame) for x in value)
@@ -0,0 +1,208 @@
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+ConllTagInfo = Dict[str, Union[str,int]]
+
+class Vocabulary:
+    """
+    Interns strings into consecutive int32 ids
+    """
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: List[str] = []
+        self.__index: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        """
+        Returns the id of `value` adding it to the vocabulary if needed
+        """
+        index = self.__index.get(value)
+        if index is None:
+            with self.__lock:
+                index = self.__index.get(value)
+                if index is None:
+                    index = len(self.values)
+                    self.values.append(value)
+                    self.__index[value] = index
+        return index
+
+    def lookup(self, value: str) -> Optional[int]:
+        """
+        Returns the id of `value` or None if it isn't in the vocabulary
+        """
+        return self.__index.get(value)
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[index]
+
+    def __contains__(self, value: str) -> bool:
+        return value in self.__index
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class AnnotationSequence:
+    """
+    Array backed sequence of CONLL annotations. Each field of the annotation
+    dictionaries is a parallel array:
+
+      - `tok` int32 id in the `tokens` vocabulary
+      - `bio` int8 code, see `BIO_CODES`
+      - `prop_type` int32 id in the `labels` vocabulary
+      - `relation_type` int32 id in the `labels` vocabulary
+      - `relation_distance` int32 distance
+      - `full_tag` int32 id in the `labels` vocabulary
+
+    Missing values are `MISSING`, the "none" placeholder used by the exporters
+    is `NONE`.
+
+    Each sequence gets its own vocabularies unless they are passed. The sequences
+    of a corpus share them, so the ids of different documents can be compared and
+    the vocabularies are released along with the corpus.
+    """
+
+    BIO_CODES = {"": 0, "O": 1, "B": 2, "I": 3}
+    BIO_TAGS = ("", "O", "B", "I")
+    SEPARATOR, OUTSIDE, BEGIN, INSIDE = range(4)
+
+    MISSING = np.iinfo(np.int32).min
+    NONE = MISSING + 1
+
+    FIELDS = ("tok", "bio", "prop_type", "relation_type", "relation_distance", "full_tag")
+
+    def __init__(self, tok: np.ndarray, bio: np.ndarray, prop_type: np.ndarray, relation_type: np.ndarray,
+                 relation_distance: np.ndarray, full_tag: np.ndarray,
+                 tokens: Optional[Vocabulary] = None, labels: Optional[Vocabulary] = None) -> None:
+        self.tok = tok
+        self.bio = bio
+        self.prop_type = prop_type
+        self.relation_type = relation_type
+        self.relation_distance = relation_distance
+        self.full_tag = full_tag
+        self.tokens = tokens if tokens is not None else Vocabulary()
+        self.labels = labels if labels is not None else Vocabulary()
+
+    @staticmethod
+    def empty(length: int, tokens: Optional[Vocabulary] = None, labels: Optional[Vocabulary] = None) -> "AnnotationSequence":
+        """
+        Returns a sequence of `length` separators with missing fields, to be filled
+        """
+        missing = lambda: np.full(length, AnnotationSequence.MISSING, dtype=np.int32)
+        return AnnotationSequence(
+            np.zeros(length, dtype=np.int32), np.zeros(length, dtype=np.int8),
+            missing(), missing(), missing(), missing(), tokens, labels
+        )
+
+    def __encode_label(self, value) -> int:
+        if value is None:
+            return self.MISSING
+        if value == "none":
+            return self.NONE
+        return self.labels.intern(value)
+
+    def __decode_label(self, code: int):
+        if code == self.MISSING:
+            return None
+        if code == self.NONE:
+            return "none"
+        return self.labels[code]
+
+    def set(self, index: int, annotation: ConllTagInfo):
+        """
+        Stores the dictionary `annotation` at `index`
+        """
+        self.tok[index] = self.tokens.intern(annotation["tok"])
+        self.bio[index] = self.BIO_CODES[annotation["bio_tag"]]
+        self.prop_type[index] = self.__encode_label(annotation.get("prop_type"))
+        self.relation_type[index] = self.__encode_label(annotation.get("relation_type"))
+        distance = annotation.get("relation_distance")
+        if distance is None:
+            self.relation_distance[index] = self.MISSING
+        elif distance == "none":
+            self.relation_distance[index] = self.NONE
+        else:
+            self.relation_distance[index] = int(distance)
+        self.full_tag[index] = self.__encode_label(annotation.get("full_tag"))
+
+    @staticmethod
+    def from_dicts(annotations: List[ConllTagInfo], tokens: Optional[Vocabulary] = None, labels: Optional[Vocabulary] = None) -> "AnnotationSequence":
+        """
+        Builds a sequence from the annotation dictionaries used by ConllParser
+        """
+        sequence = AnnotationSequence.empty(len(annotations), tokens, labels)
+        for i, annotation in enumerate(annotations):
+            sequence.set(i, annotation)
+        return sequence
+
+    def annotation(self, index: int) -> ConllTagInfo:
+        """
+        Returns the annotation dictionary at `index`. Separators only have the
+        `tok` and `bio_tag` keys, `relation_distance` is returned as an int.
+        """
+        tok = self.tokens[self.tok[index]]
+        bio = int(self.bio[index])
+        if bio == self.SEPARATOR:
+            return {"tok": tok, "bio_tag": ""}
+        distance = int(self.relation_distance[index])
+        annotation = {
+            "tok": tok,
+            "bio_tag": self.BIO_TAGS[bio],
+            "prop_type": self.__decode_label(int(self.prop_type[index])),
+            "relation_type": self.__decode_label(int(self.relation_type[index])),
+            "relation_distance": None if distance == self.MISSING else "none" if distance == self.NONE else distance,
+        }
+        if self.full_tag[index] != self.MISSING:
+            annotation["full_tag"] = self.__decode_label(int(self.full_tag[index]))
+        return annotation
+
+    def to_dicts(self) -> List[ConllTagInfo]:
+        """
+        Returns the annotation dictionaries used by ConllParser
+        """
+        return [self.annotation(i) for i in range(len(self))]
+
+    def token_texts(self) -> List[str]:
+        """
+        Returns the text of every token
+        """
+        values = self.tokens.values
+        return [values[i] for i in self.tok.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.tok)
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]) -> Union[ConllTagInfo, "AnnotationSequence"]:
+        """
+        Returns the annotation dictionary for an int `index`, else a new sequence
+        with the selected annotations (a view for slices).
+        """
+        if isinstance(index, (int, np.integer)):
+            return self.annotation(int(index))
+        return AnnotationSequence(*(getattr(self, field)[index] for field in self.FIELDS), self.tokens, self.labels)
+
+    def __iter__(self) -> Iterator[ConllTagInfo]:
+        for i in range(len(self)):
+            yield self.annotation(i)
+
+    def is_separator(self) -> np.ndarray:
+        """
+        Returns a boolean mask with the sentence separators
+        """
+        return self.bio == self.SEPARATOR
+
+    @staticmethod
+    def concatenate(sequences: List["AnnotationSequence"]) -> "AnnotationSequence":
+        """
+        Joins `sequences`, they must share their vocabularies
+        """
+        first = sequences[0]
+        return AnnotationSequence(*(np.concatenate([getattr(x, field) for x in sequences]) for field in AnnotationSequence.FIELDS), first.tokens, first.labels)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, field).nbytes for field in self.FIELDS)
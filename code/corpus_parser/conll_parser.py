@@ -1,19 +1,21 @@
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from .parser import AnnotatedRawTextInfo, ArgumentationInfo, Parser
+from .conll_annotations import AnnotationSequence, ConllTagInfo, Vocabulary
 import re
 import logging as log
-from nltk.tokenize import word_tokenize, sent_tokenize
-
-ConllTagInfo = Dict[str, Union[str,int]]
+from utils.tokenizer_utils import word_tokenize, sent_tokenize, sent_span_tokenize_batch
 
 class ConllParser(Parser):
     
     ANNOTATION_REGEX = r"^(?P<tok>[^\s]+)\s(?P<bio_tag>[BIO])(-(?P<prop_type>\w+))?(-(?P<relation_type>\w+))?(-(?P<relation_distance>-?\d+))?\s*$"
     TAG_FORMAT = "{bio_tag}-{prop_type}-{relation_type}-{relation_distance}"
     ANNOTATION_FORMAT = f"{{tok}}\t{TAG_FORMAT}\n"
+    # Language tag at the end of a word of more than 3 characters in a "\0" joined text
+    LANGUAGE_TAG_REGEX = re.compile(r"(?<=[^\0])_[^\0]{2}(?=\0|\Z)")
     
     def __init__(self, *additional_supported_formats) -> None:
         super().__init__((".conll", *additional_supported_formats))
@@ -23,33 +25,73 @@ class ConllParser(Parser):
     def __split_sentences(self, line_infos: list, language: str) -> list:
         """
         Create a new list and adds a sentence separator to the `line_infos`'s content
-        the separator is the dtctionary `{"tok":"", "bio_tag":""}`
+        the separator is the dtctionary `{"tok":"\n", "bio_tag":""}`
         
         line_infos: Original information list
         language: Language content
         
         returns: A new list containing a sentence separator 
         """
-        new_line_infos = []
-        previous_splitted = [i for i, tok in enumerate(line_infos) if tok["bio_tag"] == ""]
-        if len(previous_splitted) == 0 or line_infos[-1] != self.__sent_separator:
-             previous_splitted.append(len(line_infos))
-        index = 0
-        
-        for end in previous_splitted:
-            content = " ".join(tok["tok"] for tok in line_infos[index:end])
-            for sentence in sent_tokenize(content, language=language):
-                for word in sentence.split(" "):
-                    assert word == line_infos[index]["tok"]
-                    new_line_infos.append(line_infos[index])
-                    index += 1
+        return self.__split_sentences_batch([line_infos], language)[0]
+    
+    def __split_sentences_batch(self, documents: List[list], language: str, workers: int = 1) -> List[list]:
+        """
+        Create new lists adding a sentence separator to the content of every list in
+        `documents`. The separator is the dictionary `{"tok":"\n", "bio_tag":""}`.
+        
+        The segments between the existing separators of all the documents are split by
+        a single `sent_span_tokenize_batch` call, and the sentence boundaries are mapped
+        back to token indices by their character offsets.
+        
+        documents: Original information lists
+        language: Language content
+        workers: Processes used to split the sentences, see `sent_span_tokenize_batch`
+        
+        returns: New lists containing the sentence separators
+        """
+        segments = [] # (document, start, end) of the tokens of each segment
+        for document, line_infos in enumerate(documents):
+            previous_splitted = [i for i, tok in enumerate(line_infos) if tok["bio_tag"] == ""]
+            if len(previous_splitted) == 0 or line_infos[-1] != self.__sent_separator:
+                previous_splitted.append(len(line_infos))
+            index = 0
+            for end in previous_splitted:
+                segments.append((document, index, end))
+                index = end + 1
+        
+        texts = [" ".join(tok["tok"] for tok in documents[document][start:end]) for document, start, end in segments]
+        # Looked up on every call so the module tokenizer can be replaced
+        spans = sent_span_tokenize_batch(texts, language=language, sent_tokenizer=sent_tokenize, workers=workers)
+        
+        new_documents = [[] for _ in documents]
+        for (document, start, end), text, sentences in zip(segments, texts, spans):
+            line_infos = documents[document]
+            new_line_infos = new_documents[document]
+            # Character offsets where every token starts and ends, tokens are joined by a single space
+            token_starts, token_ends = {}, {}
+            offset = 0
+            for index in range(start, end):
+                token_starts[offset] = index
+                offset += len(line_infos[index]["tok"])
+                token_ends[offset] = index + 1
+                offset += 1
+            
+            index = start
+            for sentence_start, sentence_end in sentences:
+                if sentence_start == sentence_end:
+                    continue
+                first, last = token_starts.get(sentence_start), token_ends.get(sentence_end)
+                if first != index or last is None or last <= first:
+                    raise Exception(f"Sentence at {sentence_start}:{sentence_end} doesn't match the token boundaries of '{text}'")
+                new_line_infos.extend(line_infos[first:last])
                 # Sentence separator
                 new_line_infos.append(self.__sent_separator)
-            assert index == end
-            index += 1
-        return new_line_infos
+                index = last
+            if index != end:
+                raise Exception(f"Sentences don't cover the tokens of '{text}'")
+        return new_documents
         
-    def parse(self, content:str, file: Optional[Path] = None, get_tags=False, **kwargs) -> ArgumentationInfo:
+    def parse(self, content:str, file: Optional[Path] = None, get_tags=False, as_sequence=False, **kwargs) -> ArgumentationInfo:
         """
         Parse `content` returning DataFrames containing
         the argumentative unit and the relation information.
@@ -57,6 +99,7 @@ class ConllParser(Parser):
         content: text containing the content to parse
         file: Optional, content's original file
         get_tags: If a List of tags info is returned instead a dataframe representation
+        as_sequence: With `get_tags`, if an AnnotationSequence is returned instead of the List
         
         argumentative_units columns: 
           - `prop_id` Proposition ID inside the document
@@ -79,11 +122,75 @@ class ConllParser(Parser):
         return: (argumentative_units, relationsm non_argumentative_units)
         """
         
-        content = content.splitlines()
+        if get_tags and as_sequence:
+            return self.__sequence_from_lines(content.splitlines(), file)
+        
+        line_parse = self.__annotations_from_lines(content.splitlines(), file)
+
+        if get_tags:
+            return line_parse
+
+        return self.__frames_from_annotations(line_parse, file)
+
+    def iter_documents(self, path: Path, get_tags=False, separator_lines=1, as_sequence=False, **kwargs) -> Iterator[Union[ArgumentationInfo, List[ConllTagInfo], AnnotationSequence]]:
+        """
+        Lazily parse a CONLL file that holds several documents. The file is read
+        line by line so only one document is held in memory at a time.
+        
+        path: CONLL file
+        get_tags: If a List of tags info is yielded instead a dataframe representation
+        as_sequence: With `get_tags`, if an AnnotationSequence is yielded instead of the List
+        separator_lines: Amount of consecutive empty lines that separate two documents.
+        Fewer empty lines are kept inside the document as sentence separators.
+        
+        yields: The parse result of each document, see `parse`
+        """
+        
+        # The sequences of the file share their vocabularies
+        tokens, labels = Vocabulary(), Vocabulary()
+        def document(lines: List[str], first_line: int):
+            if get_tags and as_sequence:
+                return self.__sequence_from_lines(lines, path, first_line, tokens, labels)
+            line_parse = self.__annotations_from_lines(lines, path, first_line)
+            if get_tags:
+                return line_parse
+            return self.__frames_from_annotations(line_parse, path)
+        
+        lines = []
+        first_line = 0
+        pending_separators = 0
+        with path.open() as file:
+            for i, line in enumerate(file):
+                line = line.rstrip("\r\n")
+                if line == "":
+                    pending_separators += 1
+                    continue
+                if lines and pending_separators >= separator_lines:
+                    yield document(lines, first_line)
+                    lines = []
+                elif lines:
+                    lines.extend([""]*pending_separators)
+                if not lines:
+                    first_line = i
+                pending_separators = 0
+                lines.append(line)
+        if lines:
+            yield document(lines, first_line)
+
+    def __annotations_from_lines(self, lines: Iterable[str], file: Optional[Path] = None, first_line: int = 0) -> List[ConllTagInfo]:
+        """
+        Matches every line in `lines` against the annotation regex.
+        
+        lines: CONLL lines
+        file: Optional, lines' original file
+        first_line: Line number of the first line, used in the warnings
+        
+        returns: The annotation of each line, empty lines are sentence separators
+        """
         
         line_parse = []
         
-        for i,line in enumerate(content):
+        for i,line in enumerate(lines, start=first_line):
             match = self.annotation_regex.match(line)
             if match:
                 line_parse.append(match.groupdict())
@@ -94,115 +201,165 @@ class ConllParser(Parser):
                     log.warning(f"Line {i} file {file.name}. Match not found: {line}")
                 else:
                     log.warning(f"Line {i}. Match not found: {line}")
+        
+        return line_parse
 
-        if get_tags:
-            return line_parse
-
-        def extract_proposition(propositions: List[dict], start_index=0):
-            """
-            Extracts the first proposition in `propositions`.
-            
-            Raise: IndexOutOfRange if no proposition is found
-            """
-            current = start_index
-            
-            def extract_language_tag(word):
-                """
-                Check if the word is annotated with a language tag i.e. [_es, _en, _de]
-                and return the unannotated word.
-                """
-                if len(word) > 3 and word[-3] == "_":
-                    return word[:-3]
-                return word
+    def __sequence_from_lines(self, lines: List[str], file: Optional[Path] = None, first_line: int = 0,
+                              tokens: Optional[Vocabulary] = None, labels: Optional[Vocabulary] = None) -> AnnotationSequence:
+        """
+        Same as `__annotations_from_lines` but the annotations are stored in an
+        AnnotationSequence instead of a dictionary per line.
+        
+        tokens: Tokens vocabulary shared with other sequences. A new one by default
+        labels: Labels vocabulary shared with other sequences. A new one by default
+        """
+        
+        sequence = AnnotationSequence.empty(len(lines), tokens, labels)
+        size = 0
+        
+        for i,line in enumerate(lines, start=first_line):
+            match = self.annotation_regex.match(line)
+            if match:
+                sequence.set(size, match.groupdict())
+            elif line == "":
+                sequence.set(size, self.__sent_separator)
+            else:
+                if file:
+                    log.warning(f"Line {i} file {file.name}. Match not found: {line}")
+                else:
+                    log.warning(f"Line {i}. Match not found: {line}")
+                continue
+            size += 1
+        
+        return sequence[:size]
 
-            if propositions[current]["bio_tag"] == "": # Sentence separator
-                proposition_text = extract_language_tag(propositions[current]["tok"])
-                current += 1
-            elif propositions[current]["bio_tag"] == "O":
-                proposition_text = extract_language_tag(propositions[current]["tok"])
-                current += 1
+    def __frames_from_annotations(self, line_parse: List[ConllTagInfo], file: Optional[Path] = None) -> ArgumentationInfo:
+        """
+        Builds the DataFrame representation of the CONLL annotations in `line_parse`.
+        
+        line_parse: Annotations returned by `__annotations_from_lines`
+        file: Optional, annotations' original file
+        
+        return: (argumentative_units, relations, non_argumentative_units)
+        """
 
-                # Join all tokens
-                while current < len(propositions) and propositions[current]["bio_tag"] == "O":
-                    proposition_text += " " + extract_language_tag(propositions[current]["tok"])
-                    current += 1
+        if not line_parse:
+            return (
+                pd.DataFrame({column: [] for column in ["prop_id", "prop_type", "prop_init", "prop_end", "prop_text"]}),
+                pd.DataFrame({column: [] for column in ["relation_id", "relation_type", "prop_id_source", "prop_id_target"]}),
+                pd.DataFrame({column: [] for column in ["prop_init", "prop_end", "prop_text"]}),
+            )
+        
+        bio = np.array([AnnotationSequence.BIO_CODES[x["bio_tag"]] for x in line_parse], dtype=np.int8)
+        starts, ends = self.__bio_spans(bio)
+        
+        for current in starts[bio[starts] == AnnotationSequence.INSIDE].tolist():
+            if file:
+                log.warning(f"File {file.name}. Proposition '{line_parse[current]['tok']}' at index {current} doesn't start with a B")
             else:
-                if propositions[current]["bio_tag"] != "B":
-                    proposition = propositions[current]
-                    if file:
-                        log.warning(f"File {file.name}. Proposition '{proposition['tok']}' at index {current} doesn't start with a B")
-                    else:
-                        log.warning(f"Proposition '{proposition['tok']}' at index {current} doesn't start with a B")
-                
-                # Current should be B
-                proposition_text = extract_language_tag(propositions[current]["tok"])
-                current += 1
-                
-                # Join all tokens
-                while current < len(propositions) and propositions[current]["bio_tag"] == "I":
-                    proposition_text += " " + extract_language_tag(propositions[current]["tok"])
-                    current += 1
-                
-            return proposition_text, current
+                log.warning(f"Proposition '{line_parse[current]['tok']}' at index {current} doesn't start with a B")
+        
+        words = self.__remove_language_tags([x["tok"] for x in line_parse])
+        texts = [words[start] if end - start == 1 else " ".join(words[start:end]) for start, end in zip(starts.tolist(), ends.tolist())]
+        
+        # Text length of each span: its words plus the spaces between them. Every span but
+        # the sentence separators adds an extra separator when rebuilding the text
+        word_lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        span_lengths = np.add.reduceat(word_lengths, starts) + (ends - starts - 1)
+        last_bio = bio[ends - 1]
+        inits = np.zeros(len(starts), dtype=np.int64)
+        np.cumsum((span_lengths + (last_bio != AnnotationSequence.SEPARATOR))[:-1], out=inits[1:])
+        prop_ends = inits + span_lengths
+        
+        is_argumentative = (last_bio == AnnotationSequence.BEGIN) | (last_bio == AnnotationSequence.INSIDE)
+        argumentative = np.flatnonzero(is_argumentative)
+        non_argumentative = np.flatnonzero(~is_argumentative)
+        
+        # All annotations of the argument are equal, the last one is used
+        prop_infos = [line_parse[end-1] for end in ends[argumentative].tolist()]
+        prop_ids = range(1, len(argumentative) + 1) # 0 is the root node
         
         argumentative_units = {
-            "prop_id": [], 
-            "prop_type": [], 
-            "prop_init": [], 
-            "prop_end": [], 
-            "prop_text": [],
+            "prop_id": list(prop_ids), 
+            "prop_type": [prop_info["prop_type"] for prop_info in prop_infos], 
+            "prop_init": inits[argumentative].tolist(), 
+            "prop_end": prop_ends[argumentative].tolist(), 
+            "prop_text": [texts[i] for i in argumentative.tolist()],
         }
         
         non_argumentative_units = {
-            "prop_init": [], 
-            "prop_end": [], 
-            "prop_text": [],
+            "prop_init": inits[non_argumentative].tolist(), 
+            "prop_end": prop_ends[non_argumentative].tolist(), 
+            "prop_text": [texts[i] for i in non_argumentative.tolist()],
         }
         
+        related = [
+            (prop_id, prop_info) for prop_id, prop_info in zip(prop_ids, prop_infos)
+            if prop_info["relation_type"] is not None and prop_info["relation_distance"] is not None
+        ]
         relations = {
-            "relation_id": [], 
-            "relation_type": [], 
-            "prop_id_source": [], 
-            "prop_id_target": [],            
+            "relation_id": list(range(len(related))), 
+            "relation_type": [prop_info["relation_type"] for _, prop_info in related], 
+            "prop_id_source": [prop_id for prop_id, _ in related], 
+            "prop_id_target": [prop_id + int(prop_info["relation_distance"]) for prop_id, prop_info in related],            
         }
-
-        current = 0
-        accumulative_offset = 0
-        while current < len(line_parse):
-            
-            proposition, current = extract_proposition(line_parse, current)
-            prop_info = line_parse[current-1] # All annotations of the argument are equal 
-            prop_id = len(argumentative_units['prop_id']) + 1 # 0 is the root node
-            
-            if prop_info["bio_tag"] in ["O", ""]:
-                non_argumentative_units['prop_init'].append(accumulative_offset)
-                non_argumentative_units['prop_end'].append(accumulative_offset + len(proposition))
-                non_argumentative_units['prop_text'].append(proposition)
-            else:
-                argumentative_units['prop_id'].append(prop_id)
-                argumentative_units['prop_type'].append(prop_info["prop_type"])
-                argumentative_units['prop_init'].append(accumulative_offset)
-                argumentative_units['prop_end'].append(accumulative_offset + len(proposition))
-                argumentative_units['prop_text'].append(proposition)
-
-                if None not in [prop_info["relation_type"], prop_info["relation_distance"]]:
-                    relations['relation_id'].append(len(relations['relation_id']))
-                    relations['relation_type'].append(prop_info["relation_type"])
-                    relations['prop_id_source'].append(prop_id)
-                    relations['prop_id_target'].append(prop_id + int(prop_info["relation_distance"]))
-            
-            accumulative_offset += len(proposition)
-            if prop_info["bio_tag"] != "":
-                accumulative_offset += 1 # Extra separator when rebuilding text
         
         return pd.DataFrame(argumentative_units), pd.DataFrame(relations), pd.DataFrame(non_argumentative_units)
+    
+    @staticmethod
+    def __remove_language_tags(words: List[str]) -> List[str]:
+        """
+        Removes the language tag i.e. [_es, _en, _de] of the annotated words. The
+        words are joined so the tags are found with a single regex pass.
+        """
+        joined = "\0".join(words)
+        if "_" not in joined:
+            return words
+        if joined.count("\0") != len(words) - 1: # A word contains the joining character
+            return [word[:-3] if len(word) > 3 and word[-3] == "_" else word for word in words]
+        return ConllParser.LANGUAGE_TAG_REGEX.sub("", joined).split("\0")
+    
+    @staticmethod
+    def __bio_spans(bio: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the propositions in an array of `AnnotationSequence.BIO_CODES`. A
+        proposition is a run of O tokens, a B or I token followed by I tokens or a
+        sentence separator.
         
-    def fix_annotations(self, annotations: List[ConllTagInfo]) -> List[ConllTagInfo]:
+        returns: (start, end) arrays with the token range of each proposition
+        """
+        previous = np.empty_like(bio)
+        previous[0] = AnnotationSequence.SEPARATOR
+        previous[1:] = bio[:-1]
+        
+        continues = (bio == AnnotationSequence.OUTSIDE) & (previous == AnnotationSequence.OUTSIDE)
+        continues |= (bio == AnnotationSequence.INSIDE) & ((previous == AnnotationSequence.BEGIN) | (previous == AnnotationSequence.INSIDE))
+        
+        starts = np.flatnonzero(~continues)
+        ends = np.empty_like(starts)
+        ends[:-1] = starts[1:]
+        ends[-1] = len(bio)
+        return starts, ends
+        
+    def fix_annotations(self, annotations: Union[List[ConllTagInfo], AnnotationSequence]) -> Union[List[ConllTagInfo], AnnotationSequence]:
         """
         Fix posible errors found in `annotations` returning a new list without them.
         
-        annotations: Original list of conll annotations
+        annotations: Original list of conll annotations or AnnotationSequence
         """
+        if isinstance(annotations, AnnotationSequence):
+            # Same rule over the arrays
+            keep = np.ones(len(annotations), dtype=bool)
+            if len(annotations) > 2:
+                bio = annotations.bio
+                skip = (bio[1:-1] == AnnotationSequence.SEPARATOR) \
+                    & (bio[2:] == AnnotationSequence.INSIDE) \
+                    & np.isin(bio[:-2], [AnnotationSequence.BEGIN, AnnotationSequence.INSIDE])
+                for field in (annotations.prop_type, annotations.relation_type, annotations.relation_distance):
+                    skip &= field[:-2] == field[2:]
+                keep[1:-1] = ~skip
+            return annotations[keep]
+        
         fixed_annotations = []
         for i, annotation in enumerate(annotations):
             # The next annotation can go after the previous annotation
@@ -220,7 +377,7 @@ class ConllParser(Parser):
             fixed_annotations.append(annotation)
         return fixed_annotations
 
-    def from_dataframes(self, dataframes: Dict[str, ArgumentationInfo], source_language="english", get_tags=False, exact_text=True, split_sentences=True, **kwargs) -> Dict[str, Union[AnnotatedRawTextInfo, Tuple[List[ConllTagInfo], str]]]:
+    def from_dataframes(self, dataframes: Dict[str, ArgumentationInfo], source_language="english", get_tags=False, exact_text=True, split_sentences=True, as_sequence=False, sentence_workers=1, **kwargs) -> Dict[str, Union[AnnotatedRawTextInfo, Tuple[List[ConllTagInfo], str]]]:
         """
         Creates a CONLL annotated corpus representing the received DataFrames. 
         
@@ -228,13 +385,18 @@ class ConllParser(Parser):
         the keys aren't important, so a mock key can be passed.
         source_language: Language for tokenization process
         get_tags: If true, returns the tags instead of the annotated text
+        as_sequence: With `get_tags`, if the tags are returned as an AnnotationSequence
         exact_text: If true, returns the exact text representation else will 
         be returned the tokens separated by whitespaces
+        split_sentences: If true, a sentence separator is added after every sentence. The
+        sentences of all the documents are split together
+        sentence_workers: Processes used to split the sentences
         
         returns: CONLL annotated string or CONLL annotations, Raw text
         """
         
         results = {}
+        documents = []
         default_gap = " "
                 
         for file_path_str, (argumentative_units, relations, non_argumentative_units) in dataframes.items():
@@ -243,35 +405,40 @@ class ConllParser(Parser):
             all_units = pd.concat([argumentative_units, non_argumentative_units], sort=True)
             all_units.sort_values(by="prop_init", inplace=True)
             all_units = all_units.reindex(columns=["prop_id", "prop_type", "prop_init", "prop_end", "prop_text"])
-            max_length = all_units["prop_end"].max()
+            max_length = int(all_units["prop_end"].max()) if len(all_units) else 0
             
-            text = default_gap*max_length if exact_text else ""
+            units = list(zip(
+                all_units["prop_id"].tolist(),
+                all_units["prop_type"].tolist(),
+                [int(x) for x in all_units["prop_init"]],
+                [int(x) for x in all_units["prop_end"]],
+                all_units["prop_text"].tolist(),
+            ))
+            relation_index = self.__relation_index(relations)
+            text_fragments = []
             
-            for index, (prop_id, prop_type, prop_init, prop_end, prop_text) in all_units.iterrows():
+            for prop_id, prop_type, prop_init, prop_end, prop_text in units:
                 prop_tokens = word_tokenize(prop_text, language=source_language)
                 
-                if exact_text:
-                    text = text[:prop_init] + prop_text + text[prop_end:]
-                else:
-                    text += default_gap.join(prop_tokens) + default_gap
+                if not exact_text:
+                    text_fragments.append(default_gap.join(prop_tokens) + default_gap)
                 
                 if pd.notna(prop_type):
                     # It's the begining of a proposition
+                    out_relations = relation_index.get(prop_id, [])
+                    if len(out_relations) == 1:
+                        relation_type, relation_distance, _ = out_relations[0]
+                    elif len(out_relations) == 0:
+                        relation_type = "none"
+                        relation_distance = "none"
+                    else:
+                        relation_type = "none"
+                        relation_distance = - out_relations[0][2]
+                        log.warning(f"File {file_path_str}. Relation '{prop_text}'' with more than one out edge")
+                    
                     for i,tok in enumerate(prop_tokens):
 
                         bio_tag = "B" if i == 0 else "I"
-                        relation = relations[relations["prop_id_source"] == prop_id]
-                        if len(relation) == 1:
-                            relation_type = relation["relation_type"].values[0]
-                            relation_distance = relation["prop_id_target"].values[0] - relation["prop_id_source"].values[0]
-                        elif len(relation) == 0:
-                            relation_type = "none"
-                            relation_distance = "none"
-                        else:
-                            relation_type = "none"
-                            relation_distance = - relation["prop_id_source"].values[0]
-                            log.warning(f"File {file_path_str}. Relation '{prop_text}'' with more than one out edge")
-                        
                         tags_info.append({
                                 "tok": tok,
                                 "bio_tag": bio_tag,
@@ -297,10 +464,24 @@ class ConllParser(Parser):
                                 "relation_distance": "none"
                             })
                             tags_info[-1]["full_tag"] = "O"
-                
-            if split_sentences:
-                tags_info = self.__split_sentences(tags_info, source_language)
             
+            if exact_text:
+                text = self.__rebuild_text([(prop_init, prop_end, prop_text) for _, _, prop_init, prop_end, prop_text in units], max_length, default_gap)
+            else:
+                text = "".join(text_fragments)
+            
+            documents.append((file_path_str, tags_info, text))
+        
+        if split_sentences:
+            all_tags_info = self.__split_sentences_batch([tags_info for _, tags_info, _ in documents], source_language, sentence_workers)
+            documents = [(file_path_str, tags_info, text) for (file_path_str, _, text), tags_info in zip(documents, all_tags_info)]
+        
+        # The sequences of the corpus share their vocabularies
+        tokens, labels = Vocabulary(), Vocabulary()
+        for file_path_str, tags_info, text in documents:
+            if get_tags and as_sequence:
+                # Fixed over the arrays
+                tags_info = AnnotationSequence.from_dicts(tags_info, tokens, labels)
             tags_info = self.fix_annotations(tags_info)
             
             if get_tags:
@@ -311,6 +492,51 @@ class ConllParser(Parser):
         
         return results
 
+    @staticmethod
+    def __relation_index(relations: pd.DataFrame) -> Dict[int, List[Tuple[str, int, int]]]:
+        """
+        Groups the relations by their source proposition.
+        
+        relations: Relations DataFrame
+        
+        returns: A dictionary mapping a source prop_id to a list with the 
+        (relation_type, relation_distance, prop_id_source) of each relation leaving it
+        """
+        relation_index: Dict[int, List[Tuple[str, int, int]]] = {}
+        for relation_type, prop_id_source, prop_id_target in zip(relations["relation_type"].values, relations["prop_id_source"].values, relations["prop_id_target"].values):
+            relation_index.setdefault(prop_id_source, []).append((relation_type, prop_id_target - prop_id_source, prop_id_source))
+        return relation_index
+
+    @staticmethod
+    def __rebuild_text(units: List[Tuple[int, int, str]], max_length: int, default_gap: str) -> str:
+        """
+        Rebuilds the original text placing each unit text between its offsets. The
+        positions that aren't covered by any unit are filled with `default_gap`.
+        
+        units: (prop_init, prop_end, prop_text) of each unit sorted by prop_init
+        max_length: Length of the text
+        default_gap: Filling character
+        
+        returns: The rebuilt text
+        """
+        fragments = []
+        cursor = 0
+        for prop_init, prop_end, prop_text in units:
+            if prop_init < cursor or prop_end > max_length or prop_end - prop_init != len(prop_text):
+                break
+            fragments.append(default_gap*(prop_init - cursor))
+            fragments.append(prop_text)
+            cursor = prop_end
+        else:
+            fragments.append(default_gap*(max_length - cursor))
+            return "".join(fragments)
+        
+        # Overlapping or inconsistent offsets, each unit overwrites the text
+        text = default_gap*max_length
+        for prop_init, prop_end, prop_text in units:
+            text = text[:prop_init] + prop_text + text[prop_end:]
+        return text
+
     def get_conll_text_from_annotation(self, annotations: List[str]) -> str:
         """
         Maps the anotation to its associated conll text representation.
@@ -342,24 +568,55 @@ class ConllParser(Parser):
         
         returns: The text representation
         """
+        if isinstance(annotations, AnnotationSequence):
+            return " ".join(annotations.token_texts())
         return " ".join([x["tok"] for x in annotations])
     
-    def get_conll_text_from_annotation_dicts(self, annotations: List[ConllTagInfo]) -> str:
+    def get_conll_text_from_annotation_dicts(self, annotations: Union[List[ConllTagInfo], AnnotationSequence]) -> str:
         """
         Returns the conll text associated with `annotations`.
         
         annotations: List containig the dictionary that holds the information about the tag
+        or an AnnotationSequence
         
         returns: The annotated conll text representation
         """
+        if isinstance(annotations, AnnotationSequence):
+            return self.__conll_text_from_sequence(annotations)
+        
         # Create text
-        result = ""
+        result = []
         for tag_info in annotations:
             if tag_info == self.__sent_separator:
                 to_write = "\n"
             else:
                 to_write = self.ANNOTATION_FORMAT.format_map(tag_info)
                 to_write = to_write.replace("-none", "") # Remove unnecesary labels
-            result += to_write
-        return result
-    
\ No newline at end of file
+            result.append(to_write)
+        return "".join(result)
+    
+
+    def __conll_text_from_sequence(self, annotations: AnnotationSequence) -> str:
+        """
+        Returns the conll text associated with the AnnotationSequence `annotations`.
+        Each distinct tag is formatted once.
+        """
+        tags = np.stack([annotations.bio, annotations.prop_type, annotations.relation_type, annotations.relation_distance], axis=1)
+        unique_tags, first_indexes, tag_indexes = np.unique(tags, axis=0, return_index=True, return_inverse=True)
+        tag_texts = []
+        for bio, first_index in zip(unique_tags[:, 0], first_indexes.tolist()):
+            if bio == AnnotationSequence.SEPARATOR:
+                tag_texts.append(None)
+                continue
+            # Format the tag with the first annotation that uses it
+            tag_texts.append(self.TAG_FORMAT.format_map(annotations[first_index]))
+        
+        result = []
+        for tok, tag_index in zip(annotations.token_texts(), tag_indexes.reshape(-1).tolist()):
+            tag = tag_texts[tag_index]
+            if tag is None:
+                result.append("\n")
+                continue
+            line = f"{tok}\t{tag}\n"
+            result.append(line.replace("-none", "")) # Remove unnecesary labels
+        return "".join(result)
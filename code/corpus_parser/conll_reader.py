@@ -0,0 +1,126 @@
+import mmap
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+
+class ConllSentenceReader:
+    """
+    Random access reader over the sentences of a CONLL file. A sentence is a run
+    of non empty lines. The file is memory mapped and only the byte offsets of
+    the sentences are kept in memory, a sentence is decoded when it's accessed.
+
+    The offsets index can be persisted next to the file, it's rebuilt when the
+    file size or modification time changes.
+    """
+
+    INDEX_SUFFIX = ".sidx.npy"
+    SENTENCE_REGEX = rb"[^\r\n]+(?:\r?\n[^\r\n]+)*"
+
+    def __init__(self, path: Path, persist_index: bool = False, index_path: Optional[Path] = None, encoding: str = "utf-8", content: Optional[bytes] = None) -> None:
+        """
+        path: CONLL file
+        persist_index: If the sentence index is saved into `index_path`
+        index_path: Index file. Defaults to the CONLL file name with `INDEX_SUFFIX`
+        encoding: File encoding
+        content: Already read content of `path`, i.e. an archive member. The file
+        isn't opened and the index isn't persisted
+        """
+        self.path = path
+        self.encoding = encoding
+        self.index_path = index_path if index_path else path.with_name(path.name + self.INDEX_SUFFIX)
+        self.__file = None
+        if content is not None:
+            self.__data = content
+            self.spans = self.__build_index()
+            return
+
+        self.__file = path.open("rb")
+        stat = path.stat()
+        self.__signature = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+        # Empty files can't be mapped
+        self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+
+        self.spans = self.__load_index() if self.index_path.exists() else None
+        if self.spans is None:
+            self.spans = self.__build_index()
+            if persist_index:
+                np.save(self.index_path, np.vstack([self.__signature, self.spans]))
+
+    def __load_index(self) -> Optional[np.ndarray]:
+        """
+        Returns the persisted index or None if it doesn't belong to the current file
+        """
+        try:
+            index = np.load(self.index_path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if index.ndim != 2 or len(index) == 0 or not np.array_equal(index[0], self.__signature):
+            return None
+        return index[1:]
+
+    def __build_index(self) -> np.ndarray:
+        """
+        Returns a (sentences, 2) array with the start and end byte of each sentence
+        """
+        offsets = [offset for match in re.finditer(self.SENTENCE_REGEX, self.__data) for offset in match.span()]
+        return np.array(offsets, dtype=np.int64).reshape(-1, 2)
+
+    def close(self):
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+        if self.__file is not None:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def raw(self, index: int) -> bytes:
+        """
+        Returns the bytes of sentence `index`
+        """
+        start, end = self.spans[index]
+        return self.__data[start:end]
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        """
+        Returns the text of the sentence, or sentences if `index` is a slice. The
+        lines are separated by a newline.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.raw(index).decode(self.encoding).replace("\r\n", "\n")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def lines(self, index: int) -> List[str]:
+        """
+        Returns the lines of sentence `index`
+        """
+        return self[index].split("\n")
+
+    def blank_lines_before(self, index: int) -> int:
+        """
+        Returns the amount of empty lines between sentence `index` and the previous
+        sentence or the beginning of the file
+        """
+        previous_end = self.spans[index - 1][1] if index > 0 else 0
+        newlines = self.__data[previous_end:self.spans[index][0]].count(b"\n")
+        return newlines - 1 if index > 0 else newlines
+
+    def trailing_blank_lines(self) -> int:
+        """
+        Returns the amount of empty lines after the last sentence
+        """
+        if len(self) == 0:
+            return self.__data[:].count(b"\n")
+        return max(self.__data[self.spans[-1][1]:].count(b"\n") - 1, 0)
@@ -0,0 +1,223 @@
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .conll_annotations import AnnotationSequence
+from .conll_parser import ConllParser
+from utils.archive_utils import is_bundle, iter_members, split_archive_path
+from utils.executor_utils import DynamicExecutor
+from utils.manifest_utils import atomic_write, content_hash
+
+STATISTICS_VERSION = 1
+
+class CorpusStatistics:
+    """
+    Statistics of a CONLL corpus. Every field is a counter, so the statistics of
+    different documents are combined with `merge`:
+
+      - `words`, `chars` Frequency of every token, without its language tag, and character
+      - `tags`, `bio_tags`, `prop_types`, `relation_types` Frequency of every label
+      - `relation_distances` Histogram of the relation distances
+      - `word_sizes` Histogram of the characters per token
+      - `sentence_sizes` Histogram of the tokens per sentence, a document without
+        separators is a single sentence
+      - `document_sizes` Histogram of the tokens per document
+      - `proposition_sizes` Histogram of the tokens per argumentative unit
+      - `propositions_per_document` Histogram of the argumentative units per document
+    """
+
+    VOCABULARIES = ("words", "chars", "tags", "bio_tags", "prop_types", "relation_types")
+    HISTOGRAMS = ("relation_distances", "word_sizes", "sentence_sizes", "document_sizes", "proposition_sizes", "propositions_per_document")
+
+    def __init__(self) -> None:
+        self.documents = 0
+        for field in self.VOCABULARIES + self.HISTOGRAMS:
+            setattr(self, field, Counter())
+
+    @staticmethod
+    def from_sequence(sequence: AnnotationSequence) -> "CorpusStatistics":
+        """
+        Computes the statistics of a single document
+        """
+        statistics = CorpusStatistics()
+        statistics.documents = 1
+        bio = sequence.bio
+        separators = bio == AnnotationSequence.SEPARATOR
+        tokens = [token for token, separator in zip(sequence.token_texts(), separators.tolist()) if not separator]
+        words = ConllParser.LANGUAGE_TAG_REGEX.sub("", "\0".join(tokens)).split("\0") if tokens else []
+
+        statistics.words.update(words)
+        for word in statistics.words:
+            for char, amount in Counter(word).items():
+                statistics.chars[char] += amount*statistics.words[word]
+        statistics.word_sizes.update(len(word) for word in words)
+        statistics.document_sizes[len(words)] += 1
+
+        # Sentences are the runs of tokens between separators
+        bounds = np.flatnonzero(np.diff(np.concatenate(([True], separators, [True])).astype(np.int8)))
+        sentence_sizes = bounds[1::2] - bounds[::2]
+        statistics.sentence_sizes.update(sentence_sizes.tolist())
+
+        labels = sequence.labels
+        decode = lambda codes: [labels[code] if code >= 0 else "none" if code == AnnotationSequence.NONE else None for code in codes.tolist()]
+        annotated = ~separators
+        bio_tags = [AnnotationSequence.BIO_TAGS[code] for code in bio[annotated].tolist()]
+        distances = [str(distance) if distance > AnnotationSequence.NONE else "none" if distance == AnnotationSequence.NONE else None
+                     for distance in sequence.relation_distance[annotated].tolist()]
+        statistics.bio_tags.update(bio_tags)
+        # The tag as written in the file, i.e. B-Premise-supports-1
+        statistics.tags.update("-".join(part for part in parts if part is not None) for parts in
+                               zip(bio_tags, decode(sequence.prop_type[annotated]), decode(sequence.relation_type[annotated]), distances))
+
+        # An argumentative unit starts with B, or with I after a token outside units
+        in_unit = (bio == AnnotationSequence.BEGIN) | (bio == AnnotationSequence.INSIDE)
+        previous_in_unit = np.concatenate(([False], in_unit[:-1]))
+        starts = (bio == AnnotationSequence.BEGIN) | (in_unit & ~previous_in_unit)
+        unit_ids = np.cumsum(starts)[in_unit]
+        statistics.proposition_sizes.update(np.bincount(unit_ids)[1:].tolist())
+        statistics.propositions_per_document[int(starts.sum())] += 1
+
+        statistics.prop_types.update(value for value in decode(sequence.prop_type[starts]) if value is not None)
+        statistics.relation_types.update(value for value in decode(sequence.relation_type[starts]) if value is not None)
+        distances = sequence.relation_distance[starts]
+        statistics.relation_distances.update(distances[distances > AnnotationSequence.NONE].tolist())
+        return statistics
+
+    def merge(self, other: "CorpusStatistics") -> "CorpusStatistics":
+        """
+        Adds the statistics of `other` into this one
+
+        returns: self
+        """
+        self.documents += other.documents
+        for field in self.VOCABULARIES + self.HISTOGRAMS:
+            getattr(self, field).update(getattr(other, field))
+        return self
+
+    def vocabulary(self, field: str = "words", min_count: int = 1) -> List[str]:
+        """
+        Returns the values of the vocabulary `field` seen at least `min_count` times,
+        from the most to the least frequent
+        """
+        counter: Counter = getattr(self, field)
+        return [value for value, amount in sorted(counter.items(), key=lambda x: (-x[1], x[0])) if amount >= min_count]
+
+    def tag_distribution(self, meta_tags_level: int = 99, meta_tags_separator: str = "-") -> Counter:
+        """
+        Returns the frequency of the tags keeping `meta_tags_level` meta tags after the
+        BIO tag, as the segmenter exporter does
+        """
+        result = Counter()
+        for tag, amount in self.tags.items():
+            result[meta_tags_separator.join(tag.split(meta_tags_separator)[:meta_tags_level+1])] += amount
+        return result
+
+    @property
+    def max_word_size(self) -> int:
+        return max(self.word_sizes, default=0)
+
+    @property
+    def max_seq_size(self) -> int:
+        return max(self.sentence_sizes, default=0)
+
+    @property
+    def max_document_size(self) -> int:
+        return max(self.document_sizes, default=0)
+
+    @property
+    def max_size_prop(self) -> int:
+        return max(self.proposition_sizes, default=0)
+
+    @property
+    def max_amount_doc(self) -> int:
+        return max(self.propositions_per_document, default=0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {"documents": self.documents}
+        for field in self.VOCABULARIES:
+            result[field] = dict(getattr(self, field))
+        for field in self.HISTOGRAMS:
+            # JSON keys are strings
+            result[field] = {str(key): value for key, value in sorted(getattr(self, field).items())}
+        return result
+
+    @staticmethod
+    def from_dict(values: Dict[str, Any]) -> "CorpusStatistics":
+        statistics = CorpusStatistics()
+        statistics.documents = values["documents"]
+        for field in CorpusStatistics.VOCABULARIES:
+            getattr(statistics, field).update(values[field])
+        for field in CorpusStatistics.HISTOGRAMS:
+            getattr(statistics, field).update({int(key): value for key, value in values[field].items()})
+        return statistics
+
+def _document_statistics(task: Union[Path, Tuple[str, bytes]]) -> CorpusStatistics:
+    """
+    Worker of `corpus_statistics`. Receives a file or an archive member (name, content)
+    """
+    if isinstance(task, Path):
+        name, content = task, task.read_text()
+    else:
+        name, content = Path(task[0]), task[1].decode()
+    return CorpusStatistics.from_sequence(ConllParser().parse(content, name, get_tags=True, as_sequence=True))
+
+def statistics_file(corpus_path: Path) -> Path:
+    """
+    Returns the file where the statistics of `corpus_path` are cached, next to the corpus.
+    For a directory inside an archive it's next to the archive, i.e. `corpus.tar.gz.train.stats.json`
+    """
+    found = split_archive_path(corpus_path) if not corpus_path.is_dir() else None
+    if found and found[1]:
+        archive, directory = found
+        return archive.with_name(f"{archive.name}.{directory.replace('/', '.')}.stats.json")
+    return corpus_path.with_name(corpus_path.name + ".stats.json")
+
+def __fingerprint(files: List[Path]) -> str:
+    """
+    Identifies the state of `files` by their names, sizes and modification times
+    """
+    stats = [(file.name, file.stat()) for file in files]
+    return content_hash(*(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}".encode() for name, stat in stats))
+
+def corpus_statistics(corpus_path: Path, use_cache: bool = True, backend: str = "process", max_workers: Optional[int] = None, prefetch: Optional[int] = None) -> CorpusStatistics:
+    """
+    Computes the statistics of the .conll files in `corpus_path` in a single pass. Each
+    document is processed by a worker and the results are merged as they arrive.
+
+    corpus_path: Corpus directory. It can also be an archive, see `Parser.parse_dir`
+    use_cache: If the statistics are read from and saved to `statistics_file(corpus_path)`.
+    The cache is invalidated when a file is added, removed or modified
+    backend: `thread` or `process`
+    max_workers: Amount of workers. Defaults to the cpu count
+    prefetch: Max documents processed ahead of the merge, see `DynamicExecutor.imap`
+
+    returns: The statistics of the whole corpus
+    """
+    bundle = is_bundle(corpus_path)
+    files = [] if bundle else sorted(file for file in corpus_path.iterdir() if file.is_file() and file.suffix == ".conll")
+    # An archive changes as a whole
+    fingerprint = __fingerprint([split_archive_path(corpus_path)[0]] if bundle else files)
+    cache_file = statistics_file(corpus_path)
+
+    if use_cache and cache_file.exists():
+        cached = json.loads(cache_file.read_text())
+        if cached.get("version") == STATISTICS_VERSION and cached.get("fingerprint") == fingerprint:
+            return CorpusStatistics.from_dict(cached["statistics"])
+
+    tasks = iter_members(corpus_path, lambda name: name.endswith(".conll")) if bundle else files
+    statistics = CorpusStatistics()
+    # The timings keep the member names, not their contents
+    label = lambda task, _: task if isinstance(task, Path) else task[0]
+    for document in DynamicExecutor(max_workers=max_workers, backend=backend, label=label).imap(_document_statistics, tasks, prefetch):
+        statistics.merge(document)
+
+    if use_cache:
+        atomic_write(cache_file, json.dumps({
+            "version": STATISTICS_VERSION,
+            "fingerprint": fingerprint,
+            "statistics": statistics.to_dict(),
+        }).encode())
+    return statistics
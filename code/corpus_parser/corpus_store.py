@@ -0,0 +1,223 @@
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .parser import ArgumentationInfo
+
+# (column name, kind) of each table in an ArgumentationInfo. Kinds:
+#   - `int` int32 array
+#   - `category` int32 codes into a list of categories, -1 is a missing value
+#   - `text` StringTable entry
+TableSchema = Tuple[Tuple[str, str], ...]
+
+ARGUMENTATIVE_UNITS_SCHEMA: TableSchema = (
+    ("prop_id", "int"),
+    ("prop_type", "category"),
+    ("prop_init", "int"),
+    ("prop_end", "int"),
+    ("prop_text", "text"),
+)
+
+RELATIONS_SCHEMA: TableSchema = (
+    ("relation_id", "int"),
+    ("relation_type", "category"),
+    ("prop_id_source", "int"),
+    ("prop_id_target", "int"),
+)
+
+NON_ARGUMENTATIVE_UNITS_SCHEMA: TableSchema = (
+    ("prop_init", "int"),
+    ("prop_end", "int"),
+    ("prop_text", "text"),
+)
+
+SCHEMAS = (ARGUMENTATIVE_UNITS_SCHEMA, RELATIONS_SCHEMA, NON_ARGUMENTATIVE_UNITS_SCHEMA)
+
+class StringTable:
+    """
+    Stores a sequence of strings in a single buffer with their offsets
+    """
+
+    def __init__(self, strings: Iterable[str]) -> None:
+        strings = list(strings)
+        self.buffer = "".join(strings)
+        self.offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in strings], out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise IndexError("StringTable slices must be contiguous")
+            offsets = self.offsets[start:stop + 1].tolist()
+            return [self.buffer[init:end] for init, end in zip(offsets, offsets[1:])]
+        if index < 0:
+            index += len(self)
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer.encode("utf-8")) + self.offsets.nbytes
+
+class ColumnTable:
+    """
+    One of the tables of an ArgumentationInfo for all the documents of a corpus.
+    The rows of document `i` are in `[doc_offsets[i], doc_offsets[i+1])`.
+    """
+
+    def __init__(self, schema: TableSchema, frames: Sequence[pd.DataFrame]) -> None:
+        self.schema = schema
+        self.doc_offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum([len(frame) for frame in frames], out=self.doc_offsets[1:])
+        self.categories: Dict[str, List[str]] = {}
+        self.columns: Dict[str, Union[np.ndarray, StringTable]] = {}
+
+        for name, kind in schema:
+            values = [frame[name] for frame in frames]
+            if kind == "int":
+                self.columns[name] = np.concatenate([np.asarray(x, dtype=np.int32) for x in values]) if values else np.zeros(0, dtype=np.int32)
+            elif kind == "category":
+                all_values = pd.concat(values, ignore_index=True) if values else pd.Series([], dtype=object)
+                codes, categories = pd.factorize(all_values, sort=True)
+                self.columns[name] = codes.astype(np.int32)
+                self.categories[name] = list(categories)
+            else:
+                self.columns[name] = StringTable(text for column in values for text in column)
+
+    def rows(self, document: int) -> slice:
+        """
+        Returns the rows of `document`
+        """
+        return slice(int(self.doc_offsets[document]), int(self.doc_offsets[document + 1]))
+
+    @property
+    def nbytes(self) -> int:
+        return self.doc_offsets.nbytes + sum(column.nbytes for column in self.columns.values())
+
+class TableView:
+    """
+    Read only view over the rows of one document in a ColumnTable. Numeric
+    and category columns are NumPy views, no data is copied until a
+    DataFrame is requested.
+    """
+
+    def __init__(self, table: ColumnTable, document: int) -> None:
+        self.table = table
+        self.rows = table.rows(document)
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name, _ in self.table.schema]
+
+    def __len__(self) -> int:
+        return self.rows.stop - self.rows.start
+
+    def codes(self, column: str) -> np.ndarray:
+        """
+        Returns the int32 codes of a category column
+        """
+        return self.table.columns[column][self.rows]
+
+    def __getitem__(self, column: str) -> Union[np.ndarray, List[str]]:
+        """
+        Returns the values of `column`. Int columns are returned as NumPy views,
+        category and text columns as lists.
+        """
+        kind = dict(self.table.schema)[column]
+        values = self.table.columns[column][self.rows]
+        if kind == "category":
+            categories = self.table.categories[column]
+            return [categories[code] if code >= 0 else None for code in values.tolist()]
+        return values
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Builds the DataFrame with the document rows
+        """
+        return pd.DataFrame({column: self[column] for column in self.columns}, columns=self.columns)
+
+class DocumentView:
+    """
+    View of one document in a CorpusStore. It unpacks into the three DataFrames
+    of an ArgumentationInfo, the table views are also available as properties.
+    """
+
+    def __init__(self, store: "CorpusStore", document: int) -> None:
+        self.store = store
+        self.document = document
+
+    @property
+    def argumentative_units(self) -> TableView:
+        return TableView(self.store.tables[0], self.document)
+
+    @property
+    def relations(self) -> TableView:
+        return TableView(self.store.tables[1], self.document)
+
+    @property
+    def non_argumentative_units(self) -> TableView:
+        return TableView(self.store.tables[2], self.document)
+
+    def frames(self) -> ArgumentationInfo:
+        """
+        Returns (argumentative_units, relations, non_argumentative_units) DataFrames.
+        The DataFrames copy the document rows, the table views don't
+        """
+        return tuple(TableView(table, self.document).to_frame() for table in self.store.tables)
+
+    def __len__(self) -> int:
+        return 3
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        return iter(self.frames())
+
+    def __getitem__(self, index: int) -> pd.DataFrame:
+        return TableView(self.store.tables[index], self.document).to_frame()
+
+class CorpusStore(Mapping):
+    """
+    Compact columnar storage for a parsed corpus. All documents share one set of
+    contiguous arrays per table: int32 offsets and ids, categorical prop and
+    relation types and a StringTable with the texts.
+
+    It behaves as a read only `Dict[str, ArgumentationInfo]` so it can be passed
+    to any `from_dataframes` or `export_from_dataframes` method.
+    """
+
+    def __init__(self, keys: List[str], tables: Tuple[ColumnTable, ColumnTable, ColumnTable]) -> None:
+        self.keys_list = keys
+        self.key_index = {key: i for i, key in enumerate(keys)}
+        self.tables = tables
+
+    @staticmethod
+    def from_dataframes(dataframes: Mapping[str, ArgumentationInfo]) -> "CorpusStore":
+        """
+        Builds a CorpusStore from the result of a parse function. Only the
+        columns described in `SCHEMAS` are kept.
+
+        dataframes: Maps a file key to its ArgumentationInfo
+        """
+        keys = list(dataframes.keys())
+        infos = [tuple(dataframes[key]) for key in keys]
+        tables = tuple(ColumnTable(schema, [info[i] for info in infos]) for i, schema in enumerate(SCHEMAS))
+        return CorpusStore(keys, tables)
+
+    def __getitem__(self, key: str) -> DocumentView:
+        return DocumentView(self, self.key_index[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys_list)
+
+    def __len__(self) -> int:
+        return len(self.keys_list)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximated memory used by the arrays
+        """
+        return sum(table.nbytes for table in self.tables)
@@ -11,8 +11,10 @@ from corpus_parser.parser import Parser
 from corpus_parser.conll_parser import ConllParser
 from corpus_parser.bret_parser import BretParser
 from corpus_parser.unified_parser import UnifiedParser
+from corpus_parser.parse_cache import ParseCache
 from pathlib import Path
 from utils.argparser_utils import ChoiceArg, OptionalArg, PositionalArg, update_parser
+from utils.tokenizer_utils import TokenizerService, get_default_tokenizer, set_default_tokenizer
 
 positional_args = [
     PositionalArg(
@@ -34,6 +36,18 @@ choice_args = [
         type=str,
         values=("unified", "bret", "conll")
     ),
+    ChoiceArg(
+        name="export_format",
+        help="Format of the exported corpus",
+        type=str,
+        values=("conll", "parquet")
+    ),
+    ChoiceArg(
+        name="export_mode",
+        help="Rewrite every exported file or only the changed ones, keeping a manifest",
+        type=str,
+        values=("overwrite", "incremental")
+    ),
 ]
 
 optional_args = [
@@ -49,9 +63,30 @@ optional_args = [
         type=str,
         default="spanish"
     ),
+    OptionalArg(
+        name="tokenizer_cache_file",
+        help="Sqlite file to keep the tokenization results between runs",
+        type=Path,
+        default=None
+    ),
+    OptionalArg(
+        name="parse_cache_dir",
+        help="Directory to cache the parsed files between runs",
+        type=Path,
+        default=None
+    ),
+    OptionalArg(
+        name="sentence_workers",
+        help="Processes used to split the exported documents into sentences",
+        type=int,
+        default=1
+    ),
 ]
 
 def create_from_args(args) -> Parser:
+    if args.tokenizer_cache_file:
+        set_default_tokenizer(TokenizerService(cache_file=args.tokenizer_cache_file))
+    
     # Get values
     parser = {
         "unified": UnifiedParser(),
@@ -59,20 +94,31 @@ def create_from_args(args) -> Parser:
         "conll": ConllParser(),
     }[args.parser]
     
+    if args.parse_cache_dir:
+        parser.parse_cache = ParseCache(args.parse_cache_dir)
+    
     return parser
 
 def handle_from_args(args):
     parser = create_from_args(args)
-    df = parser.parse_dir(args.source_path, 
-                     source_language=args.source_language, 
-                     target_language=args.target_language)
+    # Closing the tokenizer commits the entries pending in its cache file
+    with get_default_tokenizer():
+        df = parser.parse_dir(args.source_path, 
+                         source_language=args.source_language, 
+                         target_language=args.target_language)
 
-    conll = ConllParser() 
+        if args.export_format == "parquet":
+            from corpus_parser.parquet_parser import ParquetParser
+            exporter = ParquetParser()
+        else:
+            exporter = ConllParser() 
 
-    conll.export_from_dataframes(args.conll_parsed_path, 
-                                 df, 
-                                 source_language=args.source_language, 
-                                 target_language=args.target_language)
+        exporter.export_from_dataframes(args.conll_parsed_path, 
+                                        df, 
+                                        source_language=args.source_language, 
+                                        target_language=args.target_language,
+                                        incremental=args.export_mode == "incremental",
+                                        sentence_workers=args.sentence_workers)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -0,0 +1,181 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .conll_annotations import AnnotationSequence, ConllTagInfo, Vocabulary
+from .conll_parser import ConllParser
+from .parser import ArgumentationInfo, Parser
+
+class ParquetParser(Parser):
+    """
+    Columnar interchange format. A corpus is a directory with a Parquet file per table:
+
+      - `documents.parquet` One row per document: `doc_id`, the rows of the document in
+        every other table and its raw `text` if the tags were exported
+      - `argumentative_units.parquet`, `relations.parquet`, `non_argumentative_units.parquet`
+        The ArgumentationInfo tables of all the documents with a `doc_id` column
+      - `tags.parquet` Optional, the token level CONLL annotations with a `doc_id` column
+
+    The rows of each document are contiguous and in the order of `documents.parquet`, so
+    the corpus is loaded by slicing the tables, without any parsing.
+    """
+
+    DOCUMENTS = "documents"
+    TABLES = ("argumentative_units", "relations", "non_argumentative_units")
+    TAGS = "tags"
+    TAG_COLUMNS = ("tok", "bio_tag", "prop_type", "relation_type", "relation_distance", "full_tag")
+    SUFFIX = ".parquet"
+
+    def __init__(self) -> None:
+        super().__init__((self.SUFFIX,))
+
+    def __table_file(self, corpus_path: Path, table: str) -> Path:
+        return corpus_path / (table + self.SUFFIX)
+
+    def __read_documents(self, corpus_path: Path) -> pd.DataFrame:
+        documents_file = self.__table_file(corpus_path, self.DOCUMENTS)
+        if not documents_file.exists():
+            raise Exception(f"{corpus_path} isn't a Parquet corpus, {documents_file.name} not found")
+        return pq.read_table(documents_file).to_pandas()
+
+    @staticmethod
+    def __offsets(rows: pd.Series) -> List[int]:
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(rows.to_numpy(), out=offsets[1:])
+        return offsets.tolist()
+
+    def parse_dir(self, corpus_path: Path, as_store: bool = False, **kwargs) -> Dict[str, ArgumentationInfo]:
+        """
+        Loads the ArgumentationInfo of every document in the corpus
+
+        corpus_path: Directory of a Parquet corpus
+        as_store: If true the result is compacted into a `CorpusStore`
+
+        return: A dictionary mapping document id to its information
+        """
+        if as_store:
+            from .corpus_store import CorpusStore
+            return CorpusStore.from_dataframes(self.parse_dir(corpus_path, **kwargs))
+
+        documents = self.__read_documents(corpus_path)
+        doc_ids = documents["doc_id"].tolist()
+        results = {doc_id: [] for doc_id in doc_ids}
+
+        for table in self.TABLES:
+            frame = pq.read_table(self.__table_file(corpus_path, table)).to_pandas().drop(columns="doc_id")
+            offsets = self.__offsets(documents[f"{table}_rows"])
+            for doc_id, start, end in zip(doc_ids, offsets, offsets[1:]):
+                results[doc_id].append(frame.iloc[start:end].reset_index(drop=True))
+
+        return {doc_id: tuple(frames) for doc_id, frames in results.items()}
+
+    def iter_parse_dir(self, corpus_path: Path, prefetch: Optional[int] = None, **kwargs) -> Iterator[Tuple[str, ArgumentationInfo]]:
+        """
+        Yields the documents of `parse_dir` in the order of `documents.parquet`. The
+        tables are read at once, so `prefetch` has no effect
+        """
+        yield from self.parse_dir(corpus_path, **kwargs).items()
+
+    def parse(self, content: str, file: Optional[Path] = None, **kwargs) -> ArgumentationInfo:
+        raise Exception("Parquet corpora are binary directories, use parse_dir")
+
+    def read_tags(self, corpus_path: Path, as_sequence: bool = False) -> Dict[str, Tuple[Union[List[ConllTagInfo], AnnotationSequence], str]]:
+        """
+        Loads the token level annotations of every document, the same result as
+        `ConllParser.from_dataframes` with `get_tags`
+
+        corpus_path: Directory of a Parquet corpus exported with the tags
+        as_sequence: If the tags are returned as an AnnotationSequence
+
+        return: A dictionary mapping document id to its annotations and its raw text
+        """
+        documents = self.__read_documents(corpus_path)
+        tags_file = self.__table_file(corpus_path, self.TAGS)
+        if not tags_file.exists():
+            raise Exception(f"{corpus_path} was exported without the tags")
+
+        tags = pq.read_table(tags_file, columns=list(self.TAG_COLUMNS)).to_pydict()
+        offsets = self.__offsets(documents[f"{self.TAGS}_rows"])
+        results = {}
+        tokens, labels = Vocabulary(), Vocabulary()
+        for doc_id, text, start, end in zip(documents["doc_id"].tolist(), documents["text"].tolist(), offsets, offsets[1:]):
+            annotations = []
+            for i in range(start, end):
+                if tags["bio_tag"][i] == "":
+                    annotations.append({"tok": tags["tok"][i], "bio_tag": ""})
+                    continue
+                annotation = {column: tags[column][i] for column in self.TAG_COLUMNS if column != "full_tag"}
+                if tags["relation_distance"][i] not in (None, "none"):
+                    annotation["relation_distance"] = int(tags["relation_distance"][i])
+                if tags["full_tag"][i] is not None:
+                    annotation["full_tag"] = tags["full_tag"][i]
+                annotations.append(annotation)
+            results[doc_id] = (AnnotationSequence.from_dicts(annotations, tokens, labels) if as_sequence else annotations), text
+        return results
+
+    def from_dataframes(self, dataframes: Dict[str, ArgumentationInfo], source_language="english", with_tags=True, **kwargs) -> Dict[str, pa.Table]:
+        """
+        Creates the Arrow tables of a Parquet corpus representing the received DataFrames.
+
+        dataframes: The result from calling a parse function in any Parser class
+        source_language: Language for the tokenization of the tags
+        with_tags: If the token level annotations and the raw text are included. They are
+        computed with `ConllParser.from_dataframes`
+
+        returns: Maps table name to its Arrow table
+        """
+        doc_ids = [str(key) for key in dataframes.keys()]
+        infos = [tuple(info) for info in dataframes.values()]
+        documents = {"doc_id": doc_ids}
+        tables = {}
+
+        for i, table in enumerate(self.TABLES):
+            frames = [info[i] for info in infos]
+            documents[f"{table}_rows"] = [len(frame) for frame in frames]
+            frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            frame.insert(0, "doc_id", np.repeat(doc_ids, documents[f"{table}_rows"]))
+            tables[table] = pa.Table.from_pandas(frame, preserve_index=False)
+
+        if with_tags:
+            tags = ConllParser().from_dataframes(dataframes, source_language=source_language, get_tags=True, **kwargs)
+            columns = {column: [] for column in ("doc_id",) + self.TAG_COLUMNS}
+            documents[f"{self.TAGS}_rows"] = []
+            documents["text"] = []
+            for doc_id, (annotations, text) in zip(doc_ids, tags.values()):
+                documents[f"{self.TAGS}_rows"].append(len(annotations))
+                documents["text"].append(text)
+                columns["doc_id"].extend([doc_id]*len(annotations))
+                for annotation in annotations:
+                    for column in self.TAG_COLUMNS:
+                        value = annotation.get(column)
+                        # Distances are ints or the "none" placeholder
+                        columns[column].append(str(value) if column == "relation_distance" and value is not None else value)
+            tables[self.TAGS] = pa.table({column: pa.array(values, type=pa.string()) for column, values in columns.items()})
+
+        tables[self.DOCUMENTS] = pa.table(documents)
+        for name, table in tables.items():
+            # Document ids are repeated in every row
+            tables[name] = table.set_column(0, "doc_id", table.column("doc_id").dictionary_encode()) if name != self.DOCUMENTS else table
+        return tables
+
+    def export_from_dataframes(self, dest_address: Path, dataframes: Union[Dict[str, ArgumentationInfo], Iterable[Tuple[str, ArgumentationInfo]]], compression: str = "zstd", incremental: bool = False, **kwargs):
+        """
+        Saves the corpus into dest_address as a Parquet corpus.
+
+        dest_address: Directory where to save the corpus. May not exist
+        dataframes: DataFrame representation of the corpus or an iterator of (key, information).
+        The tables are written at once, so the iterator is fully read first
+        compression: Parquet compression codec
+        incremental: Not supported, the tables are always rewritten
+        """
+        if incremental:
+            raise ValueError("Incremental export isn't supported by the Parquet format, every table is rewritten")
+        if not isinstance(dataframes, Mapping):
+            dataframes = dict(dataframes)
+        dest_address.mkdir(parents=True, exist_ok=True)
+        for name, table in self.from_dataframes(dataframes, **kwargs).items():
+            pq.write_table(table, self.__table_file(dest_address, name), compression=compression)
@@ -0,0 +1,258 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .columnar import frame_from_columnar, frame_to_columnar, is_argumentation_info
+from .parser import ArgumentationInfo
+
+class ParseCache:
+    """
+    Content addressed cache of parse results. Each entry is keyed by the content
+    hash of the parsed files, the parser class and the parse arguments and it's
+    stored as a .npz file in `cache_dir`. The least recently used entries are
+    removed when the cache grows over `max_size` bytes.
+    """
+
+    SUFFIX = ".npz"
+    # Changes the keys when the entries format changes
+    VERSION = 2
+    COUNTERS = ("hits", "misses", "writes", "evictions")
+
+    def __init__(self, cache_dir: Path, max_size: int = 2*1024**3) -> None:
+        """
+        cache_dir: Directory to store the entries. May not exist
+        max_size: Max size in bytes of the stored entries
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.__size = sum(entry.stat().st_size for entry in self.__entries())
+
+    def __getstate__(self):
+        # Locks can't be sent to the process pool workers
+        state = self.__dict__.copy()
+        del state["_ParseCache__lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __entries(self) -> List[Path]:
+        return [entry for entry in self.cache_dir.iterdir() if entry.name.endswith(self.SUFFIX)]
+
+    def key(self, parser: Any, contents: List[bytes], kwargs: Dict[str, Any]) -> str:
+        """
+        Returns the cache key of a parse call
+
+        parser: Parser used
+        contents: Content of every file read by the parser
+        kwargs: Parse arguments
+        """
+        digest = hashlib.sha256()
+        digest.update(f"v{self.VERSION}".encode())
+        digest.update(f"{type(parser).__module__}.{type(parser).__qualname__}".encode())
+        digest.update(repr(sorted(kwargs.items())).encode())
+        for content in contents:
+            digest.update(hashlib.sha256(content).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[ArgumentationInfo]:
+        """
+        Returns the cached parse result for `key` or None
+        """
+        entry = self.cache_dir / (key + self.SUFFIX)
+        try:
+            with np.load(entry, allow_pickle=False) as data:
+                result = tuple(frame_from_columnar(self.__load_frame(data, i)) for i in range(3))
+        except (OSError, KeyError, ValueError):
+            with self.__lock:
+                self.misses += 1
+            return None
+
+        os.utime(entry) # Mark as recently used
+        with self.__lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Any):
+        """
+        Saves the parse `result` for `key`. Results that aren't an ArgumentationInfo
+        or can't be stored without pickling are skipped.
+        """
+        if not is_argumentation_info(result):
+            return
+        arrays = {}
+        for i, frame in enumerate(result):
+            if not self.__dump_frame(frame_to_columnar(frame), i, arrays):
+                return
+
+        entry = self.cache_dir / (key + self.SUFFIX)
+        file_descriptor, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.savez(file, **arrays)
+            with self.__lock:
+                # An overwritten entry no longer takes space
+                try:
+                    self.__size -= entry.stat().st_size
+                except FileNotFoundError:
+                    pass
+                os.replace(temp_name, entry)
+        except Exception:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+
+        with self.__lock:
+            self.writes += 1
+            self.__size += entry.stat().st_size
+            if self.__size > self.max_size:
+                self.__evict()
+
+    def __evict(self):
+        """
+        Removes the least recently used entries until the cache fits in `max_size`.
+        Must be called holding the lock.
+        """
+        entries = []
+        for entry in self.__entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda x: x[0])
+
+        self.__size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if self.__size <= self.max_size:
+                break
+            entry.unlink(missing_ok=True)
+            self.__size -= size
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Removes every entry
+        """
+        with self.__lock:
+            for entry in self.__entries():
+                entry.unlink(missing_ok=True)
+            self.__size = 0
+
+    def counters(self) -> Dict[str, int]:
+        """
+        Returns the hits, misses, writes and evictions counters
+        """
+        with self.__lock:
+            return {counter: getattr(self, counter) for counter in self.COUNTERS}
+
+    def add_counters(self, counters: Dict[str, int]):
+        """
+        Adds the `counters` of a copy of the cache used by a process pool worker
+        """
+        with self.__lock:
+            for counter in self.COUNTERS:
+                setattr(self, counter, getattr(self, counter) + counters[counter])
+
+    def refresh_size(self):
+        """
+        Reads the size of the stored entries again, after other processes changed them
+        """
+        size = 0
+        for entry in self.__entries():
+            try:
+                size += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        with self.__lock:
+            self.__size = size
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters and its current size in bytes
+        """
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "size": self.__size,
+            }
+
+    @staticmethod
+    def __dump_frame(payload: Dict[str, Any], table: int, arrays: Dict[str, np.ndarray]) -> bool:
+        """
+        Adds the arrays of a columnar `payload` to `arrays`
+
+        returns: If the payload could be stored without pickling
+        """
+        prefix = f"{table}/"
+        arrays[prefix + "length"] = np.array(payload["length"])
+        ParseCache.__dump_strings(payload["order"], prefix + "order", arrays)
+        if payload["index"] is not None:
+            arrays[prefix + "index"] = payload["index"]
+        for column, (kind, *values) in payload["columns"].items():
+            if kind == "array":
+                arrays[f"{prefix}array/{column}"] = values[0]
+            else:
+                codes, uniques = values
+                if all(isinstance(x, str) for x in uniques):
+                    ParseCache.__dump_strings(uniques, f"{prefix}strings/{column}", arrays)
+                elif all(isinstance(x, (int, np.integer)) for x in uniques):
+                    arrays[f"{prefix}table/{column}"] = np.array(uniques, dtype=np.int64)
+                else:
+                    return False
+                arrays[f"{prefix}codes/{column}"] = codes
+        return all(array.dtype != object for array in arrays.values())
+
+    @staticmethod
+    def __dump_strings(strings: List[str], name: str, arrays: Dict[str, np.ndarray]):
+        """
+        Adds `strings` to `arrays` as a utf-8 buffer and the byte offsets of each string,
+        instead of a fixed width array padded to the longest string
+        """
+        encoded = [string.encode() for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        arrays[name + "/buffer"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        arrays[name + "/offsets"] = offsets
+
+    @staticmethod
+    def __load_strings(data: Any, name: str) -> List[str]:
+        buffer = data[name + "/buffer"].tobytes()
+        offsets = data[name + "/offsets"].tolist()
+        return [buffer[init:end].decode() for init, end in zip(offsets, offsets[1:])]
+
+    @staticmethod
+    def __load_frame(data: Any, table: int) -> Dict[str, Any]:
+        """
+        Rebuilds the columnar payload of `table` from the .npz `data`
+        """
+        prefix = f"{table}/"
+        columns = {}
+        order = ParseCache.__load_strings(data, prefix + "order")
+        for column in order:
+            if f"{prefix}array/{column}" in data:
+                columns[column] = ("array", data[f"{prefix}array/{column}"])
+            elif f"{prefix}table/{column}" in data:
+                columns[column] = ("table", data[f"{prefix}codes/{column}"], data[f"{prefix}table/{column}"].tolist())
+            else:
+                columns[column] = ("table", data[f"{prefix}codes/{column}"], ParseCache.__load_strings(data, f"{prefix}strings/{column}"))
+        return {
+            "length": int(data[prefix + "length"]),
+            "order": order,
+            "index": data[prefix + "index"] if prefix + "index" in data else None,
+            "columns": columns,
+        }
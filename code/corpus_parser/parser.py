@@ -1,10 +1,17 @@
 
 
-from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, Future, wait
+import logging
+from collections import deque
+from functools import partial
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
 import pandas as pd
+from .columnar import info_from_columnar, info_to_columnar, is_argumentation_info
+from utils.archive_utils import ArchiveWriter, is_bundle, iter_member_names, iter_members
+from utils.executor_utils import DynamicExecutor, file_size
+from utils.manifest_utils import ExportManifest
 
 ArgumentationInfo = Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
 AnnotatedRawTextInfo = Tuple[str,str]
@@ -16,6 +23,10 @@ class Parser:
         accepted_files: List of files extensions to be read
         """
         self.accepted_files = tuple(accepted_files)
+        # Extensions of the files read along with the accepted files, see `_file_dependencies`
+        self.dependency_files: Tuple[str, ...] = ()
+        # Optional ParseCache used by parse_file
+        self.parse_cache = None
         
     def _should_read_file(self, file: Path):
         """
@@ -23,40 +34,198 @@ class Parser:
         """
         return file.is_file() and file.name.endswith(self.accepted_files)
 
-    def parse_dir(self, corpus_path: Path, **kwargs) -> Dict[str, ArgumentationInfo]:
+    def parse_dir(self, corpus_path: Path, backend: str = "thread", as_store: bool = False, **kwargs) -> Dict[str, ArgumentationInfo]:
         """
         Parse the file
         
-        corpus_path: Base corpus address
+        corpus_path: Base corpus address. It can also be an archive (.tar, .tar.gz, .zip, .tar.zst, ...),
+        a directory inside an archive or a compressed file (.gz, .zst, ...), its files are read
+        without extracting them to disk
+        backend: `thread` to parse the files in a thread pool or `process` to parse them
+        in a process pool. The process workers send back a columnar payload instead of
+        the DataFrames.
+        as_store: If true the result is compacted into a `CorpusStore`
         
         return: A dictionary mapping file address to its information
         """
         
-        results = {}
-        futures: List[Future] = []
-        max_worker = 20
+        if as_store:
+            from .corpus_store import CorpusStore
+            return CorpusStore.from_dataframes(self.parse_dir(corpus_path, backend=backend, **kwargs))
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend {backend}. Expected thread or process")
+        if is_bundle(corpus_path):
+            return self.__parse_bundle(corpus_path, backend, **kwargs)
+        
+        files = [file for file in corpus_path.iterdir() if self._should_read_file(file)]
+        return self.parse_files(files, backend=backend, **kwargs)
+
+    def parse_files(self, files: List[Path], backend: str = "thread", **kwargs) -> Dict[str, ArgumentationInfo]:
+        """
+        Parse `files` in parallel, the largest first
+        
+        files: Files to parse
+        backend: `thread` or `process`, see `parse_dir`
+        
+        return: A dictionary mapping file address to its information, in the order of `files`
+        """
+        
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend {backend}. Expected thread or process")
+        if backend == "process":
+            return self.__parse_files_processes(files, **kwargs)
+        
+        executor = DynamicExecutor(max_workers=20)
+        results = executor.map(lambda file: self.parse_file(file, **kwargs), files, size=file_size)
+        
+        return {str(file): result for file, result in zip(files, results)}
+
+    def iter_parse_dir(self, corpus_path: Path, prefetch: Optional[int] = None, backend: str = "thread", **kwargs) -> Iterator[Tuple[str, ArgumentationInfo]]:
+        """
+        Same as `parse_dir` but yields each file as soon as it and the previous ones are
+        parsed, instead of waiting for the whole corpus. At most `prefetch` files are
+        parsed ahead of the consumer, so only them are held in memory.
+        
+        corpus_path: Base corpus address. It can also be an archive, see `parse_dir`
+        prefetch: Max files parsed ahead of the consumer. Defaults to twice the workers
+        backend: `thread` or `process`
+        
+        return: Iterator of (file address, information). Files are yielded in name
+        order, archive members in the order they are stored
+        """
+        
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend {backend}. Expected thread or process")
         
-        files = [file for file in corpus_path.iterdir()]
-        batch = len(files)//max_worker + 1
+        if is_bundle(corpus_path):
+            tasks = self.__bundle_tasks(corpus_path)
+            key = lambda task: str(task[0])
+            if backend == "process":
+                function = partial(_parse_contents_columnar, self, kwargs=kwargs)
+            else:
+                function = lambda task: self.parse_contents(*task, **kwargs)
+        else:
+            tasks = sorted(file for file in corpus_path.iterdir() if self._should_read_file(file))
+            key = str
+            if backend == "process":
+                function = partial(_parse_file_columnar, self, kwargs=kwargs)
+            else:
+                function = lambda file: self.parse_file(file, **kwargs)
         
-        def read(slice):
-            for file in files[batch*slice:batch*(slice+1)]:
-                if self._should_read_file(file):
-                    result = self.parse_file(file, **kwargs)
-                    results[str(file)] = result
+        label = lambda task, _: key(task)
+        executor = DynamicExecutor(backend=backend, label=label) if backend == "process" else DynamicExecutor(max_workers=20, label=label)
+        # imap reads the tasks in order and yields their results in the same order
+        keys = deque()
+        def track(tasks):
+            for task in tasks:
+                keys.append(key(task))
+                yield task
         
-        with ThreadPoolExecutor(max_workers=max_worker) as exe:
-            for i in range(max_worker):
-                futures.append(exe.submit(read, i))
-                # read(i)
-        wait(futures)
-        exceptions = [future.exception() for future in futures if future.exception()]
+        for result in executor.imap(function, track(tasks), prefetch):
+            if backend == "process":
+                result = self.__from_worker(result)
+            yield keys.popleft(), result
+        if backend == "process" and self.parse_cache is not None:
+            self.parse_cache.refresh_size()
+
+    def __parse_files_processes(self, files: List[Path], **kwargs) -> Dict[str, ArgumentationInfo]:
+        """
+        Parse `files` using a process pool. The workers send back a columnar
+        payload that is converted back into DataFrames.
+        
+        files: Files to parse
+        
+        return: A dictionary mapping file address to its information
+        """
+        
+        results = {}
+        executor = DynamicExecutor(backend="process")
+        payloads = executor.map(partial(_parse_file_columnar, self, kwargs=kwargs), files, size=file_size)
         
-        if exceptions:
-            raise Exception(exceptions)
+        for file, payload in zip(files, payloads):
+            results[str(file)] = self.__from_worker(payload)
+        if self.parse_cache is not None:
+            self.parse_cache.refresh_size()
         
         return results
 
+    def __from_worker(self, payload: Tuple[bool, Any, Optional[Dict[str, int]]]) -> ArgumentationInfo:
+        """
+        Converts the payload sent back by a process pool worker, adding the cache
+        counters of its copy of the parser to `parse_cache`
+        """
+        
+        is_columnar, result, counters = payload
+        if counters is not None and self.parse_cache is not None:
+            self.parse_cache.add_counters(counters)
+        return info_from_columnar(result) if is_columnar else result
+
+    def __parse_bundle(self, corpus_path: Path, backend: str, **kwargs) -> Dict[str, ArgumentationInfo]:
+        """
+        Parse the accepted files in an archive or compressed file. The members are
+        streamed and each accepted file is parsed once its dependencies are read, while
+        the next members are still being read.
+        
+        corpus_path: Archive, directory inside an archive or compressed file
+        backend: `thread` or `process`
+        
+        return: A dictionary mapping `corpus_path / member name` to its information
+        """
+        
+        return dict(self.iter_parse_dir(corpus_path, backend=backend, **kwargs))
+
+    def __bundle_tasks(self, corpus_path: Path) -> Iterator[Tuple[Path, bytes, List[bytes]]]:
+        """
+        Streams the members of an archive or compressed file. An accepted file is yielded
+        as soon as it and its dependencies are read. The member names are listed first, so
+        only the dependencies of the accepted files in the archive are read, and each one is
+        kept until the last file that needs it is yielded.
+        
+        return: Iterator of (`corpus_path / member name`, content, dependencies)
+        """
+        
+        def accepted(name: str) -> bool:
+            return name.endswith(self.accepted_files)
+        
+        # Amount of accepted files in the archive, not yet yielded, needing each dependency
+        needed_by: Dict[str, int] = {}
+        if self.dependency_files:
+            for name in iter_member_names(corpus_path, accepted):
+                for dependency in self._file_dependencies(PurePosixPath(name)):
+                    needed_by[str(dependency)] = needed_by.get(str(dependency), 0) + 1
+        
+        def accept(name: str) -> bool:
+            return accepted(name) or name in needed_by
+        
+        # Members read but not yet yielded or released, and the dependencies each accepted file needs
+        contents: Dict[str, bytes] = {}
+        waiting: Dict[str, List[str]] = {}
+        
+        def ready(name: str) -> Tuple[Path, bytes, List[bytes]]:
+            dependencies = waiting.pop(name)
+            task = (corpus_path / name, contents.pop(name), [contents[dependency] for dependency in dependencies])
+            for dependency in dependencies:
+                needed_by[dependency] -= 1
+                if not needed_by[dependency]:
+                    del needed_by[dependency], contents[dependency]
+            return task
+        
+        for name, content in iter_members(corpus_path, accept):
+            contents[name] = content
+            if accepted(name):
+                waiting[name] = [str(dependency) for dependency in self._file_dependencies(PurePosixPath(name))]
+                candidates = [name]
+            else:
+                # A dependency may also arrive before the files that need it
+                candidates = [waiting_name for waiting_name, dependencies in waiting.items() if name in dependencies]
+            for candidate in candidates:
+                if all(dependency in contents for dependency in waiting[candidate]):
+                    yield ready(candidate)
+        
+        for name, dependencies in waiting.items():
+            missing = next(dependency for dependency in dependencies if dependency not in contents)
+            raise KeyError(f"Missing '{missing}' in {corpus_path} needed to parse {name}")
+
     def parse_file(self, file: Path, **kwargs) -> ArgumentationInfo:
         """
         Parse the content of `file` returning two DataFrames containing
@@ -82,7 +251,46 @@ class Parser:
           
         return: (argumentative_units, relations, non_argumentative_units)
         """
-        return self.parse(file.read_text(), file, **kwargs)
+        if self.parse_cache is None:
+            return self.parse(file.read_text(), file, **kwargs)
+        
+        dependencies = [dependency.read_bytes() for dependency in self._file_dependencies(file)]
+        return self.parse_contents(file, file.read_bytes(), dependencies, **kwargs)
+    
+    def parse_contents(self, file: Path, content: bytes, dependencies: List[bytes], **kwargs) -> ArgumentationInfo:
+        """
+        Same as `parse_file` but with the content of the file and its dependencies
+        already read. Uses the `parse_cache` if it's set.
+        
+        file: Parsed file, it isn't read
+        content: Content of `file`
+        dependencies: Content of each file in `_file_dependencies(file)`
+        """
+        if self.parse_cache is None:
+            return self._parse_with_dependencies(content.decode(), file, [x.decode() for x in dependencies], **kwargs)
+        
+        key = self.parse_cache.key(self, [content, *dependencies], kwargs)
+        result = self.parse_cache.get(key)
+        if result is None:
+            result = self._parse_with_dependencies(content.decode(), file, [x.decode() for x in dependencies], **kwargs)
+            self.parse_cache.put(key, result)
+        return result
+    
+    def _file_dependencies(self, file: PurePosixPath) -> List[PurePosixPath]:
+        """
+        Returns the files, other than `file`, that are read when parsing `file`.
+        Their content is part of the parse cache key and they are looked up in
+        the same archive when parsing archives. Their extensions must be in
+        `dependency_files`.
+        """
+        return []
+    
+    def _parse_with_dependencies(self, content: str, file: Path, dependencies: List[str], **kwargs) -> ArgumentationInfo:
+        """
+        Parse `content` using the already read `dependencies` instead of reading them
+        from disk.
+        """
+        return self.parse(content, file, **kwargs)
     
     def parse(self, content:str, file: Optional[Path] = None, **kwargs) -> ArgumentationInfo:
         """
@@ -126,31 +334,77 @@ class Parser:
         """
         raise NotImplementedError()
         
-    def export_from_dataframes(self, dest_address: Path, dataframes: Dict[str, ArgumentationInfo], **kwargs):
+    def export_from_dataframes(self, dest_address: Path, dataframes: Union[Dict[str, ArgumentationInfo], Iterable[Tuple[str, ArgumentationInfo]]], batch_size: int = 64, **kwargs):
         """
         Saves the corpus to into dest_address, converting the dataframe version into the corresponding representation.
         
         dest_address: Path where to save the corpus. May not exist
-        dataframes: DataFrame representation of the corpus
+        dataframes: DataFrame representation of the corpus. It can also be an iterator of
+        (key, information), i.e. from `iter_parse_dir`, then the documents are converted
+        and written in groups of `batch_size` as they arrive
+        batch_size: Documents of an iterator converted together by `from_dataframes`, so
+        their sentences are split in a single batch
+        
+        returns: The manifest of the export if it's incremental, see `export_corpus_from_files`
         """
-        representation = self.from_dataframes(dataframes, **kwargs)
-        Parser.export_corpus_from_files(dest_address, representation, **kwargs)
+        if isinstance(dataframes, Mapping):
+            representation = self.from_dataframes(dataframes, **kwargs)
+        else:
+            items = iter(dataframes)
+            batches = iter(lambda: dict(islice(items, batch_size)), {})
+            representation = (item for batch in batches for item in self.from_dataframes(batch, **kwargs).items())
+        return Parser.export_corpus_from_files(dest_address, representation, **kwargs)
     
     @staticmethod
-    def export_corpus_from_files(dest_address: Path, files: Dict[str,AnnotatedRawTextInfo], suffix: str = ".conll", **kwargs):
+    def export_corpus_from_files(dest_address: Path, files: Union[Dict[str,AnnotatedRawTextInfo], Iterable[Tuple[str,AnnotatedRawTextInfo]]], suffix: str = ".conll", compression: Optional[str] = None, incremental: bool = False, **kwargs) -> Optional[ExportManifest]:
         """
         Saves the corpus into dest_address. The files will be named after its key.
         
-        dest_addres: Path where to save the corpus. May not exist
+        dest_addres: Path where to save the corpus. May not exist. If it's named as an
+        archive (.tar.gz, .zip, .tar.zst, ...) the files are written into the archive
         files: Maps file address or file name to its corpus representation and its full text.
+        It can also be an iterator of (file address, representation)
+        compression: Optional compression of each file when `dest_address` is a directory.
+        One of gz, bz2, xz or zst
+        incremental: Only writes the files whose content changed since the last export, keeping
+        a manifest with the hash of every file and document in `dest_address`. Needs a directory
+        
+        returns: The manifest of the export if it's incremental
         """
-        if not dest_address.is_dir():
-            dest_address.mkdir(exist_ok=True, parents=True)
-            
-        for filedir, (annotated_text, raw_text) in files.items():
-            name = Path(filedir).name
-            if suffix: name += suffix
-            dest = dest_address / name
-            dest.write_text(annotated_text)
-            dest = dest_address / (name + ".txt")
-            dest.write_text(raw_text)
+        with ArchiveWriter(dest_address, compression, incremental) as writer:
+            for filedir, (annotated_text, raw_text) in (files.items() if isinstance(files, Mapping) else files):
+                name = Path(filedir).name
+                if suffix: name += suffix
+                annotated_bytes, raw_bytes = annotated_text.encode(), raw_text.encode()
+                writer.write(name, annotated_bytes)
+                writer.write(name + ".txt", raw_bytes)
+                writer.add_document(name, annotated_bytes, raw_bytes)
+        if incremental:
+            logging.info(f"Exported {dest_address}: {writer.written} files written, {writer.skipped} unchanged")
+        return writer.manifest
+
+def _parse_contents_columnar(parser: Parser, task: Tuple[Path, bytes, List[bytes]], kwargs: Dict[str, Any]) -> Tuple[bool, Any, Optional[Dict[str, int]]]:
+    """
+    Same as `_parse_file_columnar` but with the already read (file, content, dependencies)
+    """
+    return _to_parent(parser, lambda: parser.parse_contents(*task, **kwargs))
+
+def _parse_file_columnar(parser: Parser, file: Path, kwargs: Dict[str, Any]) -> Tuple[bool, Any, Optional[Dict[str, int]]]:
+    """
+    Process pool worker. Parses `file` with `parser` and returns the result in
+    columnar form when it is an ArgumentationInfo.
+    
+    returns: (if the result is columnar, result, parse cache counters added by the parse)
+    """
+    return _to_parent(parser, lambda: parser.parse_file(file, **kwargs))
+
+def _to_parent(parser: Parser, parse: Callable[[], Any]) -> Tuple[bool, Any, Optional[Dict[str, int]]]:
+    # The worker has its own copy of the parse cache, its counters are sent back
+    before = parser.parse_cache.counters() if parser.parse_cache is not None else None
+    result = parse()
+    counters = None
+    if before is not None:
+        counters = {name: value - before[name] for name, value in parser.parse_cache.counters().items()}
+    if is_argumentation_info(result):
+        return True, info_to_columnar(result), counters
+    return False, result, counters
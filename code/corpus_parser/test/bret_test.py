@@ -4,7 +4,11 @@ from pathlib import Path
 sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
 
 
+import tarfile
+import pandas as pd
+import pytest
 from corpus_parser.bret_parser import BretParser
+from corpus_parser.parse_cache import ParseCache
 
 
 def test_parse():
@@ -25,3 +29,203 @@ def test_from_dataframe():
     result2 = parser.from_dataframes(result)
     key = next(iter(result2.keys()))
     result3 = parser.parse(result2[key][0], file=Path(key))
+
+
+def test_parse_dir_processes():
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    result = parser.parse_dir(base)
+    process_result = parser.parse_dir(base, backend="process")
+    assert result.keys() == process_result.keys()
+    for key, frames in result.items():
+        for frame, process_frame in zip(frames, process_result[key]):
+            pd.testing.assert_frame_equal(frame, process_frame)
+
+
+def test_parse_dir_as_store():
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    result = parser.parse_dir(base)
+    store = parser.parse_dir(base, as_store=True)
+    assert set(store.keys()) == set(result.keys())
+    for key, frames in result.items():
+        for frame, store_frame in zip(frames, store[key]):
+            pd.testing.assert_frame_equal(frame, store_frame, check_dtype=False)
+
+
+def test_parse_cache(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    parser.parse_cache = ParseCache(tmp_path)
+    result = parser.parse_dir(base)
+    cached_result = parser.parse_dir(base)
+    assert parser.parse_cache.stats()["hits"] == len(result)
+    for key, frames in result.items():
+        for frame, cached_frame in zip(frames, cached_result[key]):
+            pd.testing.assert_frame_equal(frame, cached_frame)
+
+
+def test_parse_cache_process(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    parser.parse_cache = ParseCache(tmp_path)
+    result = parser.parse_dir(base, backend="process")
+    stats = parser.parse_cache.stats()
+    assert stats["misses"] == stats["writes"] == len(result)
+    size = stats["size"]
+    assert size == sum(entry.stat().st_size for entry in tmp_path.glob("*.npz"))
+
+    cached_result = parser.parse_dir(base, backend="process")
+    assert parser.parse_cache.stats()["hits"] == len(result)
+    for key, frames in result.items():
+        for frame, cached_frame in zip(frames, cached_result[key]):
+            pd.testing.assert_frame_equal(frame, cached_frame)
+
+    # Overwriting an entry doesn't change the size
+    frames = next(iter(result.values()))
+    parser.parse_cache.put("entry", frames)
+    size = parser.parse_cache.stats()["size"]
+    parser.parse_cache.put("entry", frames)
+    assert parser.parse_cache.stats()["size"] == size == sum(entry.stat().st_size for entry in tmp_path.glob("*.npz"))
+    for frame, cached_frame in zip(frames, parser.parse_cache.get("entry")):
+        pd.testing.assert_frame_equal(frame, cached_frame)
+
+
+def test_parse_archive(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    archive = tmp_path / "corpus.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(base, arcname="corpus")
+
+    parser = BretParser()
+    result = parser.parse_dir(base)
+    archive_result = parser.parse_dir(archive)
+    assert set(archive_result.keys()) == {str(archive / "corpus" / Path(key).name) for key in result}
+    for key, frames in result.items():
+        for frame, archive_frame in zip(frames, archive_result[str(archive / "corpus" / Path(key).name)]):
+            pd.testing.assert_frame_equal(frame, archive_frame)
+
+
+class SharedTextParser(BretParser):
+    """
+    Every .ann file is annotated over essay001.txt
+    """
+
+    def _file_dependencies(self, file):
+        return [file.with_name("essay001.txt")]
+
+
+def test_parse_archive_dependencies(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    archive = tmp_path / "corpus.tar"
+    with tarfile.open(archive, "w") as tar:
+        for name in ("essay001.ann", "essay001.txt", "essay002.txt", "stray.txt"):
+            tar.add(base / name.replace("stray", "essay003"), arcname=name)
+        # Arrives after the file sharing its dependency was yielded
+        tar.add(base / "essay001.ann", arcname="copy.ann")
+
+    parser = SharedTextParser()
+    result = parser.parse_dir(archive)
+    assert sorted(Path(key).name for key in result) == ["copy.ann", "essay001.ann"]
+    for frame, copy_frame in zip(result[str(archive / "essay001.ann")], result[str(archive / "copy.ann")]):
+        pd.testing.assert_frame_equal(frame, copy_frame)
+
+    with tarfile.open(archive, "w") as tar:
+        tar.add(base / "essay002.ann", arcname="essay002.ann")
+    with pytest.raises(KeyError, match="essay001.txt"):
+        parser.parse_dir(archive)
+
+
+def test_iter_parse_dir(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    result = parser.parse_dir(base)
+    archive = tmp_path / "corpus.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for file in sorted(base.iterdir()):
+            tar.add(file, arcname=file.name)
+
+    for backend in ("thread", "process"):
+        streamed = list(parser.iter_parse_dir(base, prefetch=1, backend=backend))
+        assert [key for key, _ in streamed] == sorted(result.keys())
+        for key, frames in streamed:
+            for frame, streamed_frame in zip(result[key], frames):
+                pd.testing.assert_frame_equal(frame, streamed_frame)
+
+    streamed = dict(parser.iter_parse_dir(archive, prefetch=2))
+    assert sorted(Path(key).name for key in streamed) == sorted(Path(key).name for key in result)
+
+
+def test_incremental_export(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    representation = parser.from_dataframes(parser.parse_dir(base))
+    dest = tmp_path / "export"
+
+    manifest = parser.export_corpus_from_files(dest, representation, suffix=".ann", incremental=True)
+    assert manifest.changed_documents() == manifest.documents
+    mtimes = {file.name: file.stat().st_mtime_ns for file in dest.iterdir()}
+
+    key = next(iter(representation))
+    annotated, raw = representation[key]
+    representation[key] = annotated, raw + "\n"
+    manifest = parser.export_corpus_from_files(dest, representation, suffix=".ann", incremental=True)
+    changed_name = Path(key).name + ".ann"
+    assert list(manifest.changed_documents()) == [changed_name]
+    assert (dest / (changed_name + ".txt")).read_text() == raw + "\n"
+    for file in dest.iterdir():
+        if file.name not in (changed_name + ".txt", ".manifest.json"):
+            assert file.stat().st_mtime_ns == mtimes[file.name]
+
+
+def test_failed_incremental_export(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    representation = parser.from_dataframes(parser.parse_dir(base))
+    dest = tmp_path / "export"
+    parser.export_corpus_from_files(dest, representation, suffix=".ann", incremental=True)
+    manifest = (dest / ".manifest.json").read_text()
+
+    def failing():
+        for i, (key, (annotated, raw)) in enumerate(representation.items()):
+            if i == 1:
+                raise ValueError("failed")
+            yield key, (annotated, raw + "\n")
+    with pytest.raises(ValueError):
+        parser.export_corpus_from_files(dest, failing(), suffix=".ann", incremental=True)
+    # The manifest of the last complete export is kept, the rewritten file is detected by its size
+    assert (dest / ".manifest.json").read_text() == manifest
+    manifest = parser.export_corpus_from_files(dest, representation, suffix=".ann", incremental=True)
+    assert list(manifest.changed_documents()) == []
+    for key, (annotated, raw) in representation.items():
+        assert (dest / (Path(key).name + ".ann.txt")).read_text() == raw
+
+
+def test_from_dataframe_text():
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    parser = BretParser()
+    result = parser.parse_dir(base)
+    for key, (annotated, text) in parser.from_dataframes(result).items():
+        assert text == Path(key).with_suffix(".txt").read_text()
+        units, _, _ = parser.parse(annotated, Path(key), original_text=text)
+        pd.testing.assert_frame_equal(units, result[key][0])
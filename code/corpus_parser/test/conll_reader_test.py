@@ -0,0 +1,164 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import os
+import pytest
+from corpus_parser.conll_reader import ConllSentenceReader
+from segmenter.models.segmenter_exporter import convert_bio_to_bioes, convert_to_tuples
+
+CONTENT = "\n\nThe\tO\ncat\tB-Claim\n\n\nsat\tB-Claim\n.\tO\n\nEnd\tO\n\n\n"
+SENTENCES = ["The\tO\ncat\tB-Claim", "sat\tB-Claim\n.\tO", "End\tO"]
+
+
+def legacy_convert_to_tuples(data: Path, all_words: set, all_tags: set, all_chars: set, bioes=True, use_sentence_split=False):
+    """
+    Line by line reading used by `convert_to_tuples` before `ConllSentenceReader`
+    """
+    tags = []
+    current_paragraph_tags = []
+    current_paragraph_words = []
+    for line in data.read_text().splitlines():
+        if not line:
+            if use_sentence_split:
+                if bioes:
+                    current_paragraph_tags = convert_bio_to_bioes(current_paragraph_tags)
+                all_tags.update(current_paragraph_tags)
+                current_paragraph_tags.append("")
+                current_paragraph_words.append("")
+                tags.append([x for x in zip(current_paragraph_words, current_paragraph_tags)])
+                current_paragraph_tags = []
+                current_paragraph_words = []
+            else:
+                current_paragraph_tags.append("")
+                current_paragraph_words.append("")
+            continue
+        word, annotation = line.split("\t")
+        if len(word) >= 3 and word[-3] == "_":
+            word = word[:-3]
+        all_words.add(word)
+        all_chars.update(word)
+        current_paragraph_tags.append(annotation)
+        current_paragraph_words.append(word)
+    if current_paragraph_words:
+        if bioes:
+            current_paragraph_tags = convert_bio_to_bioes(current_paragraph_tags)
+        all_tags.update(current_paragraph_tags)
+        tags.append([x for x in zip(current_paragraph_words, current_paragraph_tags)])
+    return tags
+
+
+def test_sentences(tmp_path):
+    file = tmp_path / "corpus.conll"
+    file.write_text(CONTENT)
+
+    with ConllSentenceReader(file) as reader:
+        assert len(reader) == 3
+        assert list(reader) == SENTENCES
+        assert reader.lines(1) == ["sat\tB-Claim", ".\tO"]
+        assert reader.raw(2) == b"End\tO"
+        assert [reader.blank_lines_before(i) for i in range(len(reader))] == [2, 2, 1]
+        assert reader.trailing_blank_lines() == 2
+
+    file.write_text("")
+    with ConllSentenceReader(file) as reader:
+        assert len(reader) == 0
+        assert reader.trailing_blank_lines() == 0
+
+    file.write_text("\n\n")
+    with ConllSentenceReader(file) as reader:
+        assert len(reader) == 0
+        assert reader.trailing_blank_lines() == 2
+
+    file.write_text("A\tO")
+    with ConllSentenceReader(file) as reader:
+        assert list(reader) == ["A\tO"]
+        assert reader.blank_lines_before(0) == 0
+        assert reader.trailing_blank_lines() == 0
+
+
+def test_slices_and_negative_indexes(tmp_path):
+    file = tmp_path / "corpus.conll"
+    file.write_text(CONTENT)
+
+    with ConllSentenceReader(file) as reader:
+        assert reader[-1] == SENTENCES[-1]
+        assert reader[-3] == SENTENCES[0]
+        assert reader[1:] == SENTENCES[1:]
+        assert reader[::-1] == SENTENCES[::-1]
+        assert reader[-2:] == SENTENCES[-2:]
+        assert reader[5:] == []
+        with pytest.raises(IndexError):
+            reader[3]
+
+
+def test_crlf(tmp_path):
+    file = tmp_path / "corpus.conll"
+    file.write_bytes(CONTENT.replace("\n", "\r\n").encode())
+
+    with ConllSentenceReader(file) as reader:
+        assert list(reader) == SENTENCES
+        assert [reader.blank_lines_before(i) for i in range(len(reader))] == [2, 2, 1]
+        assert reader.trailing_blank_lines() == 2
+        assert reader.raw(1) == b"sat\tB-Claim\r\n.\tO"
+
+    with ConllSentenceReader(file, content=file.read_bytes()) as reader:
+        assert list(reader) == SENTENCES
+
+
+def test_persisted_index(tmp_path, monkeypatch):
+    file = tmp_path / "corpus.conll"
+    file.write_text(CONTENT)
+
+    with ConllSentenceReader(file, persist_index=True) as reader:
+        spans = reader.spans.copy()
+    index_path = file.with_name(file.name + ConllSentenceReader.INDEX_SUFFIX)
+    assert index_path.exists()
+
+    # The saved index is reused while the file doesn't change
+    build_index = ConllSentenceReader._ConllSentenceReader__build_index
+    def fail(self):
+        raise AssertionError("The index was rebuilt")
+    monkeypatch.setattr(ConllSentenceReader, "_ConllSentenceReader__build_index", fail)
+    with ConllSentenceReader(file) as reader:
+        assert (reader.spans == spans).all()
+        assert list(reader) == SENTENCES
+    monkeypatch.setattr(ConllSentenceReader, "_ConllSentenceReader__build_index", build_index)
+
+    # A different size invalidates the index
+    file.write_text(CONTENT + "Last\tO\n")
+    with ConllSentenceReader(file, persist_index=True) as reader:
+        assert list(reader) == SENTENCES + ["Last\tO"]
+    with ConllSentenceReader(file) as reader:
+        assert len(reader) == 4
+
+    # Same size but a different modification time
+    file.write_text(CONTENT + "Next\tO\n")
+    stat = file.stat()
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with ConllSentenceReader(file) as reader:
+        assert list(reader) == SENTENCES + ["Next\tO"]
+
+    # A broken index is ignored
+    index_path.write_bytes(b"broken")
+    with ConllSentenceReader(file) as reader:
+        assert len(reader) == 4
+
+
+@pytest.mark.parametrize("use_sentence_split", [False, True])
+def test_convert_to_tuples_matches_legacy(tmp_path, use_sentence_split):
+    base = (Path(__file__) / ".." / "test_data" / "test_conll").resolve()
+    files = sorted(base.glob("*.conll"))
+    for i, content in enumerate([CONTENT, CONTENT.replace("\n", "\r\n"), "A\tO", "\n\nA\tB-P\nb_LN\tI-P\n\n\n"]):
+        file = tmp_path / f"corpus{i}.conll"
+        file.write_bytes(content.encode())
+        files.append(file)
+
+    for file in files:
+        expected_sets = set(), set(), set()
+        expected = legacy_convert_to_tuples(file, *expected_sets, use_sentence_split=use_sentence_split)
+        result_sets = set(), set(), set()
+        result = convert_to_tuples(file, *result_sets, use_sentence_split=use_sentence_split)
+        assert result == expected, file
+        assert result_sets == expected_sets
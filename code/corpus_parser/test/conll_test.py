@@ -3,6 +3,11 @@ from pathlib import Path
 
 sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
 
+import re
+import pandas as pd
+import pytest
+import corpus_parser.conll_parser as conll_parser
+from corpus_parser.bret_parser import BretParser
 from corpus_parser.conll_parser import ConllParser
 
 
@@ -14,7 +19,9 @@ def test_parse():
     result = parser.parse_dir(base)
     result1, result2, result3 = next(x for x in result.values())
 
-def test_from_dataframe():
+def test_from_dataframe(monkeypatch):
+    monkeypatch.setattr(conll_parser, "word_tokenize", split_words)
+    monkeypatch.setattr(conll_parser, "sent_tokenize", split_sentences)
     base = Path(__file__) / ".." / "test_data" / "test_conll"
     base = base.resolve()
 
@@ -22,4 +29,211 @@ def test_from_dataframe():
     result = parser.parse_dir(base)
     result2 = parser.from_dataframes(result)
     key = next(iter(result2.keys()))
-    result3 = parser.parse(result2[key][0], file=Path(key))
\ No newline at end of file
+    result3 = parser.parse(result2[key][0], file=Path(key))
+
+def test_parse_dir_processes():
+    base = Path(__file__) / ".." / "test_data" / "test_conll"
+    base = base.resolve()
+
+    parser = ConllParser()
+    result = parser.parse_dir(base)
+    process_result = parser.parse_dir(base, backend="process")
+    assert result.keys() == process_result.keys()
+    for key, frames in result.items():
+        for frame, process_frame in zip(frames, process_result[key]):
+            pd.testing.assert_frame_equal(frame, process_frame)
+
+
+def test_iter_documents(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_conll"
+    base = base.resolve()
+
+    parser = ConllParser()
+    documents = [file.read_text().strip("\n") for file in sorted(base.iterdir())]
+    corpus = tmp_path / "train.conll"
+    corpus.write_text("\n\n\n".join(documents) + "\n")
+
+    results = list(parser.iter_documents(corpus, separator_lines=2))
+    assert len(results) == len(documents)
+    for document, result in zip(documents, results):
+        for frame, document_frame in zip(parser.parse(document), result):
+            pd.testing.assert_frame_equal(frame, document_frame)
+
+    tags = list(parser.iter_documents(corpus, get_tags=True, separator_lines=2))
+    assert [len(x) for x in tags] == [len(parser.parse(x, get_tags=True)) for x in documents]
+
+
+
+def legacy_from_dataframes(parser, dataframes, source_language="english", exact_text=True):
+    """
+    Reference copy of the quadratic ConllParser.from_dataframes exporter.
+    The int casts keep it working with newer pandas versions.
+    """
+    results = {}
+    default_gap = " "
+    for file_path_str, (argumentative_units, relations, non_argumentative_units) in dataframes.items():
+        tags_info = []
+        all_units = pd.concat([argumentative_units, non_argumentative_units], sort=True)
+        all_units.sort_values(by="prop_init", inplace=True)
+        all_units = all_units.reindex(columns=["prop_id", "prop_type", "prop_init", "prop_end", "prop_text"])
+        max_length = int(all_units["prop_end"].max())
+        text = default_gap*max_length if exact_text else ""
+        for index, (prop_id, prop_type, prop_init, prop_end, prop_text) in all_units.iterrows():
+            prop_init, prop_end = int(prop_init), int(prop_end)
+            prop_tokens = conll_parser.word_tokenize(prop_text, language=source_language)
+            if exact_text:
+                text = text[:prop_init] + prop_text + text[prop_end:]
+            else:
+                text += default_gap.join(prop_tokens) + default_gap
+            if pd.notna(prop_type):
+                for i,tok in enumerate(prop_tokens):
+                    bio_tag = "B" if i == 0 else "I"
+                    relation = relations[relations["prop_id_source"] == prop_id]
+                    if len(relation) == 1:
+                        relation_type = relation["relation_type"].values[0]
+                        relation_distance = relation["prop_id_target"].values[0] - relation["prop_id_source"].values[0]
+                    elif len(relation) == 0:
+                        relation_type = "none"
+                        relation_distance = "none"
+                    else:
+                        relation_type = "none"
+                        relation_distance = - relation["prop_id_source"].values[0]
+                    tags_info.append({
+                        "tok": tok,
+                        "bio_tag": bio_tag,
+                        "prop_type": prop_type,
+                        "relation_type": relation_type,
+                        "relation_distance": relation_distance
+                    })
+                    tags_info[-1]["full_tag"] = parser.TAG_FORMAT.format_map(tags_info[-1]).replace("-none", "")
+            else:
+                if all(x == "\n" for x in prop_text):
+                    for x in prop_text:
+                        tags_info.append({"tok":"\n", "bio_tag":""})
+                else:
+                    for tok in prop_tokens:
+                        tags_info.append({
+                            "tok": tok,
+                            "bio_tag": "O",
+                            "prop_type": "none",
+                            "relation_type": "none",
+                            "relation_distance": "none"
+                        })
+                        tags_info[-1]["full_tag"] = "O"
+        tags_info = parser._ConllParser__split_sentences(tags_info, source_language)
+        tags_info = parser.fix_annotations(tags_info)
+        results[file_path_str] = parser.get_conll_text_from_annotation_dicts(tags_info), text
+    return results
+
+
+@pytest.mark.parametrize("corpus_parser, data_dir", [(ConllParser(), "test_conll"), (BretParser(), "test_bret")])
+@pytest.mark.parametrize("exact_text", [True, False])
+def test_from_dataframe_matches_legacy(monkeypatch, corpus_parser, data_dir, exact_text):
+    # Tokenizers without external resources, the exporters only need them to be deterministic
+    monkeypatch.setattr(conll_parser, "word_tokenize", lambda text, language="english": re.findall(r"\w+|[^\w\s]+", text))
+    monkeypatch.setattr(conll_parser, "sent_tokenize", lambda text, language="english": re.split(r"(?<=[.!?]) ", text))
+
+    base = Path(__file__) / ".." / "test_data" / data_dir
+    base = base.resolve()
+
+    parser = ConllParser()
+    result = corpus_parser.parse_dir(base)
+    expected = legacy_from_dataframes(parser, result, exact_text=exact_text)
+    assert parser.from_dataframes(result, exact_text=exact_text) == expected
+
+
+def test_annotation_sequence(monkeypatch):
+    monkeypatch.setattr(conll_parser, "word_tokenize", lambda text, language="english": re.findall(r"\w+|[^\w\s]+", text))
+    monkeypatch.setattr(conll_parser, "sent_tokenize", lambda text, language="english": re.split(r"(?<=[.!?]) ", text))
+
+    base = Path(__file__) / ".." / "test_data" / "test_conll"
+    base = base.resolve()
+
+    parser = ConllParser()
+    for file in base.iterdir():
+        content = file.read_text()
+        tags = parser.parse(content, get_tags=True)
+        sequence = parser.parse(content, get_tags=True, as_sequence=True)
+        assert len(sequence) == len(tags)
+        assert parser.get_conll_text_from_annotation_dicts(sequence) == parser.get_conll_text_from_annotation_dicts(tags)
+        assert parser.get_text_from_annotation(sequence) == parser.get_text_from_annotation(tags)
+
+    result = parser.parse_dir(base)
+    for (tags, text), (sequence, sequence_text) in zip(parser.from_dataframes(result, get_tags=True).values(), parser.from_dataframes(result, get_tags=True, as_sequence=True).values()):
+        assert sequence.to_dicts() == tags
+        assert text == sequence_text
+        assert parser.fix_annotations(sequence).to_dicts() == parser.fix_annotations(tags)
+
+    # The vocabularies are shared inside a corpus but not between corpora
+    first, second = (list(parser.from_dataframes(result, get_tags=True, as_sequence=True).values()) for _ in range(2))
+    assert all(sequence.tokens is first[0][0].tokens for sequence, _ in first)
+    assert first[0][0].tokens is not second[0][0].tokens
+
+
+def test_parse_spans():
+    content = "\n".join([
+        "I\tO", "think_en\tO",
+        "cars\tB-Claim-supports-1", "pollute\tI-Claim-supports-1",
+        "",
+        "so\tI-Premise", "what\tI-Premise",
+        "x\tB-Premise", "y\tB-MajorClaim",
+    ])
+    argumentative_units, relations, non_argumentative_units = ConllParser().parse(content)
+
+    assert argumentative_units["prop_text"].tolist() == ["cars pollute", "so what", "x", "y"]
+    assert argumentative_units["prop_type"].tolist() == ["Claim", "Premise", "Premise", "MajorClaim"]
+    assert argumentative_units["prop_init"].tolist() == [8, 22, 30, 32]
+    assert argumentative_units["prop_end"].tolist() == [20, 29, 31, 33]
+    assert non_argumentative_units["prop_text"].tolist() == ["I think", "\n"]
+    assert non_argumentative_units["prop_init"].tolist() == [0, 21]
+    assert relations[["prop_id_source", "prop_id_target"]].values.tolist() == [[1, 2]]
+
+def test_split_sentences_batch(monkeypatch):
+    monkeypatch.setattr(conll_parser, "word_tokenize", lambda text, language="english": re.findall(r"\w+|[^\w\s]+", text))
+    monkeypatch.setattr(conll_parser, "sent_tokenize", lambda text, language="english": re.split(r"(?<=[.!?]) ", text))
+    base = (Path(__file__) / ".." / "test_data" / "test_bret").resolve()
+
+    parser = ConllParser()
+    dataframes = BretParser().parse_dir(base)
+    together = parser.from_dataframes(dataframes, get_tags=True)
+    for key, frames in dataframes.items():
+        tags, text = parser.from_dataframes({key: frames}, get_tags=True)[key]
+        assert together[key] == (tags, text)
+        sentences = " ".join(tag["tok"] for tag in tags).split(" \n ")
+        assert all(re.fullmatch(r"[^\n]*[.!?]|[^\n.!?]*", sentence.strip()) for sentence in sentences)
+
+
+def split_words(text, language="english"):
+    return re.findall(r"\w+|[^\w\s]+", text)
+
+
+def split_sentences(text, language="english"):
+    # Module level so the sentence workers can receive it
+    return re.split(r"(?<=[.!?]) ", text)
+
+
+def test_export_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(conll_parser, "word_tokenize", split_words)
+    monkeypatch.setattr(conll_parser, "sent_tokenize", split_sentences)
+    batches = []
+    split_batch = conll_parser.sent_span_tokenize_batch
+    def counted_split_batch(texts, *args, **kwargs):
+        batches.append(len(texts))
+        return split_batch(texts, *args, **kwargs)
+    monkeypatch.setattr(conll_parser, "sent_span_tokenize_batch", counted_split_batch)
+    base = (Path(__file__) / ".." / "test_data" / "test_bret").resolve()
+
+    parser = ConllParser()
+    dataframes = BretParser().parse_dir(base)
+    parser.export_from_dataframes(tmp_path / "together", dataframes)
+    # The iterator is converted in batches of documents
+    batches.clear()
+    parser.export_from_dataframes(tmp_path / "batches", iter(dataframes.items()), batch_size=2)
+    assert batches == [2, 1]
+    # With more texts than workers the sentences are split in processes
+    batches.clear()
+    parser.export_from_dataframes(tmp_path / "workers", iter(dataframes.items()), batch_size=3, sentence_workers=2)
+    assert batches == [3]
+    for file in (tmp_path / "together").iterdir():
+        assert (tmp_path / "batches" / file.name).read_text() == file.read_text()
+        assert (tmp_path / "workers" / file.name).read_text() == file.read_text()
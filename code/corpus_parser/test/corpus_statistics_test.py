@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import shutil
+from corpus_parser.conll_parser import ConllParser
+from corpus_parser.corpus_statistics import corpus_statistics, statistics_file
+
+
+def test_corpus_statistics(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_conll"
+    base = base.resolve()
+    corpus = tmp_path / "corpus"
+    shutil.copytree(base, corpus)
+
+    statistics = corpus_statistics(corpus, backend="thread")
+    result = ConllParser().parse_dir(corpus)
+    assert statistics.documents == len(result)
+    assert statistics.max_amount_doc == max(len(units) for units, _, _ in result.values())
+    assert sum(statistics.proposition_sizes.values()) == sum(len(units) for units, _, _ in result.values())
+    assert statistics_file(corpus).exists()
+
+    cached = corpus_statistics(corpus, backend="thread")
+    assert cached.to_dict() == statistics.to_dict()
+
+    next(corpus.iterdir()).unlink()
+    assert corpus_statistics(corpus, backend="thread").documents == statistics.documents - 1
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import re
+import pandas as pd
+import pytest
+import corpus_parser.conll_parser as conll_parser
+from corpus_parser.bret_parser import BretParser
+from corpus_parser.conll_parser import ConllParser
+from corpus_parser.parquet_parser import ParquetParser
+
+
+def test_export_and_parse(monkeypatch, tmp_path):
+    monkeypatch.setattr(conll_parser, "word_tokenize", lambda text, language="english": re.findall(r"\w+|[^\w\s]+", text))
+    monkeypatch.setattr(conll_parser, "sent_tokenize", lambda text, language="english": re.split(r"(?<=[.!?]) ", text))
+
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    result = BretParser().parse_dir(base)
+    parser = ParquetParser()
+    parser.export_from_dataframes(tmp_path / "corpus", result)
+
+    parquet_result = parser.parse_dir(tmp_path / "corpus")
+    assert list(parquet_result.keys()) == list(result.keys())
+    for key, frames in result.items():
+        for frame, parquet_frame in zip(frames, parquet_result[key]):
+            pd.testing.assert_frame_equal(frame, parquet_frame)
+
+    assert parser.read_tags(tmp_path / "corpus") == ConllParser().from_dataframes(result, get_tags=True)
+
+
+def test_incremental_not_supported(tmp_path):
+    base = Path(__file__) / ".." / "test_data" / "test_bret"
+    base = base.resolve()
+
+    with pytest.raises(ValueError):
+        ParquetParser().export_from_dataframes(tmp_path / "corpus", BretParser().parse_dir(base), incremental=True)
+    assert not (tmp_path / "corpus").exists()
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import shutil
+import tarfile
+import pandas as pd
+import corpus_parser.parser as parser_module
+from corpus_parser.bret_parser import BretParser
+from corpus_parser.conll_parser import ConllParser
+from corpus_parser.unified_parser import UnifiedParser
+
+
+def test_parse_mixed_dir(tmp_path):
+    base = (Path(__file__) / ".." / "test_data").resolve()
+    corpus = tmp_path / "corpus"
+    shutil.copytree(base / "test_bret", corpus)
+    for file in (base / "test_conll").iterdir():
+        shutil.copy(file, corpus / file.name)
+    # Without a known suffix the format is guessed from the first line
+    shutil.copy(base / "test_conll" / "D14-1002-fexp-corpus.conll", corpus / "sniffed.tsv")
+
+    expected = {}
+    for parser, directory in ((BretParser(), base / "test_bret"), (ConllParser(), base / "test_conll")):
+        expected.update({Path(key).name: value for key, value in parser.parse_dir(directory).items()})
+    expected["sniffed.tsv"] = expected["D14-1002-fexp-corpus.conll"]
+
+    parser = UnifiedParser(accepted_files=(".ann", ".conll", ".tsv"))
+    for backend in ("thread", "process"):
+        result = parser.parse_dir(corpus, backend=backend)
+        assert sorted(Path(key).name for key in result) == sorted(expected)
+        for key, frames in result.items():
+            for frame, expected_frame in zip(frames, expected[Path(key).name]):
+                pd.testing.assert_frame_equal(frame, expected_frame)
+    assert parser.parser_for(corpus / "sniffed.tsv") is parser.conll_parser
+
+
+def test_parse_conll_archive(tmp_path, monkeypatch):
+    base = (Path(__file__) / ".." / "test_data" / "test_conll").resolve()
+    archive = tmp_path / "corpus.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for file in sorted(base.iterdir()):
+            tar.add(file, arcname=file.name)
+            # The raw text saved next to each exported document
+            raw = tmp_path / (file.name + ".txt")
+            raw.write_text(" ".join(line.split("\t")[0] for line in file.read_text().splitlines()))
+            tar.add(raw, arcname=raw.name)
+
+    read = []
+    iter_members = parser_module.iter_members
+    def recording_iter_members(path, accept):
+        for name, content in iter_members(path, accept):
+            read.append(name)
+            yield name, content
+    monkeypatch.setattr(parser_module, "iter_members", recording_iter_members)
+
+    expected = {Path(key).name: value for key, value in ConllParser().parse_dir(base).items()}
+    result = UnifiedParser().parse_dir(archive)
+    assert sorted(Path(key).name for key in result) == sorted(expected)
+    for key, frames in result.items():
+        for frame, expected_frame in zip(frames, expected[Path(key).name]):
+            pd.testing.assert_frame_equal(frame, expected_frame)
+    # No accepted file needs the .conll.txt members, so they are never read nor kept
+    assert read == sorted(expected)
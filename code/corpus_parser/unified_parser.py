@@ -1,26 +1,46 @@
 import re
+import threading
 from corpus_parser.bret_parser import BretParser
 from corpus_parser.conll_parser import ConllParser
 import logging
-from pathlib import Path
-from typing import Dict, Iterable, Optional
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional
 
 from .parser import AnnotatedRawTextInfo, ArgumentationInfo, Parser
+from utils.archive_utils import is_bundle
 
 
 class UnifiedParser(Parser):
     """
     Automatically selects te propper way to parse a file.
     The selection can be manual by setting the selected_parser property or
-    automatic by parsing a file.
+    automatic, per file, by its suffix or its first line. The automatic
+    decision of each file is cached.
     """
     
+    # Bytes read from a file without a known suffix to guess its format
+    SNIFF_SIZE = 4096
     
     def __init__(self, accepted_files: Iterable[str] = (".conll", ".ann")) -> None:
         super().__init__(accepted_files)
         self.conll_parser = ConllParser()
         self.bret_parser = BretParser()
         self.selected_parser = None
+        self.dependency_files = self.bret_parser.dependency_files
+        # Parser selected automatically, a different selected_parser was set manually
+        self.__automatic_parser = None
+        self.__file_parsers: Dict[str, Parser] = {}
+        self.__lock = threading.Lock()
+    
+    def __getstate__(self):
+        # Locks can't be sent to the process pool workers
+        state = self.__dict__.copy()
+        del state["_UnifiedParser__lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
     
     def __get_parser(self, content: str, file: Optional[Path] = None) -> Parser:
         """
@@ -31,14 +51,66 @@ class UnifiedParser(Parser):
                 return self.conll_parser
             if file.suffix == ".ann":
                 return self.bret_parser
-            raise Exception(f"Couldn't guess parser for file {file}")
-        line = content.splitlines()[0]
+        lines = [line for line in content.splitlines() if line.strip()]
+        if not lines:
+            raise Exception(f"Couldn't guess parser for empty {'file ' + str(file) if file else 'content'}")
+        line = lines[0]
         if self.bret_parser.argumentative_unit_regex.match(line) \
             or self.bret_parser.relation_regex.match(line):
             return self.bret_parser
         if self.conll_parser.annotation_regex.match(line):
             return self.conll_parser
         raise Exception(f"Couldn't guess parser for line {line}")
+    
+    def parser_for(self, file: Path, content: Optional[str] = None) -> Parser:
+        """
+        Returns the parser of `file`, from its suffix or its first line. The decision is
+        cached per file.
+        
+        file: File to parse
+        content: Content of the file. If it isn't given and the suffix is unknown only
+        the first bytes of the file are read
+        """
+        if self.selected_parser is not None and self.selected_parser is not self.__automatic_parser:
+            return self.selected_parser
+        
+        key = str(file)
+        parser = self.__file_parsers.get(key)
+        if parser is None:
+            if content is None and file.suffix not in (".conll", ".ann"):
+                with file.open("rb") as stream:
+                    content = stream.read(self.SNIFF_SIZE).decode(errors="ignore")
+            parser = self.__get_parser(content or "", file)
+            with self.__lock:
+                self.__file_parsers[key] = parser
+                if self.selected_parser is None:
+                    # Used by from_dataframes
+                    self.selected_parser = self.__automatic_parser = parser
+        return parser
+    
+    def parse_dir(self, corpus_path: Path, backend: str = "thread", as_store: bool = False, **kwargs) -> Dict[str, ArgumentationInfo]:
+        """
+        Parse the files in `corpus_path`, which may mix formats. The files are grouped by
+        their parser and each group is parsed in parallel by its parser, see `Parser.parse_dir`
+        
+        return: A dictionary mapping file address to its information
+        """
+        
+        if as_store or is_bundle(corpus_path):
+            # Archive members are dispatched one by one in _parse_with_dependencies
+            return super().parse_dir(corpus_path, backend=backend, as_store=as_store, **kwargs)
+        
+        files = [file for file in corpus_path.iterdir() if self._should_read_file(file)]
+        groups: Dict[Parser, List[Path]] = {}
+        for file in files:
+            groups.setdefault(self.parser_for(file), []).append(file)
+        
+        results = {}
+        for parser, group in groups.items():
+            if self.parse_cache is not None and parser.parse_cache is None:
+                parser.parse_cache = self.parse_cache
+            results.update(parser.parse_files(group, backend=backend, **kwargs))
+        return {str(file): results[str(file)] for file in files}
         
     def parse(self, content: str, file: Optional[Path] = None, **kwargs) -> ArgumentationInfo:
         """
@@ -68,9 +140,24 @@ class UnifiedParser(Parser):
           
         return: (argumentative_units, relations, non_argumentative_units)
         """
-        if not self.selected_parser:
-            self.selected_parser = self.__get_parser(content, file)
-        return self.selected_parser.parse(content, file=file, **kwargs)
+        parser = self.parser_for(file, content) if file is not None else self.__content_parser(content)
+        return parser.parse(content, file=file, **kwargs)
+    
+    def __content_parser(self, content: str) -> Parser:
+        if self.selected_parser is None:
+            self.selected_parser = self.__automatic_parser = self.__get_parser(content)
+        return self.selected_parser
+
+    def _file_dependencies(self, file: PurePosixPath) -> List[PurePosixPath]:
+        if file.suffix == ".ann":
+            return self.bret_parser._file_dependencies(file)
+        return []
+
+    def _parse_with_dependencies(self, content: str, file: Path, dependencies: List[str], **kwargs) -> ArgumentationInfo:
+        parser = self.parser_for(file, content)
+        if dependencies:
+            return parser._parse_with_dependencies(content, file, dependencies, **kwargs)
+        return parser.parse(content, file=file, **kwargs)
 
     def from_dataframes(self, dataframes: Dict[str, ArgumentationInfo], language="english", **kwargs) -> Dict[str, AnnotatedRawTextInfo]:
         """
@@ -1,9 +1,9 @@
 
 
-from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 import pandas
 from corpus_parser.conll_parser import ConllParser, ConllTagInfo
+from utils.executor_utils import DynamicExecutor, file_size
 from pathlib import Path
 from typing import Dict, List, Tuple
 import random as rand
@@ -32,27 +32,14 @@ class LinkPredictor:
         
         parser = ConllParser()
         
-        batch = len(annotated_files)//self.max_worker + 1
-        
-        def batch_work(slice: int) -> str:
-            for annotated_file in annotated_files[batch*slice:batch*(slice+1)]:
-                                
-                predicted_links_conll = self.predict_links(annotated_file.read_text(), str(annotated_file), source_language=source_language, **kwargs)
-                
-                target_annotated_file = export_dir / (annotated_file.name + ".link.conll")
-                
-                target_annotated_file.write_text(predicted_links_conll)
-        
-        futures: List[Future] = []
-        with ThreadPoolExecutor(max_workers=self.max_worker) as exe:
-            for i in range(self.max_worker):
-                futures.append(exe.submit(batch_work, i))
-                # batch_work(i)
-        wait(futures)
-        exceptions = [future.exception() for future in futures if future.exception()]
+        def file_work(annotated_file: Path):
+            predicted_links_conll = self.predict_links(annotated_file.read_text(), str(annotated_file), source_language=source_language, **kwargs)
+            
+            target_annotated_file = export_dir / (annotated_file.name + ".link.conll")
+            
+            target_annotated_file.write_text(predicted_links_conll)
         
-        if exceptions:
-            raise Exception(exceptions)
+        DynamicExecutor(max_workers=self.max_worker).map(file_work, annotated_files, size=file_size)
 
     def predict_links(self, content: str, file_key: str=None, source_language: str="english", **kwargs) -> str:
         """
@@ -8,7 +8,7 @@ from corpus_parser.conll_parser import ConllParser
 from pathlib import Path
 
 
-def parse_corpus_pipeline(corpus_dir: Path, parsed_corpus_dest_dir: Path, corpus_parser: Parser, **kwargs):
+def parse_corpus_pipeline(corpus_dir: Path, parsed_corpus_dest_dir: Path, corpus_parser: Parser, incremental: bool = False, sentence_workers: int = 1, **kwargs):
     """
     Parse the corpus in `corpus_dir` with `corpus_parser` and convert to standard corpus 
     (.conll with .txt) saving the results in `parsed_corpus_dest_dir`.
@@ -16,13 +16,16 @@ def parse_corpus_pipeline(corpus_dir: Path, parsed_corpus_dest_dir: Path, corpus
     corpus_dir: Corpus directory. The files within must be parseable by `corpus_parser`
     parsed_corpus_dest_dir: Destination of the parsed files
     corpus_parser: Parser used to parse the files in `corpus_dir`
+    incremental: Only rewrite the files whose content changed, see `Parser.export_corpus_from_files`
+    sentence_workers: Processes used to split the documents into sentences, see `ConllParser.from_dataframes`
     """
-        
-    dataframe_representation = corpus_parser.parse_dir(corpus_dir, **kwargs)
+    
+    # Each document is exported as soon as it's parsed, the corpus isn't held in memory
+    dataframe_representation = corpus_parser.iter_parse_dir(corpus_dir, **kwargs)
 
     conll = ConllParser()
 
-    conll.export_from_dataframes(parsed_corpus_dest_dir, dataframe_representation)
+    conll.export_from_dataframes(parsed_corpus_dest_dir, dataframe_representation, incremental=incremental, sentence_workers=sentence_workers)
 
 def make_alignemnts_pipeline(
     standard_corpus_dir: Path, 
@@ -64,9 +67,10 @@ def full_corpus_processing_pipeline(
     sentence_aligner: SentenceAligner,
     aligner: Aligner, 
     projector: Projector, 
+    sentence_workers: int = 1,
     **kwargs):
     
-    parse_corpus_pipeline(corpus_dir, standard_corpus_dest_dir, corpus_parser, **kwargs)
+    parse_corpus_pipeline(corpus_dir, standard_corpus_dest_dir, corpus_parser, sentence_workers=sentence_workers, **kwargs)
     
     make_alignemnts_pipeline(standard_corpus_dest_dir, sentence_alignment_dest_dir, bidirectional_alignment_dest_dir, 
                     projection_dest_dir, sentence_aligner, aligner, projector, **kwargs)
\ No newline at end of file
@@ -60,4 +60,5 @@ full_corpus_processing_pipeline(
     projector,
     source_language = args.source_language,
     target_language = args.target_language,
+    sentence_workers = args.sentence_workers,
 )
\ No newline at end of file
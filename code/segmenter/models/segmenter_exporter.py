@@ -1,13 +1,25 @@
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    path = str(Path(__file__, "..", "..", "..").resolve())
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from pathlib import Path
-import nltk
+from typing import Optional
+from corpus_parser.conll_reader import ConllSentenceReader
+from utils.archive_utils import is_bundle, iter_members
+from utils.tokenizer_utils import sent_tokenize, word_tokenize
 
-def convert_to_tuples(data:Path, all_words: set, all_tags: set, all_chars: set, bioes=True, meta_tags_level=99, meta_tags_separator="-", use_sentence_split=False):
+def convert_to_tuples(data:Path, all_words: set, all_tags: set, all_chars: set, bioes=True, meta_tags_level=99, meta_tags_separator="-", use_sentence_split=False, content: Optional[bytes]=None):
     tags = []
     current_paragraph_tags = []
     current_paragraph_words = []
-    for i, line in enumerate(data.read_text().splitlines()):
-        if not line: # Empty line dataset
+    line = None
+    
+    def add_empty_lines(amount: int):
+        nonlocal current_paragraph_tags, current_paragraph_words
+        for _ in range(amount):
             if use_sentence_split:
                 if bioes:
                     current_paragraph_tags = convert_bio_to_bioes(current_paragraph_tags)
@@ -24,22 +36,29 @@ def convert_to_tuples(data:Path, all_words: set, all_tags: set, all_chars: set,
                 # Add sentence separator
                 current_paragraph_tags.append("") 
                 current_paragraph_words.append("") 
-            continue
-
-        word, annotation = line.split("\t")
+    
+    # The file is read one sentence at a time from the memory mapped file
+    with ConllSentenceReader(data, content=content) as reader:
+        for i in range(len(reader)):
+            add_empty_lines(reader.blank_lines_before(i))
+            
+            for line in reader.lines(i):
+                word, annotation = line.split("\t")
 
-        if len(word) >= 3 and word[-3] == "_": # word with _LN tag
-            word = word[:-3]
+                if len(word) >= 3 and word[-3] == "_": # word with _LN tag
+                    word = word[:-3]
 
-        all_words.add(word)
-        all_chars.update(word)
+                all_words.add(word)
+                all_chars.update(word)
 
-        tag = meta_tags_separator.join(annotation.split(meta_tags_separator)[:meta_tags_level+1])
-        current_paragraph_tags.append(tag)
-        current_paragraph_words.append(word)
+                tag = meta_tags_separator.join(annotation.split(meta_tags_separator)[:meta_tags_level+1])
+                current_paragraph_tags.append(tag)
+                current_paragraph_words.append(word)
+        add_empty_lines(reader.trailing_blank_lines())
+    
     if current_paragraph_words:
         if bioes:
-            current_paragraph_tags = convert_bio_to_bioes(current_paragraph_tags, (i, line, data))
+            current_paragraph_tags = convert_bio_to_bioes(current_paragraph_tags, (line, data))
         all_tags.update(current_paragraph_tags) 
         tags.append([x for x in zip(current_paragraph_words, current_paragraph_tags)])
     return tags
@@ -106,7 +125,7 @@ def convert_bio_to_bioes(bio_tags: list, trace_info=None):
   
     return bioes_tags
 
-def export(conll_file: Path, dest_sentence_file: Path, dest_tag_file: Path, all_words: set, all_tags: set, all_chars: set, language: str="english", meta_tags_level=99, meta_tags_separator="-", use_sentence_split=True, use_nltk=True):
+def export(conll_file: Path, dest_sentence_file: Path, dest_tag_file: Path, all_words: set, all_tags: set, all_chars: set, language: str="english", meta_tags_level=99, meta_tags_separator="-", use_sentence_split=True, use_nltk=True, content: Optional[bytes]=None):
     """
     Creates from `conll_file` two files, `dest_sentence_file` and 
     `dest_tag_file`, containing the sentences splitted by `nltk` 
@@ -118,9 +137,10 @@ def export(conll_file: Path, dest_sentence_file: Path, dest_tag_file: Path, all_
     dest_tag_file: File containing the tags.
     with_meta_tags: If the output should conserve the meta tags
     use_sentence_split: If the empty lines should be analyzed as sentence separators
+    content: Already read content of `conll_file`, i.e. an archive member
     """
     
-    conll_paragraph_tuples = convert_to_tuples(conll_file, all_words, all_tags, all_chars, meta_tags_level=meta_tags_level, meta_tags_separator=meta_tags_separator, use_sentence_split=use_sentence_split)
+    conll_paragraph_tuples = convert_to_tuples(conll_file, all_words, all_tags, all_chars, meta_tags_level=meta_tags_level, meta_tags_separator=meta_tags_separator, use_sentence_split=use_sentence_split, content=content)
 
     dest_sentence_content = []
     dest_tag_content = []
@@ -135,7 +155,7 @@ def export(conll_file: Path, dest_sentence_file: Path, dest_tag_file: Path, all_
         current_tags = [tag for _, tag in sentence_tuples if tag]
         
         if use_nltk:
-            sentences = nltk.sent_tokenize(" ".join(current_sentence), language=language)
+            sentences = sent_tokenize(" ".join(current_sentence), language=language)
         else:
             sentences = " ".join(current_sentence).split("  ")
         
@@ -147,7 +167,7 @@ def export(conll_file: Path, dest_sentence_file: Path, dest_tag_file: Path, all_
             current_word: str = current_sentence[current_word_index]
             current_tag: str = current_tags[current_tag_index]
             if use_nltk:
-                toks = nltk.word_tokenize(sent, language=language)
+                toks = word_tokenize(sent, language=language)
             else:
                 toks = sent.split()
             dest_sentence_content.append([])
@@ -211,13 +231,17 @@ def export_from_directory(source_directory: Path, dest_sent_file: Path, dest_tag
     try:
         with dest_sent_file.open("w") as dest_sent:
             with dest_tag_file.open("w") as dest_tag:
-                for file in source_directory.iterdir():
-                    if file.suffix == ".conll":
-                        export(file, temp_sent_file, temp_tag_file, all_words, all_tags, all_chars, language, meta_tags_level, meta_tags_separator, use_sentence_split=False, use_nltk=False)
-                        dest_sent.write(temp_sent_file.read_text().replace("\n", " "))
-                        dest_tag.write(temp_tag_file.read_text().replace("\n", " "))
-                        dest_sent.write("\n")
-                        dest_tag.write("\n")
+                if is_bundle(source_directory):
+                    # Archive members are read in memory instead of extracting them
+                    files = ((source_directory / name, content) for name, content in iter_members(source_directory, lambda name: name.endswith(".conll")))
+                else:
+                    files = ((file, None) for file in source_directory.iterdir() if file.suffix == ".conll")
+                for file, content in files:
+                    export(file, temp_sent_file, temp_tag_file, all_words, all_tags, all_chars, language, meta_tags_level, meta_tags_separator, use_sentence_split=False, use_nltk=False, content=content)
+                    dest_sent.write(temp_sent_file.read_text().replace("\n", " "))
+                    dest_tag.write(temp_tag_file.read_text().replace("\n", " "))
+                    dest_sent.write("\n")
+                    dest_tag.write("\n")
     finally:
         temp_sent_file.unlink()
         temp_tag_file.unlink()
@@ -268,7 +292,7 @@ def export_directory(data_dir: Path, dest_dir: Path, language: str, meta_tags_le
     Creates a dataset for the files in `data_dir`, this directory must contain 3 directories
     train, dev and test with .conll annotated files. The data is saved in `dest_dir`
     
-    data_dir: Data's directory
+    data_dir: Data's directory. May be an archive containing the train, dev and test directories
     dest_dir: Directory to save the proccessed data
     language: Language of the data
     meta_tags_level: Level of annotation to get: 0: BIOES, 1: BIOES-OtherTag, 2: BIOES-Tag1-Tag2, ...
@@ -1,8 +1,9 @@
-from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import List, Tuple
 import random as rand
 
+from utils.executor_utils import DynamicExecutor, file_size
+
 SplittedArgumentInfo = Tuple[str,str]
 
 class ArgumentSegmenter:
@@ -15,21 +16,10 @@ class ArgumentSegmenter:
         
         if not export_dir.exists(): export_dir.mkdir(exist_ok=True, parents=True)
         
-        batch = len(annotated_files)//self.max_worker + 1
-        
-        def batch_work(slice: int) -> str:
-            for annotated_file in annotated_files[batch*slice:batch*(slice+1)]:
-                self.extract_arguments_from_file(annotated_file, export_dir)
-        
-        futures: List[Future] = []
-        with ThreadPoolExecutor(max_workers=self.max_worker) as exe:
-            for i in range(self.max_worker):
-                futures.append(exe.submit(batch_work, i))
-        wait(futures)
-        exceptions = [future.exception() for future in futures if future.exception()]
+        def file_work(annotated_file: Path):
+            self.extract_arguments_from_file(annotated_file, export_dir)
         
-        if exceptions:
-            raise Exception(exceptions)
+        DynamicExecutor(max_workers=self.max_worker).map(file_work, annotated_files, size=file_size)
     
     def extract_arguments_from_file(self, source_file: Path, dest_directory: Path):
         """
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+from bs4 import BeautifulSoup
+from deep_translator.constants import BASE_URLS, GOOGLE_LANGUAGES_TO_CODES
+
+from utils.async_utils import AIMDLimiter, TokenBucket, backoff_delay
+from .translator import BaseDeepTranslator
+
+class _Connection(NamedTuple):
+    """
+    Session and limiters used by the requests of an event loop
+    """
+    session: aiohttp.ClientSession
+    rate_limiter: TokenBucket
+    concurrency: AIMDLimiter
+
+class AsyncGoogleTranslator(BaseDeepTranslator):
+    """
+    Translator sending the requests of the GoogleTranslator of deep-translator from
+    an asyncio event loop, so thousands of requests can be in flight. The sentences
+    are packed in requests of up to `character_limit` characters as in `BaseDeepTranslator`.
+
+    The requests are limited to `rate` per second by a token bucket and the amount of
+    concurrent requests is adjusted by an `AIMDLimiter` from their latency and errors.
+    Throttled (429), server errors and timed out requests are retried with exponential
+    backoff and jitter, after `max_retries` the translation fails with an exception.
+    The requests still running are cancelled and the translations already received
+    are cached before raising.
+
+    Inside the context manager the event loop runs in a background thread and the
+    session and the limiters are shared by all the calls, so `translate_batch` can be
+    called from several threads and `rate` limits all of them. Outside of it each call
+    runs its own loop with its own session and limiters, so `rate` applies to each call.
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, cache_file: Optional[Path]=None, json_cache_file: Optional[Path]=None,
+                 base_url: str = BASE_URLS["GOOGLE_TRANSLATE"], rate: float = 10, burst: Optional[float] = None,
+                 initial_concurrency: int = 10, max_concurrency: int = 1000, latency_target: float = 2.0,
+                 request_timeout: float = 10, max_retries: int = 5, backoff: float = 0.5, max_backoff: float = 30) -> None:
+        """
+        cache_file: See `BaseDeepTranslator`
+        json_cache_file: See `BaseDeepTranslator`
+        base_url: Url of the translation endpoint
+        rate: Max requests per second
+        burst: Max requests sent at once after being idle. Defaults to `rate`
+        initial_concurrency: Initial amount of concurrent requests
+        max_concurrency: Max amount of concurrent requests
+        latency_target: Seconds over which a request is considered slow and the concurrency is reduced
+        request_timeout: Seconds to wait for a response
+        max_retries: Times a failed request is retried
+        backoff: Seconds of the first retry backoff, doubled in each retry
+        max_backoff: Max seconds between retries
+        """
+        super().__init__(cache_file, json_cache_file)
+        self.base_url = base_url
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        # Limiters shared by the calls inside the context manager
+        self.rate_limiter: Optional[TokenBucket] = None
+        self.concurrency: Optional[AIMDLimiter] = None
+        self.__connection: Optional[_Connection] = None
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        super().__enter__()
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+        self.__connection = asyncio.run_coroutine_threadsafe(self.__connect(), self.__loop).result()
+        self.rate_limiter, self.concurrency = self.__connection.rate_limiter, self.__connection.concurrency
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self.__loop is not None:
+                asyncio.run_coroutine_threadsafe(self.__connection.session.close(), self.__loop).result()
+                self.__loop.call_soon_threadsafe(self.__loop.stop)
+                self.__thread.join()
+                self.__loop.close()
+                self.__loop = self.__thread = self.__connection = None
+        finally:
+            super().__exit__(exc_type, exc_val, exc_tb)
+
+    async def __connect(self) -> _Connection:
+        """
+        Creates a session and limiters in the running loop
+        """
+        return _Connection(
+            aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency)),
+            TokenBucket(self.rate, self.burst),
+            AIMDLimiter(self.initial_concurrency, maximum=self.max_concurrency, latency_target=self.latency_target),
+        )
+
+    def get_translator(self, source_language:str, target_language: str):
+        raise NotImplementedError("AsyncGoogleTranslator sends the requests itself")
+
+    def _translate_chunks(self, chunks: List[List[str]], source_language:str, target_language: str) -> Iterator[Tuple[List[str], List[str]]]:
+        """
+        Translates all the `chunks` concurrently. The translated chunks are yielded
+        before raising the error of a failed one
+        """
+        coroutine = self.__translate_chunks(chunks, source_language, target_language)
+        loop = self.__loop
+        if loop is not None:
+            results, error = asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+        else:
+            results, error = asyncio.run(coroutine)
+        yield from results
+        if error is not None:
+            raise error
+
+    async def translate_many(self, source_sentences: List[str], source_language:str, target_language: str) -> List[str]:
+        """
+        Translates all `source_sentences` concurrently without using the cache. Inside
+        the context manager it must be awaited in its background loop to share its
+        limiters, from any other loop the call uses its own session and limiters
+
+        returns: The translated sentences in the same order
+        """
+        results, error = await self.__translate_chunks(self._pack(list(dict.fromkeys(source_sentences))), source_language, target_language)
+        if error is not None:
+            raise error
+        translations = {sentence: target_sentence for chunk, chunk_translations in results for sentence, target_sentence in zip(chunk, chunk_translations)}
+        return [translations[sentence] for sentence in source_sentences]
+
+    async def __translate_chunks(self, chunks: List[List[str]], source_language:str, target_language: str) -> Tuple[List[Tuple[List[str], List[str]]], Optional[BaseException]]:
+        """
+        Translates the `chunks` concurrently. After the first failed chunk the others
+        are cancelled
+
+        returns: The (chunk, translations) of the translated chunks and the first error or None
+        """
+        shared = self.__connection is not None and asyncio.get_running_loop() is self.__loop
+        connection = self.__connection if shared else await self.__connect()
+        tasks = [asyncio.ensure_future(self.__translate_chunk(connection, chunk, source_language, target_language)) for chunk in chunks]
+        try:
+            if tasks:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not shared:
+                await connection.session.close()
+
+        results = []
+        error = None
+        for chunk, task in zip(chunks, tasks):
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                error = error or task.exception()
+            else:
+                results.append((chunk, task.result()))
+        return results, error
+
+    async def __translate_chunk(self, connection: _Connection, chunk: List[str], source_language:str, target_language: str) -> List[str]:
+        """
+        Translates the sentences in `chunk` with a single request. If the translation
+        doesn't keep the separators, each sentence is translated on its own
+        """
+        self._count_requests(1)
+        if len(chunk) == 1:
+            return [await self.__translate_with_retry(connection, chunk[0], source_language, target_language)]
+        parts = self._split_chunk(chunk, await self.__translate_with_retry(connection, self.BATCH_SEPARATOR.join(chunk), source_language, target_language))
+        if parts is not None:
+            return parts
+        self._count_requests(len(chunk))
+        return list(await asyncio.gather(*(self.__translate_with_retry(connection, sentence, source_language, target_language) for sentence in chunk)))
+
+    async def __translate_with_retry(self, connection: _Connection, source_sentence: str, source_language:str, target_language: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            await connection.concurrency.acquire()
+            retry_after = None
+            try:
+                await connection.rate_limiter.acquire()
+                start = time.monotonic()
+                target_sentence = await self.request(connection.session, source_sentence, source_language, target_language)
+            except asyncio.TimeoutError as e:
+                await connection.concurrency.release(congested=True)
+                error = e
+            except aiohttp.ClientResponseError as e:
+                await connection.concurrency.release(congested=e.status in self.RETRY_STATUS)
+                if e.status not in self.RETRY_STATUS:
+                    raise Exception(f"Translation of '{source_sentence}' failed with status {e.status}") from e
+                error = e
+                if e.headers and e.headers.get("Retry-After", "").isdigit():
+                    retry_after = float(e.headers["Retry-After"])
+            except aiohttp.ClientError as e:
+                await connection.concurrency.release()
+                error = e
+            except BaseException:
+                await connection.concurrency.release()
+                raise
+            else:
+                await connection.concurrency.release(latency=time.monotonic() - start)
+                return target_sentence
+
+            if attempt < self.max_retries:
+                with self.__lock:
+                    self.retries += 1
+                delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                logging.debug(f"Retrying the translation of '{source_sentence}' in {delay:.2f}s: {error!r}")
+                await asyncio.sleep(max(delay, retry_after or 0))
+        raise Exception(f"Translation of '{source_sentence}' failed after {self.max_retries + 1} attempts") from error
+
+    async def request(self, session: aiohttp.ClientSession, source_sentence: str, source_language:str, target_language: str) -> str:
+        """
+        Sends a single translation request with `session`
+
+        returns: The translated sentence
+        """
+        text = source_sentence.strip()
+        source = GOOGLE_LANGUAGES_TO_CODES.get(source_language, source_language)
+        target = GOOGLE_LANGUAGES_TO_CODES.get(target_language, target_language)
+        if not text or source == target:
+            return text
+        async with session.get(self.base_url, params={"sl": source, "tl": target, "q": text},
+                                      timeout=aiohttp.ClientTimeout(total=self.request_timeout), raise_for_status=True) as response:
+            content = await response.text()
+        soup = BeautifulSoup(content, "html.parser")
+        element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+        if element is None:
+            raise Exception(f"Translation of '{source_sentence}' not found in the response")
+        return element.get_text(strip=True)
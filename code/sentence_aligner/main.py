@@ -9,6 +9,7 @@ if __name__ == "__main__":
 import argparse
 from pathlib import Path
 from sentence_aligner.translator import FromCorpusTranslator, GoogleDeepTranslator
+from sentence_aligner.async_translator import AsyncGoogleTranslator
 from sentence_aligner.sentence_aligner import SentenceAligner
 from utils.argparser_utils import ChoiceArg, OptionalArg, PositionalArg, update_parser
 
@@ -30,7 +31,7 @@ choice_args = [
         name="translator",
         help="Select the translation process",
         type=str,
-        values=("google", "corpus")
+        values=("google", "google_async", "corpus")
     ),
 ]
 
@@ -52,6 +53,7 @@ optional_args = [
 def create_from_args(args) -> SentenceAligner:
     translator = {
         "google": GoogleDeepTranslator(),
+        "google_async": AsyncGoogleTranslator(),
     }
     translator = translator[args.translator]
     return SentenceAligner(translator)
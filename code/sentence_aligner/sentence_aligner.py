@@ -1,10 +1,10 @@
-from concurrent.futures import Future, ThreadPoolExecutor, wait
 import logging
 from .translator import Translator
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from corpus_parser.conll_parser import ConllParser
 from pathlib import Path
-from nltk import sent_tokenize, word_tokenize
+from utils.executor_utils import DynamicExecutor
+from utils.tokenizer_utils import sent_tokenize, word_tokenize
 
 class SentenceAligner:
     
@@ -18,30 +18,96 @@ class SentenceAligner:
         """
         self.translator = translator
         self.max_worker = 20
+        # Sentences sent to the translator in each task
+        self.batch_size = 50
 
-    def sentence_alignment_dir(self, corpus_address:Path, sentence_dest:Path, sentences_splitted=True, **kwargs):
+    def sentence_alignment_dir(self, corpus_address:Path, sentence_dest:Path, sentences_splitted=True, source_language: str="english", target_language: str="spanish", **kwargs):
         """
         Read all cropus files from `corpus_address` and write the respective sentences 
         aligned in `sentence_dest`. The written files will have .align suffix.
         
+        The translation is planned for the whole corpus: the unique sentences of all
+        the documents that aren't cached are translated once by a single worker pool,
+        then every .align file is written from the results.
+        
         corpus_address: Corpus address
         corpus_dest: Path to save the processed corpus
         sentence_dest: Where to save the sentence alignment
         sentences_splitted: If in the conll file the sentence are splitted by an empty line 
+        source_language: Corpus language
+        target_language: Language to be translated
         """
         
         if not sentence_dest.exists(): sentence_dest.mkdir(exist_ok=True, parents=True)
         
         bio_parser = ConllParser()
-        tags = bio_parser.parse_dir(corpus_address, get_tags = True)
+        # The next files are parsed while the current one is split
+        tags = bio_parser.iter_parse_dir(corpus_address, get_tags = True)
+        source_word_tokenizer = lambda x, *args, **kwargs: x.split()
+        
+        documents: List[Tuple[str, List[str]]] = []
+        for key, annotated_tags_info in tags:
+            text = " ".join(tok["tok"] for tok in annotated_tags_info)
+            documents.append((key, self.__source_sentences(text, sentences_splitted, source_word_tokenizer, source_language=source_language, **kwargs)))
         
         # Activating translator cache with context
         with self.translator:
-            for key, annotated_tags_info in tags.items():
-                text = " ".join(tok["tok"] for tok in annotated_tags_info)
-                sentence_sentence_text = self.make_sentence_sentence_text(text, sentences_splitted=sentences_splitted, source_word_tokenizer=lambda x, *args, **kwargs: x.split(), **kwargs)
-                dest_file = sentence_dest / (Path(key).name + ".align")
-                dest_file.write_text(sentence_sentence_text)
+            translations = self.translate_sentences((sentence for _, sentences in documents for sentence in sentences), source_language, target_language)
+        
+        for key, sentences in documents:
+            sentence_sentence_text = "\n".join(self.__align_sentence(sentence, translations[sentence], target_language=target_language, **kwargs) for sentence in sentences)
+            dest_file = sentence_dest / (Path(key).name + ".align")
+            dest_file.write_text(sentence_sentence_text)
+
+    def translate_sentences(self, source_sentences: Iterable[str], source_language: str, target_language: str) -> Dict[str, str]:
+        """
+        Translates the unique `source_sentences`. The sentences already cached by the
+        translator are looked up first, the rest are split in batches of `batch_size`
+        sentences and translated by `max_worker` threads.
+        
+        returns: Dictionary from each source sentence to its translation
+        """
+        unique = list(dict.fromkeys(source_sentences))
+        translations = self.translator.cached_translations(unique, source_language, target_language)
+        missing = [sentence for sentence in unique if sentence not in translations]
+        logging.info(f"Translating {len(missing)} of {len(unique)} unique sentences, {len(translations)} cached")
+        
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        executor = DynamicExecutor(max_workers=self.max_worker)
+        translate = lambda batch: self.translator.translate_batch(batch, source_language=source_language, target_language=target_language)
+        for batch, batch_translations in zip(batches, executor.map(translate, batches, size=lambda batch: sum(map(len, batch)))):
+            translations.update(zip(batch, batch_translations))
+        return translations
+
+    def __source_sentences(self, 
+            text: str, 
+            sentences_splitted=True, 
+            source_word_tokenizer: Callable[[str,],List[str]]=word_tokenize, 
+            sent_tokenizer: Callable[[str,],List[str]]=sent_tokenize, 
+            source_language: str="english", 
+            **kwargs) -> List[str]:
+        """
+        Returns the sentences of `text` with the tokens separated by spaces, see `make_sentence_sentence_text`
+        """
+        sentences = sent_tokenizer(text, language=source_language) if not sentences_splitted else text.splitlines()
+        return [" ".join(source_word_tokenizer(sentence, language=source_language)).strip() for sentence in sentences]
+
+    def __align_sentence(self, 
+            source_sentence_with_spaces: str, 
+            target_sentence: Optional[str], 
+            target_word_tokenizer: Callable[[str,],List[str]]=word_tokenize, 
+            target_language: str="spanish", 
+            separator: str=SEPARATOR, 
+            **kwargs) -> str:
+        """
+        Returns the line of the aligned text of a sentence, see `make_sentence_sentence_text`
+        """
+        if target_sentence is not None:
+            target_sentence_with_spaces = " ".join(target_word_tokenizer(target_sentence, language=target_language)).strip()
+        else:
+            logging.warning(f"Target sentence translation for {source_sentence_with_spaces} is None. Defaulting translation to {source_sentence_with_spaces}")
+            target_sentence_with_spaces = source_sentence_with_spaces
+        return f"{source_sentence_with_spaces}{separator}{target_sentence_with_spaces}"
 
     def make_sentence_sentence_text(self, 
             text: str, 
@@ -72,31 +138,6 @@ class SentenceAligner:
         returns: The aligned text, tokens are separated by spaces
         """
         
-        sentences = sent_tokenizer(text, language=source_language) if not sentences_splitted else text.splitlines()
-        
-        batch = len(sentences)//self.max_worker + 1
-        def batch_work(slice: int) -> str:
-            result = []
-            for sentence in sentences[batch*slice:batch*(slice+1)]:
-                # Result is the sentence's tokens separated by spaces
-                source_sentence_with_spaces = " ".join(source_word_tokenizer(sentence, language=source_language)).strip()
-                target_sentence = self.translator.translate(source_sentence_with_spaces, source_language=source_language, target_language=target_language)
-                if target_sentence is not None:
-                    target_sentence_with_spaces = " ".join(target_word_tokenizer(target_sentence, language=target_language)).strip()
-                else:
-                    logging.warning(f"Target sentence translation for {source_sentence_with_spaces} is None. Defaulting translation to {source_sentence_with_spaces}")
-                    target_sentence_with_spaces = source_sentence_with_spaces
-                result.append((source_sentence_with_spaces, target_sentence_with_spaces))
-            return "\n".join(f"{source}{separator}{target}" for source, target in result)
-
-        futures: List[Future] = []
-        with ThreadPoolExecutor(max_workers=self.max_worker) as exe:
-            for i in range(self.max_worker):
-                futures.append(exe.submit(batch_work, i))
-        wait(futures)
-        exceptions = [future.exception() for future in futures if future.exception()]
-        
-        if exceptions:
-            raise Exception(exceptions)
-
-        return "\n".join(future.result() for future in futures if future.result())
+        sentences = self.__source_sentences(text, sentences_splitted, source_word_tokenizer, sent_tokenizer, source_language)
+        translations = self.translate_sentences(sentences, source_language, target_language)
+        return "\n".join(self.__align_sentence(sentence, translations[sentence], target_word_tokenizer, target_language, separator) for sentence in sentences)
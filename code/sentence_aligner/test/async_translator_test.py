@@ -0,0 +1,168 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+import pytest
+from aiohttp import web
+from sentence_aligner.async_translator import AsyncGoogleTranslator
+from utils.async_utils import AIMDLimiter, TokenBucket
+
+
+class StubBackend:
+    """
+    Local translation endpoint answering like translate.google.com/m. The first
+    `failures` requests of each sentence are throttled, the sentences in `slow`
+    take `delay` seconds the first time and the ones in `broken` are rejected
+    """
+
+    def __init__(self, failures: int = 0, slow: tuple = (), delay: float = 0, broken: tuple = ()) -> None:
+        self.failures = failures
+        self.slow = slow
+        self.delay = delay
+        self.broken = broken
+        self.requests = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        text = request.query["q"]
+        self.requests[text] = self.requests.get(text, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if text in self.slow and self.requests[text] == 1:
+                await asyncio.sleep(self.delay)
+            if text in self.broken:
+                return web.Response(status=400)
+            if self.requests[text] <= self.failures:
+                return web.Response(status=429)
+            translation = "\n".join(f'{line.upper()} ({request.query["tl"]})' for line in text.split("\n"))
+            return web.Response(text=f'<html><div class="result-container">{translation}</div></html>')
+        finally:
+            self.in_flight -= 1
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/m", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}/m"
+
+@contextmanager
+def serve(backend: StubBackend):
+    """
+    Runs `backend` in a background loop yielding its url
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield asyncio.run_coroutine_threadsafe(backend.start(), loop).result()
+    finally:
+        asyncio.run_coroutine_threadsafe(backend.runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def test_translate_many():
+    backend = StubBackend()
+    sentences = [f"sentence {i}" for i in range(200)]
+    with serve(backend) as url:
+        translator = AsyncGoogleTranslator(base_url=url, rate=10000, initial_concurrency=50, max_concurrency=50)
+        translator.character_limit = 40
+        result = asyncio.run(translator.translate_many(sentences, "english", "spanish"))
+    assert result == [f"SENTENCE {i} (es)" for i in range(200)]
+    # Several sentences are packed in each request
+    assert translator.requests == len(backend.requests) < 200
+    assert 1 < backend.max_in_flight <= 50
+
+def test_retry_and_timeout(tmp_path):
+    backend = StubBackend(failures=2, slow=("slow",), delay=1)
+    with serve(backend) as url, AsyncGoogleTranslator(tmp_path / "cache.sqlite", base_url=url, rate=1000, request_timeout=0.3, backoff=0.01, latency_target=0.2) as translator:
+        translator.character_limit = 1
+        assert translator.translate_batch(["hello", "slow"], "english", "spanish") == ["HELLO (es)", "SLOW (es)"]
+        assert translator.retries == 4
+        assert translator.concurrency.limit < translator.initial_concurrency
+
+    backend = StubBackend(failures=10)
+    with serve(backend) as url:
+        translator = AsyncGoogleTranslator(base_url=url, rate=1000, max_retries=2, backoff=0.01)
+        with pytest.raises(Exception):
+            translator.translate_batch(["hello"], "english", "spanish")
+    assert backend.requests["hello"] == 3
+
+def test_partial_failure(tmp_path):
+    # The translations received before the error are cached
+    backend = StubBackend(broken=("bad",), slow=("bad",), delay=0.3)
+    with serve(backend) as url, AsyncGoogleTranslator(tmp_path / "cache.sqlite", base_url=url, rate=1000) as translator:
+        translator.character_limit = 1
+        with pytest.raises(Exception):
+            translator.translate_batch(["a", "bad", "b"], "english", "spanish")
+        assert translator.cached_translations(["a", "bad", "b"], "english", "spanish") == {"a": "A (es)", "b": "B (es)"}
+
+    # The requests still running are cancelled
+    backend = StubBackend(broken=("bad",), slow=("slow",), delay=2)
+    with serve(backend) as url, AsyncGoogleTranslator(tmp_path / "cache.sqlite", base_url=url, rate=1000) as translator:
+        translator.character_limit = 1
+        start = time.monotonic()
+        with pytest.raises(Exception):
+            translator.translate_batch(["slow", "bad"], "english", "spanish")
+        assert time.monotonic() - start < 1
+        assert translator.cached_translations(["slow"], "english", "spanish") == {}
+
+def test_threads(tmp_path):
+    backend = StubBackend()
+    with serve(backend) as url:
+        def run(translator):
+            errors = []
+            def work(i):
+                sentences = [f"thread {i} sentence {j}" for j in range(20)]
+                try:
+                    assert translator.translate_batch(sentences, "english", "spanish") == [f"{x.upper()} (es)" for x in sentences]
+                except BaseException as e:
+                    errors.append(e)
+            threads = [threading.Thread(target=work, args=(i,)) for i in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not errors
+
+        # Each call runs its own loop, session and limiters
+        translator = AsyncGoogleTranslator(base_url=url, rate=10000)
+        translator.character_limit = 100
+        run(translator)
+        # All the calls share the background loop
+        with AsyncGoogleTranslator(tmp_path / "cache.sqlite", base_url=url, rate=10000) as translator:
+            translator.character_limit = 100
+            run(translator)
+
+def test_limiters():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - start
+    assert asyncio.run(run()) >= 0.19
+
+    async def congestion():
+        limiter = AIMDLimiter(initial=8, latency_target=10)
+        await limiter.acquire()
+        await limiter.release(congested=True)
+        decreased = limiter.limit
+        for _ in range(20):
+            await limiter.acquire()
+            await limiter.release(latency=0.01)
+        return decreased, limiter.limit
+    decreased, increased = asyncio.run(congestion())
+    assert decreased == 4 and increased > 4
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+from sentence_aligner.sentence_aligner import SentenceAligner
+from sentence_aligner.translator import Translator
+
+
+class CountingTranslator(Translator):
+
+    def __init__(self, cached: dict) -> None:
+        self.cached = cached
+        self.translated = []
+
+    def translate(self, source_sentence: str, source_language: str, target_language: str) -> str:
+        self.translated.append(source_sentence)
+        return source_sentence.upper()
+
+    def cached_translations(self, source_sentences, source_language: str, target_language: str) -> dict:
+        return {sentence: self.cached[sentence] for sentence in source_sentences if sentence in self.cached}
+
+def test_sentence_alignment_dir(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "doc1.conll").write_text("Hello\tO\nworld\tO\n\nGood\tB-claim\nbye\tI-claim\n")
+    (corpus / "doc2.conll").write_text("Good\tO\nbye\tO\n\nSee\tO\nyou\tO\n")
+
+    translator = CountingTranslator({"See you": "Hasta luego"})
+    aligner = SentenceAligner(translator)
+    aligner.sentence_alignment_dir(corpus, tmp_path / "align", target_word_tokenizer=lambda x, **kwargs: x.split())
+
+    # Repeated and cached sentences aren't translated
+    assert sorted(translator.translated) == ["Good bye", "Hello world"]
+    assert (tmp_path / "align" / "doc1.conll.align").read_text() == "Hello world ||| HELLO WORLD\nGood bye ||| GOOD BYE"
+    assert (tmp_path / "align" / "doc2.conll.align").read_text() == "Good bye ||| GOOD BYE\nSee you ||| Hasta luego"
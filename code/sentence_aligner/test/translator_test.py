@@ -0,0 +1,136 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import json
+import time
+from utils.executor_utils import DynamicExecutor
+from sentence_aligner.translator import BaseDeepTranslator
+from sentence_aligner.translation_cache import TranslationCache
+
+
+class StubClient:
+    """
+    Local backend that translates to upper case line by line
+    """
+
+    def __init__(self, calls: list, delay: float = 0, keep_lines: bool = True) -> None:
+        self.calls = calls
+        self.delay = delay
+        self.keep_lines = keep_lines
+
+    def translate(self, text: str) -> str:
+        self.calls.append(text)
+        time.sleep(self.delay)
+        return text.upper() if self.keep_lines else text.upper().replace("\n", " ")
+
+class StatefulStubClient(StubClient):
+    """
+    Keeps the text of the current request in the client, like the GoogleTranslator
+    of deep-translator does with its url parameters
+    """
+
+    def translate(self, text: str) -> str:
+        self.url_params = {"q": text}
+        time.sleep(self.delay)
+        return self.url_params["q"].upper()
+
+class StubDeepTranslator(BaseDeepTranslator):
+
+    def __init__(self, *args, delay: float = 0, keep_lines: bool = True, client=StubClient, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        self.clients = 0
+        self.delay = delay
+        self.keep_lines = keep_lines
+        self.client = client
+
+    def get_translator(self, source_language: str, target_language: str):
+        self.clients += 1
+        return self.client(self.calls, self.delay, self.keep_lines)
+
+def test_translation_cache(tmp_path):
+    cache_file = tmp_path / "translation_cache.sqlite"
+
+    with StubDeepTranslator(cache_file) as translator:
+        assert translator.translate("hello", "english", "spanish") == "HELLO"
+        assert translator.translate("hello", "english", "spanish") == "HELLO"
+        assert translator.translate("hello", "english", "french") == "HELLO"
+    assert translator.calls == ["hello", "hello"]
+
+    with StubDeepTranslator(cache_file) as translator:
+        assert translator.translate("hello", "english", "spanish") == "HELLO"
+    assert translator.calls == []
+
+    with TranslationCache(cache_file) as cache:
+        assert len(cache) == 2
+        assert cache.get_many(["hello", "bye"], "english", "spanish") == {"hello": "HELLO"}
+
+def test_json_cache_migration(tmp_path):
+    json_file = tmp_path / "translation_cache.json"
+    json_file.write_text(json.dumps({"english": {"hello": {"spanish": "hola", "french": "salut"}}}))
+
+    with StubDeepTranslator(json_file) as translator:
+        assert translator.cache_file == tmp_path / "translation_cache.sqlite"
+        assert translator.translate("hello", "english", "spanish") == "hola"
+        assert translator.translate("hello", "english", "french") == "salut"
+    assert translator.calls == []
+
+    with TranslationCache(translator.cache_file) as cache:
+        cache.put("hello", "buenas", "english", "spanish")
+        # Migrated once, the new translation is kept
+        assert cache.migrate_json(json_file) == 0
+        assert cache.get("hello", "english", "spanish") == "buenas"
+
+def test_translate_batch(tmp_path):
+    sentences = [f"sentence {i}" for i in range(10)]
+
+    with StubDeepTranslator(tmp_path / "cache.sqlite") as translator:
+        translator.character_limit = 40
+        assert translator.translate_batch(sentences + sentences[:3], "english", "spanish") == [x.upper() for x in sentences + sentences[:3]]
+        assert all(len(call) < 40 for call in translator.calls)
+        assert sorted(line for call in translator.calls for line in call.split("\n")) == sentences
+        assert translator.requests == len(translator.calls) == 4
+        assert translator.translate_batch(sentences, "english", "french") == [x.upper() for x in sentences]
+        assert translator.clients == 2
+
+    # Without the separators the sentences are translated one by one
+    translator = StubDeepTranslator(keep_lines=False)
+    assert translator.translate_batch(sentences[:3], "english", "spanish") == [x.upper() for x in sentences[:3]]
+    assert translator.calls[1:] == sentences[:3]
+
+def test_translate_single_flight():
+    translator = StubDeepTranslator(delay=0.05)
+    results = list(DynamicExecutor(max_workers=8).map(lambda _: translator.translate("hello", "english", "spanish"), range(8)))
+    assert results == ["HELLO"]*8
+    assert translator.calls == ["hello"]
+
+def test_translate_threads(tmp_path):
+    sentences = [f"sentence {i}" for i in range(40)]
+
+    with StubDeepTranslator(tmp_path / "cache.sqlite", delay=0.01, client=StatefulStubClient) as translator:
+        # One sentence per request
+        translator.character_limit = 1
+        results = DynamicExecutor(max_workers=20).map(lambda sentence: translator.translate(sentence, "english", "spanish"), sentences)
+        assert results == [sentence.upper() for sentence in sentences]
+        assert translator.cached_translations(sentences, "english", "spanish") == {sentence: sentence.upper() for sentence in sentences}
+        assert 1 < translator.clients <= 20
+
+def test_sharded_memory_cache(tmp_path):
+    cache_file = tmp_path / "cache.sqlite"
+    sentences = [f"sentence {i}" for i in range(200)]
+
+    with TranslationCache(cache_file, flush_every=1000, memory_size=32, shards=4) as cache:
+        DynamicExecutor(max_workers=8).map(lambda sentence: cache.put(sentence, sentence.upper(), "english", "spanish"), sentences)
+        stats = cache.stats()
+        assert stats["size"] <= 32 and stats["evictions"] == 200 - stats["size"]
+        assert stats["pending"] == stats["size"]
+        # Evicted entries were written back to the file
+        assert cache.get_many(sentences, "english", "spanish") == {sentence: sentence.upper() for sentence in sentences}
+        assert cache.get("sentence 199", "english", "spanish") == "SENTENCE 199"
+        stats = cache.stats()
+        assert stats["hits"] > 0 and stats["disk_hits"] > 0 and stats["misses"] == 0
+
+    with TranslationCache(cache_file) as cache:
+        assert len(cache) == 200
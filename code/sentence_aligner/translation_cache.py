@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.cache_utils import ShardedLRUCache
+
+class TranslationCache:
+    """
+    Persistent translation cache stored in a sqlite file in WAL mode. Entries are
+    keyed by (source_language, target_language, sentence hash) and looked up one by
+    one, so the cache is never loaded into memory. New entries are committed every
+    `flush_every` writes, so a crash only loses the last uncommitted ones.
+    
+    The most recently used translations are kept in memory by a `ShardedLRUCache` of
+    `memory_size` entries. New translations are written to the file when they are
+    evicted from memory or when `flush_every` of them are pending.
+    """
+
+    # Max parameters in a sqlite query
+    QUERY_SIZE = 500
+
+    def __init__(self, cache_file: Path, flush_every: int = 100, memory_size: int = 100000, shards: int = 16) -> None:
+        """
+        cache_file: Sqlite file. It's created if it doesn't exist
+        flush_every: Amount of new entries written between commits
+        memory_size: Max amount of translations kept in memory
+        shards: Amount of independently locked parts of the memory cache
+        """
+        self.cache_file = cache_file
+        self.flush_every = flush_every
+        self.disk_hits = 0
+        self.misses = 0
+        self.__pending_writes = 0
+        self.__lock = threading.RLock()
+        self.memory = ShardedLRUCache(memory_size, shards, write_back=self.__write)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.__connection: Optional[sqlite3.Connection] = sqlite3.connect(str(cache_file), check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "source_language TEXT, target_language TEXT, sentence_hash BLOB, "
+            "source_sentence TEXT, target_sentence TEXT, "
+            "PRIMARY KEY (source_language, target_language, sentence_hash)) WITHOUT ROWID"
+        )
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+        self.__connection.commit()
+
+    @staticmethod
+    def sentence_hash(sentence: str) -> bytes:
+        return hashlib.sha256(sentence.encode()).digest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self.__lock:
+            return self.__connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def close(self):
+        """
+        Writes the pending entries and closes the file
+        """
+        if self.__connection is None:
+            return
+        # The memory is flushed without the file lock, the shard locks are always taken first
+        self.flush()
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+    def flush(self):
+        """
+        Writes the pending entries and commits them
+        """
+        self.__write(self.memory.dirty_items())
+        with self.__lock:
+            self.__connection.commit()
+            self.__pending_writes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters of the cache. `hits` are found in memory, `disk_hits` in
+        the file and `evictions` are the entries removed from memory
+        """
+        memory_stats = self.memory.stats()
+        with self.__lock:
+            return {
+                "hits": memory_stats["hits"],
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": memory_stats["evictions"],
+                "size": memory_stats["size"],
+                "pending": memory_stats["dirty"],
+            }
+
+    def __write(self, entries: List[Tuple[Tuple[str, str, str], str]]):
+        """
+        Writes the ((source_language, target_language, source_sentence), target_sentence)
+        `entries` into the file, committing every `flush_every` entries
+        """
+        if not entries:
+            return
+        rows = [(source_language, target_language, self.sentence_hash(source), source, target)
+                for (source_language, target_language, source), target in entries]
+        with self.__lock:
+            self.__connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+            self.__pending_writes += len(rows)
+            if self.__pending_writes >= self.flush_every:
+                self.__connection.commit()
+                self.__pending_writes = 0
+
+    def get(self, source_sentence: str, source_language: str, target_language: str) -> Optional[str]:
+        """
+        Returns the cached translation of `source_sentence` or None
+        """
+        return self.get_many([source_sentence], source_language, target_language).get(source_sentence)
+
+    def get_many(self, source_sentences: Iterable[str], source_language: str, target_language: str) -> Dict[str, str]:
+        """
+        Returns the cached translations of `source_sentences`. The sentences without
+        translation are missing in the result
+        """
+        result = {}
+        hashes = {}
+        for sentence in dict.fromkeys(source_sentences):
+            target_sentence = self.memory.get((source_language, target_language, sentence))
+            if target_sentence is not None:
+                result[sentence] = target_sentence
+            else:
+                hashes[self.sentence_hash(sentence)] = sentence
+        
+        keys = list(hashes)
+        found = {}
+        with self.__lock:
+            for i in range(0, len(keys), self.QUERY_SIZE):
+                chunk = keys[i:i + self.QUERY_SIZE]
+                rows = self.__connection.execute(
+                    "SELECT sentence_hash, target_sentence FROM translations WHERE source_language = ? AND target_language = ? "
+                    f"AND sentence_hash IN ({', '.join('?' * len(chunk))})",
+                    (source_language, target_language, *chunk)
+                )
+                for sentence_hash, target_sentence in rows:
+                    found[hashes[sentence_hash]] = target_sentence
+            self.disk_hits += len(found)
+            self.misses += len(keys) - len(found)
+        for sentence, target_sentence in found.items():
+            self.memory.put((source_language, target_language, sentence), target_sentence)
+        result.update(found)
+        return result
+
+    def put(self, source_sentence: str, target_sentence: str, source_language: str, target_language: str):
+        """
+        Saves the translation of `source_sentence`
+        """
+        self.put_many([(source_sentence, target_sentence)], source_language, target_language)
+
+    def put_many(self, translations: Iterable[Tuple[str, str]], source_language: str, target_language: str):
+        """
+        Saves the (source_sentence, target_sentence) `translations` in memory. They are
+        written to the file when evicted or when `flush_every` are pending
+        """
+        for source, target in translations:
+            self.memory.put((source_language, target_language, source), target, dirty=True)
+        if self.memory.dirty >= self.flush_every:
+            self.__write(self.memory.dirty_items())
+
+    def migrate_json(self, json_file: Path) -> int:
+        """
+        Imports the translations of a cache saved by the previous versions of
+        `BaseDeepTranslator`, a JSON file with the shape
+        `{source_language: {source_sentence: {target_language: target_sentence}}}`.
+        The import is done once per file, existing translations are kept.
+
+        returns: Amount of imported translations
+        """
+        key = f"migrated:{json_file.resolve()}"
+        with self.__lock:
+            if self.__connection.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone() is not None:
+                return 0
+        try:
+            cache_dict = json.loads(json_file.read_text() or "{}")
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Translation cache {json_file} couldn't be migrated: {e}")
+            return 0
+
+        rows: List[Tuple[str, str, bytes, str, str]] = [
+            (source_language, target_language, self.sentence_hash(source_sentence), source_sentence, target_sentence)
+            for source_language, sentences in cache_dict.items()
+            for source_sentence, targets in sentences.items()
+            for target_language, target_sentence in targets.items()
+        ]
+        with self.__lock:
+            self.__connection.executemany("INSERT OR IGNORE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+            self.__connection.execute("INSERT INTO metadata VALUES (?, ?)", (key, str(len(rows))))
+        self.flush()
+        logging.info(f"Migrated {len(rows)} translations from {json_file} into {self.cache_file}")
+        return len(rows)
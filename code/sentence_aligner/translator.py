@@ -1,11 +1,14 @@
 import logging
 import re
-from typing import Callable, Dict, Optional, Tuple
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from corpus_parser.conll_parser import ConllParser
-from pathlib import Path
-from nltk import sent_tokenize
+from pathlib import Path, PurePosixPath
+from utils.archive_utils import iter_members
+from utils.tokenizer_utils import sent_tokenize
 from deep_translator import GoogleTranslator
-import json
+from .translation_cache import TranslationCache
 
 class Translator:
 
@@ -21,6 +24,21 @@ class Translator:
         """
         raise NotImplementedError()
 
+    def translate_batch(self, source_sentences: Iterable[str], source_language:str, target_language: str) -> List[str]:
+        """
+        Translate all `source_sentences` in `source_language` into `target_language`
+        
+        returns: The translated sentences in the same order
+        """
+        return [self.translate(sentence, source_language, target_language) for sentence in source_sentences]
+
+    def cached_translations(self, source_sentences: Iterable[str], source_language:str, target_language: str) -> Dict[str, str]:
+        """
+        Returns the translations of `source_sentences` that are available without
+        calling the translation backend
+        """
+        return {}
+
     def __enter__(self):
         return self
     
@@ -83,12 +101,12 @@ class FromCorpusTranslator(Translator):
         Both files must be named in a way that by sorting them will yield the 
         corresponding source and target file. 
         
-        source_dir: Directory that contains the source target annotation
-        target_dir: Directory that contains the source target annotation
+        source_dir: Directory that contains the source target annotation. May be an archive
+        target_dir: Directory that contains the source target annotation. May be an archive
         """
         
-        source_texts = [(file, file.read_text()) for file in self.source_dir.iterdir()]
-        target_texts = [(file, file.read_text()) for file in self.target_dir.iterdir()]
+        source_texts = [(PurePosixPath(name), content.decode()) for name, content in iter_members(self.source_dir)]
+        target_texts = [(PurePosixPath(name), content.decode()) for name, content in iter_members(self.target_dir)]
         
         source_texts.sort(key=lambda x: x[0].name)
         target_texts.sort(key=lambda x: x[0].name)
@@ -117,72 +135,57 @@ class FromCorpusTranslator(Translator):
 class BaseDeepTranslator(Translator):
     """
     Translator based on https://github.com/nidhaloff/deep-translator.
+    
+    The translations are cached in a sqlite file, see `TranslationCache`. The cache
+    is opened by the context manager, outside of it the translations aren't cached.
+    
+    `translate_batch` packs several sentences, separated by new lines, in each request
+    up to `character_limit` characters. Concurrent requests of the same sentence are
+    sent once and each thread creates a single client per language pair, since the
+    deep-translator clients keep the text of the current request in their attributes.
     """
     
-    def __init__(self, cache_file: Optional[Path]=None) -> None:
+    # Max characters in a request, the backends reject texts of this length
+    character_limit = 5000
+    BATCH_SEPARATOR = "\n"
+    
+    def __init__(self, cache_file: Optional[Path]=None, json_cache_file: Optional[Path]=None, memory_size: int=100000) -> None:
+        """
+        cache_file: Sqlite file of the translation cache. A .json file is taken as the
+        cache of the previous versions, migrated into a sqlite file with the same name
+        json_cache_file: JSON cache of the previous versions to migrate once into `cache_file`
+        memory_size: Max amount of translations kept in memory by the cache
+        """
         super().__init__()
-        self.cache_file = cache_file
-        if not cache_file:
-            self.cache_file = Path(__file__, "..", "..", "data", "translation", "translation_cache.json").resolve()
-
-        # target_sentence = self.cache_dict[source_language][source_sentence][target_language]
-        self.cache_dict: Dict[str, Dict[str, Dict[str, str]]] = {}
+        translation_dir = Path(__file__, "..", "..", "data", "translation").resolve()
+        if cache_file and cache_file.suffix == ".json":
+            json_cache_file = json_cache_file or cache_file
+            cache_file = cache_file.with_suffix(".sqlite")
+        self.cache_file = cache_file or translation_dir / "translation_cache.sqlite"
+        self.json_cache_file = json_cache_file or self.cache_file.with_name("translation_cache.json")
+        self.memory_size = memory_size
+        self.cache: Optional[TranslationCache] = None
+        self.requests = 0
+        # Clients of each thread by language pair
+        self.__clients = threading.local()
+        self.__in_flight: Dict[Tuple[str, str, str], Future] = {}
+        self.__lock = threading.Lock()
     
     def __enter__(self):
-        # Setup cache dictionary
-        if not self.cache_file.exists():
-            self.cache_file.touch()
-            with self.cache_file.open("w") as file:
-                json.dump({}, file)
-        try:
-            with self.cache_file.open("r") as file:
-                self.cache_dict = json.load(file)
-        except json.JSONDecodeError:
-            with self.cache_file.open("w") as file:
-                json.dump({}, file)
-            with self.cache_file.open("r") as file:
-                self.cache_dict = json.load(file)
+        self.cache = TranslationCache(self.cache_file, memory_size=self.memory_size)
+        if self.json_cache_file.exists():
+            self.cache.migrate_json(self.json_cache_file)
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # Save cache
-        self.__save_cache_into_file()
-
+        if self.cache is not None:
+            logging.info(f"Translation cache: {self.cache.stats()}")
+            self.cache.close()
+            self.cache = None
     
-    def __save_cache_into_file(self):
-        try:
-            if self.cache_file and self.cache_dict:
-                with self.cache_file.open("w") as file:
-                    json.dump(self.cache_dict, file)
-        except Exception as e:
-            logging.warning(f"Error saving the translation cache: {e}")
-    
-    def __check_cache(self, source_sentence: str, source_language:str, target_language: str) -> Optional[str]:
-        """
-        Return the value for source_sentence if exist else return None
-        """
-        if self.cache_dict is None:
-            return None
-        current = self.cache_dict
-        for key in [source_language, source_sentence, target_language]:
-            current = current.get(key)
-            if current is None:
-                return None
-        return current
-
-    def __save_cache(self, source_sentence: str, target_sentence: str, source_language:str, target_language: str):
-        """
-        Save the translated value for source_sentence with given language
-        """
-        if self.cache_dict is None:
-            return
-        current = self.cache_dict
-        for key in [source_language, source_sentence]:
-            now = current.get(key, {})
-            if len(now) == 0:
-                current[key] = now
-            current = now
-        current[target_language] = target_sentence
+    def cached_translations(self, source_sentences: Iterable[str], source_language:str, target_language: str) -> Dict[str, str]:
+        cache = self.cache
+        return cache.get_many(source_sentences, source_language, target_language) if cache is not None else {}
     
     def get_translator(self, source_language:str, target_language: str):
         """
@@ -190,14 +193,124 @@ class BaseDeepTranslator(Translator):
         """
         raise NotImplementedError()
     
+    def get_client(self, source_language:str, target_language: str):
+        """
+        Returns the translator of the language pair, created once per thread with `get_translator`
+        """
+        clients: Dict[Tuple[str, str], object] = getattr(self.__clients, "clients", None)
+        if clients is None:
+            clients = self.__clients.clients = {}
+        client = clients.get((source_language, target_language))
+        if client is None:
+            client = clients[source_language, target_language] = self.get_translator(source_language, target_language)
+        return client
+    
     def translate(self, source_sentence: str, source_language:str, target_language: str) -> str:
-        cached_translated = self.__check_cache(source_sentence, source_language, target_language)
-        if cached_translated is not None:
-            return cached_translated
-        translator = self.get_translator(source_language, target_language)
-        target_sentence = translator.translate(source_sentence)
-        self.__save_cache(source_sentence, target_sentence, source_language, target_language)
-        return target_sentence
+        return self.translate_batch([source_sentence], source_language, target_language)[0]
+    
+    def translate_batch(self, source_sentences: Iterable[str], source_language:str, target_language: str) -> List[str]:
+        source_sentences = list(source_sentences)
+        unique = list(dict.fromkeys(source_sentences))
+        cache = self.cache
+        translations = cache.get_many(unique, source_language, target_language) if cache is not None else {}
+        
+        # Single flight, the sentences already requested by another thread are awaited
+        owned: List[str] = []
+        waiting: Dict[str, Future] = {}
+        with self.__lock:
+            for sentence in unique:
+                if sentence in translations:
+                    continue
+                key = (source_language, target_language, sentence)
+                future = self.__in_flight.get(key)
+                if future is None:
+                    self.__in_flight[key] = Future()
+                    owned.append(sentence)
+                else:
+                    waiting[sentence] = future
+        
+        try:
+            # The chunks translated before an error are still cached and returned to the waiting threads
+            for chunk, chunk_translations in self._translate_chunks(self._pack(owned), source_language, target_language):
+                if cache is not None:
+                    cache.put_many([x for x in zip(chunk, chunk_translations) if x[1] is not None], source_language, target_language)
+                with self.__lock:
+                    for sentence, target_sentence in zip(chunk, chunk_translations):
+                        translations[sentence] = target_sentence
+                        self.__in_flight.pop((source_language, target_language, sentence)).set_result(target_sentence)
+        except BaseException as e:
+            with self.__lock:
+                for sentence in owned:
+                    future = self.__in_flight.pop((source_language, target_language, sentence), None)
+                    if future is not None:
+                        future.set_exception(e)
+            raise
+        
+        for sentence, future in waiting.items():
+            translations[sentence] = future.result()
+        return [translations[sentence] for sentence in source_sentences]
+    
+    def _pack(self, sentences: List[str]) -> List[List[str]]:
+        """
+        Groups `sentences` in chunks that fit in a request. The sentences that can't be
+        separated from the others, empty or with new lines, go alone
+        """
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        size = 0
+        for sentence in sentences:
+            if not sentence.strip() or self.BATCH_SEPARATOR in sentence:
+                chunks.append([sentence])
+                continue
+            added_size = len(sentence) + (len(self.BATCH_SEPARATOR) if current else 0)
+            if current and size + added_size >= self.character_limit:
+                chunks.append(current)
+                current, size = [], 0
+                added_size = len(sentence)
+            current.append(sentence)
+            size += added_size
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _translate_chunks(self, chunks: List[List[str]], source_language:str, target_language: str) -> Iterator[Tuple[List[str], List[str]]]:
+        """
+        Translates the `chunks` made by `_pack`, one request each
+        
+        returns: Iterator of (chunk, translations) as they are translated
+        """
+        for chunk in chunks:
+            yield chunk, self.__translate_chunk(chunk, source_language, target_language)
+    
+    def __translate_chunk(self, chunk: List[str], source_language:str, target_language: str) -> List[str]:
+        """
+        Translates the sentences in `chunk` with a single request. If the translation
+        doesn't keep the separators, each sentence is translated on its own
+        """
+        client = self.get_client(source_language, target_language)
+        self._count_requests(1)
+        if len(chunk) == 1:
+            return [client.translate(chunk[0])]
+        parts = self._split_chunk(chunk, client.translate(self.BATCH_SEPARATOR.join(chunk)))
+        if parts is not None:
+            return parts
+        self._count_requests(len(chunk))
+        return [client.translate(sentence) for sentence in chunk]
+    
+    def _split_chunk(self, chunk: List[str], translated: Optional[str]) -> Optional[List[str]]:
+        """
+        Returns the translation of each sentence of `chunk` from the translation of the
+        joined chunk, or None if the translation doesn't keep the separators
+        """
+        parts = translated.split(self.BATCH_SEPARATOR) if translated is not None else []
+        if len(parts) == len(chunk):
+            return [part.strip() for part in parts]
+        logging.warning(f"Batch translation of {len(chunk)} sentences returned {len(parts)} lines. Translating them one by one")
+        return None
+    
+    def _count_requests(self, amount: int):
+        with self.__lock:
+            self.requests += amount
 
 class GoogleDeepTranslator(BaseDeepTranslator):
     """
@@ -0,0 +1,293 @@
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple
+
+from utils.manifest_utils import ExportManifest, atomic_path, atomic_write, content_hash
+
+try:
+    import zstandard
+except ImportError: # Optional, only needed for .zst files
+    zstandard = None
+
+# Archives containing several corpus files
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar.zst", ".tzst", ".zip")
+
+# Single compressed files, maps the suffix to its compression
+COMPRESSION_SUFFIXES = {
+    ".gz": "gz",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zst",
+}
+
+# Compression of the archive suffixes
+ARCHIVE_COMPRESSIONS = {
+    ".tar": None,
+    ".tar.gz": "gz", ".tgz": "gz",
+    ".tar.bz2": "bz2", ".tbz2": "bz2",
+    ".tar.xz": "xz", ".txz": "xz",
+    ".tar.zst": "zst", ".tzst": "zst",
+}
+
+def __zstandard():
+    if zstandard is None:
+        raise Exception("The zstandard package is needed for .zst files. Install it with `pip install zstandard`")
+    return zstandard
+
+def is_archive(path: PurePosixPath) -> bool:
+    """
+    Returns if `path` is named as an archive
+    """
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+def compression_of(path: PurePosixPath) -> Optional[str]:
+    """
+    Returns the compression of a single compressed file or None if `path`
+    isn't compressed or it's an archive
+    """
+    if is_archive(path):
+        return None
+    return COMPRESSION_SUFFIXES.get(path.suffix.lower())
+
+def decompressed_name(path: PurePosixPath) -> str:
+    """
+    Returns the name of `path` without its compression suffix
+    """
+    return path.stem if compression_of(path) else path.name
+
+def split_archive_path(path: Path) -> Optional[Tuple[Path, str]]:
+    """
+    Finds the archive or compressed file containing `path`. The path may continue
+    inside the archive, i.e. `corpus.tar.gz/train`.
+
+    returns: (archive, inner directory in posix format) or None if `path` isn't in
+    an archive or compressed file
+    """
+    for candidate in [path, *path.parents]:
+        if candidate.is_file() and (is_archive(candidate) or compression_of(candidate)):
+            inner = path.relative_to(candidate).as_posix()
+            return candidate, "" if inner == "." else inner
+        if candidate.exists():
+            return None
+    return None
+
+def is_bundle(path: Path) -> bool:
+    """
+    Returns if `path` is an archive, a compressed file or a directory inside an archive
+    """
+    return not path.is_dir() and split_archive_path(path) is not None
+
+def open_compressed(path: Path, mode: str = "rb", compression: Optional[str] = None) -> BinaryIO:
+    """
+    Opens a compressed file as a binary stream
+
+    path: File to open
+    mode: `rb` or `wb`
+    compression: gz, bz2, xz, zst or None. Defaults to the one of the file suffix
+    """
+    compression = compression if compression else compression_of(path)
+    if compression is None:
+        return path.open(mode)
+    if compression == "gz":
+        return gzip.open(path, mode)
+    if compression == "bz2":
+        return bz2.open(path, mode)
+    if compression == "xz":
+        return lzma.open(path, mode)
+    if compression == "zst":
+        file = path.open(mode)
+        if "r" in mode:
+            return __zstandard().ZstdDecompressor().stream_reader(file, closefd=True)
+        return __zstandard().ZstdCompressor().stream_writer(file, closefd=True)
+    raise ValueError(f"Unknown compression {compression}. Expected one of {', '.join(COMPRESSION_SUFFIXES.values())}")
+
+def __in_directory(name: str, directory: str) -> bool:
+    """
+    Returns if the member `name` is a direct child of `directory`. The directory may
+    be preceded by other directories, i.e. a root folder in the archive.
+    """
+    parent = str(PurePosixPath(name).parent)
+    if not directory:
+        return True
+    return parent == directory or parent.endswith("/" + directory)
+
+def __members(path: Path, accept: Callable[[str], bool], read: bool) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    Shared by `iter_members` and `iter_member_names`. The contents are only read if `read`
+    """
+    if path.is_dir():
+        for file in sorted(path.iterdir()):
+            if file.is_file() and accept(file.name):
+                yield file.name, file.read_bytes() if read else None
+        return
+
+    found = split_archive_path(path)
+    if found is None:
+        raise FileNotFoundError(f"{path} isn't a directory, an archive or a compressed file")
+    archive, directory = found
+
+    if compression_of(archive):
+        name = decompressed_name(archive)
+        if not directory and accept(name):
+            if not read:
+                yield name, None
+                return
+            with open_compressed(archive) as file:
+                yield name, file.read()
+        return
+
+    if archive.name.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive) as zip_file:
+            for info in zip_file.infolist():
+                if not info.is_dir() and __in_directory(info.filename, directory) and accept(info.filename):
+                    yield info.filename, zip_file.read(info) if read else None
+        return
+
+    compression = next(value for suffix, value in ARCHIVE_COMPRESSIONS.items() if archive.name.lower().endswith(suffix))
+    with open_compressed(archive, compression=compression) as stream:
+        # Stream mode, the members are read in order without seeking
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            for member in tar:
+                if member.isfile() and __in_directory(member.name, directory) and accept(member.name):
+                    yield member.name, tar.extractfile(member).read() if read else None
+
+def iter_members(path: Path, accept: Callable[[str], bool] = lambda name: True) -> Iterator[Tuple[str, bytes]]:
+    """
+    Reads the files of a directory, archive or compressed file. Archives are read as a
+    stream, the members are never extracted to disk.
+
+    path: Directory, archive, compressed file or directory inside an archive
+    accept: Receives a member name and returns if it should be read
+
+    returns: Iterator of (name, content). Names are relative to the archive, or the
+    file names for directories.
+    """
+    return __members(path, accept, read=True)
+
+def iter_member_names(path: Path, accept: Callable[[str], bool] = lambda name: True) -> Iterator[str]:
+    """
+    Lists the files of a directory, archive or compressed file in the same order and
+    with the same names as `iter_members`, without keeping their contents. A tar archive
+    has no index, so it's still read, and decompressed, up to the end.
+
+    path: Directory, archive, compressed file or directory inside an archive
+    accept: Receives a member name and returns if it should be listed
+    """
+    return (name for name, _ in __members(path, accept, read=False))
+
+class ArchiveWriter:
+    """
+    Writes files into a tar or zip archive, or into a directory optionally
+    compressing every file.
+
+    In incremental mode the directory keeps an `ExportManifest`: files with the same
+    content as in the previous export aren't written again and the changed ones are
+    written atomically, through a temporary file and a rename. The manifest is only
+    saved when the writer is closed without an error, so a failed export doesn't
+    record the files it didn't write.
+    """
+
+    def __init__(self, dest: Path, compression: Optional[str] = None, incremental: bool = False) -> None:
+        """
+        dest: Archive or directory. May not exist
+        compression: With a directory `dest`, compression of each file: gz, bz2, xz, zst or None
+        incremental: Only write the changed files. Needs a directory `dest`
+        """
+        self.dest = dest
+        self.compression = compression
+        self.manifest: Optional[ExportManifest] = None
+        self.written = 0
+        self.skipped = 0
+        self.__zip: Optional[zipfile.ZipFile] = None
+        self.__tar: Optional[tarfile.TarFile] = None
+        self.__stream: Optional[BinaryIO] = None
+
+        if is_archive(dest):
+            if incremental:
+                raise ValueError(f"Incremental export needs a directory, {dest} is an archive")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if dest.name.lower().endswith(".zip"):
+                self.__zip = zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_DEFLATED)
+            else:
+                archive_compression = next(value for suffix, value in ARCHIVE_COMPRESSIONS.items() if dest.name.lower().endswith(suffix))
+                self.__stream = open_compressed(dest, "wb", compression=archive_compression) if archive_compression else dest.open("wb")
+                self.__tar = tarfile.open(fileobj=self.__stream, mode="w|")
+        else:
+            dest.mkdir(parents=True, exist_ok=True)
+            if incremental:
+                self.manifest = ExportManifest(dest)
+
+    def write(self, name: str, data: bytes):
+        """
+        Adds the file `name` with `data`
+        """
+        if self.__zip is not None:
+            self.__zip.writestr(name, data)
+        elif self.__tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            self.__tar.addfile(info, io.BytesIO(data))
+        elif self.manifest is not None:
+            self.__write_incremental(name, data)
+            return
+        elif self.compression:
+            suffix = next(suffix for suffix, value in COMPRESSION_SUFFIXES.items() if value == self.compression)
+            with open_compressed(self.dest / (name + suffix), "wb", compression=self.compression) as file:
+                file.write(data)
+        else:
+            (self.dest / name).write_bytes(data)
+        self.written += 1
+
+    def __write_incremental(self, name: str, data: bytes):
+        if self.compression:
+            name += next(suffix for suffix, value in COMPRESSION_SUFFIXES.items() if value == self.compression)
+        digest = content_hash(data)
+        if self.manifest.is_unchanged(name, digest):
+            self.manifest.keep_file(name)
+            self.skipped += 1
+            return
+
+        if self.compression:
+            with atomic_path(self.dest / name) as temp:
+                with open_compressed(temp, "wb", compression=self.compression) as file:
+                    file.write(data)
+        else:
+            atomic_write(self.dest / name, data)
+        self.manifest.add_file(name, digest)
+        self.written += 1
+
+    def add_document(self, document: str, *contents: bytes):
+        """
+        Records the content hash of `document` in the manifest. Does nothing if
+        the writer isn't incremental.
+        """
+        if self.manifest is not None:
+            self.manifest.add_document(document, content_hash(*contents))
+
+    def write_text(self, name: str, text: str):
+        self.write(name, text.encode())
+
+    def close(self, save_manifest: bool = True):
+        """
+        Closes the archive and saves the manifest
+
+        save_manifest: If the manifest is saved, false when the export failed
+        """
+        if self.manifest is not None and save_manifest:
+            self.manifest.save()
+        if self.__zip is not None:
+            self.__zip.close()
+        if self.__tar is not None:
+            self.__tar.close()
+            self.__stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(save_manifest=exc_type is None)
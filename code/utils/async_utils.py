@@ -0,0 +1,115 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Rate limiter allowing `rate` acquisitions per second on average and bursts of
+    up to `capacity` acquisitions. Must be used from a single event loop.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        """
+        rate: Tokens added per second
+        capacity: Max tokens kept. Defaults to `rate`, a second of requests
+        """
+        if rate <= 0:
+            raise ValueError(f"The rate must be positive, {rate} received")
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate, 1)
+        self.__tokens = self.capacity
+        self.__updated = time.monotonic()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    async def acquire(self):
+        """
+        Waits until a token is available and takes it
+        """
+        while True:
+            self.__refill()
+            if self.__tokens >= 1:
+                self.__tokens -= 1
+                return
+            await asyncio.sleep((1 - self.__tokens) / self.rate)
+
+class AIMDLimiter:
+    """
+    Concurrency limiter with additive increase and multiplicative decrease. The limit
+    grows by `increase` every `limit` successful calls below `latency_target` seconds
+    and is multiplied by `decrease` after an error or a slow call, at most once per
+    `latency_target` seconds. Must be used from a single event loop.
+    """
+
+    def __init__(self, initial: int = 10, minimum: int = 1, maximum: int = 1000,
+                 latency_target: float = 2.0, increase: float = 1.0, decrease: float = 0.5) -> None:
+        """
+        initial: Initial amount of concurrent calls
+        minimum: Min amount of concurrent calls
+        maximum: Max amount of concurrent calls
+        latency_target: Seconds over which a call is considered slow
+        increase: Amount added to the limit after `limit` fast calls
+        decrease: Factor applied to the limit after an error or a slow call
+        """
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError(f"Expected 1 <= minimum <= initial <= maximum, received {minimum}, {initial}, {maximum}")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.__limit = float(initial)
+        self.__last_decrease = float("-inf")
+        self.__condition: Optional[asyncio.Condition] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self.__limit)
+
+    def __get_condition(self) -> asyncio.Condition:
+        # Created inside the running loop
+        if self.__condition is None:
+            self.__condition = asyncio.Condition()
+        return self.__condition
+
+    async def acquire(self):
+        """
+        Waits until the amount of calls in flight is under the limit
+        """
+        condition = self.__get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    async def release(self, latency: Optional[float] = None, congested: bool = False):
+        """
+        Ends a call updating the limit
+
+        latency: Seconds taken by the call, None if it failed
+        congested: If the call failed because of the backend load, i.e. throttled or timed out
+        """
+        now = time.monotonic()
+        if congested or (latency is not None and latency > self.latency_target):
+            if now - self.__last_decrease >= self.latency_target:
+                self.__limit = max(self.minimum, self.__limit * self.decrease)
+                self.__last_decrease = now
+        elif latency is not None:
+            self.__limit = min(self.maximum, self.__limit + self.increase / self.__limit)
+        condition = self.__get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Returns the seconds to wait before the retry `attempt` with exponential backoff
+    and full jitter
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
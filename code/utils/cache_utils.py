@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+WriteBack = Callable[[List[Tuple[Hashable, Any]]], None]
+
+class _Shard:
+    """
+    Part of a `ShardedLRUCache` with its own lock. The values are kept as
+    (value, dirty) pairs.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, Tuple[Any, bool]]" = OrderedDict()
+        self.dirty = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+class ShardedLRUCache:
+    """
+    Thread safe bounded in memory cache. The keys are split by hash in `shards` shards,
+    each one with its own lock and its own least recently used eviction, so threads
+    using different keys rarely wait on each other.
+
+    Entries put as dirty aren't saved anywhere else yet. They are passed to
+    `write_back` when they are evicted or taken with `dirty_items`.
+    """
+
+    def __init__(self, max_size: int, shards: int = 16, write_back: Optional[WriteBack] = None) -> None:
+        """
+        max_size: Max amount of entries, split evenly between the shards
+        shards: Amount of shards
+        write_back: Function receiving the evicted dirty (key, value) entries. It's
+        called holding the shard lock
+        """
+        if max_size < shards:
+            raise ValueError(f"max_size ({max_size}) must be at least the amount of shards ({shards})")
+        self.max_size = max_size
+        self.write_back = write_back
+        self.__shard_size = max_size // shards
+        self.__shards = [_Shard() for _ in range(shards)]
+
+    def __shard(self, key: Hashable) -> _Shard:
+        return self.__shards[hash(key) % len(self.__shards)]
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self.__shards)
+
+    @property
+    def dirty(self) -> int:
+        """
+        Amount of dirty entries
+        """
+        return sum(shard.dirty for shard in self.__shards)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the value of `key` or None, marking it as recently used
+        """
+        shard = self.__shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                shard.misses += 1
+                return None
+            shard.entries.move_to_end(key)
+            shard.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, dirty: bool = False):
+        """
+        Saves `value` for `key` evicting the least recently used entries of its shard
+
+        dirty: If the entry must be written back when evicted
+        """
+        shard = self.__shard(key)
+        with shard.lock:
+            previous = shard.entries.get(key)
+            if previous is not None and previous[1]:
+                # The entry still has to be written back
+                shard.dirty -= 1
+                dirty = True
+            shard.entries[key] = (value, dirty)
+            shard.entries.move_to_end(key)
+            shard.dirty += dirty
+            evicted = []
+            while len(shard.entries) > self.__shard_size:
+                evicted_key, (evicted_value, evicted_dirty) = shard.entries.popitem(last=False)
+                shard.evictions += 1
+                if evicted_dirty:
+                    shard.dirty -= 1
+                    evicted.append((evicted_key, evicted_value))
+            if evicted and self.write_back is not None:
+                self.write_back(evicted)
+
+    def dirty_items(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Returns the dirty entries marking them as clean
+        """
+        items = []
+        for shard in self.__shards:
+            with shard.lock:
+                if not shard.dirty:
+                    continue
+                for key, (value, dirty) in shard.entries.items():
+                    if dirty:
+                        shard.entries[key] = (value, False)
+                        items.append((key, value))
+                shard.dirty = 0
+        return items
+
+    def clear(self):
+        """
+        Removes every entry without writing back the dirty ones and resets the counters
+        """
+        for shard in self.__shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.dirty = shard.hits = shard.misses = shard.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters summed over the shards
+        """
+        return {
+            "hits": sum(shard.hits for shard in self.__shards),
+            "misses": sum(shard.misses for shard in self.__shards),
+            "evictions": sum(shard.evictions for shard in self.__shards),
+            "size": len(self),
+            "dirty": self.dirty,
+        }
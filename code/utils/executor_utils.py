@@ -0,0 +1,187 @@
+import heapq
+import logging
+import os
+import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import FIRST_EXCEPTION, ALL_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path, PurePath
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+BACKENDS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+class TaskTiming:
+    """
+    Time spent by a task. `item` is the label of the task item, see `DynamicExecutor`
+    """
+
+    def __init__(self, item: Any, seconds: float) -> None:
+        self.item = item
+        self.seconds = seconds
+
+    def __lt__(self, other: "TaskTiming") -> bool:
+        return self.seconds < other.seconds
+
+    def __repr__(self) -> str:
+        return f"TaskTiming({self.item!r}, {self.seconds:.3f}s)"
+
+def default_label(item: Any, index: int) -> Any:
+    """
+    Returns `item` when it's a name or a number, else its position, so the timings
+    don't keep the contents of the items alive
+    """
+    return item if isinstance(item, (str, PurePath, int, float)) else index
+
+def file_size(file: Path) -> int:
+    """
+    Returns the size of `file` in bytes or 0 if it can't be read. Used as the
+    default task size of the `*_dir` methods.
+    """
+    try:
+        return file.stat().st_size
+    except OSError:
+        return 0
+
+def _timed_call(function: Callable[[Any], Any], item: Any) -> Tuple[Any, float]:
+    """
+    Calls `function` with `item` returning its result and the elapsed seconds.
+    Module level so it can be sent to the process pool workers.
+    """
+    start = time.perf_counter()
+    result = function(item)
+    return result, time.perf_counter() - start
+
+class DynamicExecutor:
+    """
+    Runs a function over a list of items submitting one task per item, so an idle
+    worker always takes the next pending item instead of waiting on a fixed slice.
+    Items are scheduled largest first by the given size, to avoid a big item
+    starting last and delaying the whole batch.
+
+    With `fail_fast` the pending tasks are cancelled as soon as one of them fails.
+    The time of every task of `map`, and of the `TIMINGS_KEPT` slowest ones of `imap`,
+    is kept in `timings` along with a label of its item.
+    """
+
+    # Timings kept by imap
+    TIMINGS_KEPT = 100
+
+    def __init__(self, max_workers: Optional[int] = None, backend: str = "thread", fail_fast: bool = True,
+                 label: Callable[[Any, int], Any] = default_label) -> None:
+        """
+        max_workers: Amount of workers. Defaults to the cpu count
+        backend: `thread` or `process`. The process backend needs the function and the
+        items to be picklable
+        fail_fast: If the pending tasks are cancelled after the first error
+        label: Function receiving an item and its position and returning the label kept
+        in `timings`. It shouldn't reference the item contents. See `default_label`
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}. Expected one of {', '.join(BACKENDS)}")
+        self.max_workers = max_workers if max_workers else os.cpu_count() or 1
+        self.backend = backend
+        self.fail_fast = fail_fast
+        self.label = label
+        self.timings: List[TaskTiming] = []
+        self.__seconds = 0.0
+
+    def map(self, function: Callable[[Any], Any], items: Iterable[Any], size: Optional[Callable[[Any], int]] = None) -> List[Any]:
+        """
+        Calls `function` on every item
+
+        function: Function receiving an item
+        items: Items to process
+        size: Function returning the size of an item, used to schedule the largest first
+
+        returns: The results in the same order as `items`
+        """
+        items = list(items)
+        order = list(range(len(items)))
+        if size is not None:
+            sizes = [size(item) for item in items]
+            order.sort(key=lambda i: sizes[i], reverse=True)
+
+        self.timings = []
+        self.__seconds = 0.0
+        if not items:
+            return []
+
+        futures: Dict[Future, int] = {}
+        with self.__create_executor(len(items)) as exe:
+            for i in order:
+                futures[exe.submit(_timed_call, function, items[i])] = i
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION if self.fail_fast else ALL_COMPLETED)
+            exceptions = [future.exception() for future in done if future.exception()]
+            if exceptions:
+                for future in pending:
+                    future.cancel()
+
+        if exceptions:
+            raise Exception(exceptions) from exceptions[0]
+
+        results = [None]*len(items)
+        for future, i in futures.items():
+            results[i], seconds = future.result()
+            self.timings.append(TaskTiming(self.label(items[i], i), seconds))
+            self.__seconds += seconds
+        self.timings.sort(key=lambda timing: timing.seconds, reverse=True)
+        logging.debug(f"{len(items)} tasks done. Slowest: {self.timings[:3]}")
+        return results
+
+    def imap(self, function: Callable[[Any], Any], items: Iterable[Any], prefetch: Optional[int] = None) -> Iterator[Any]:
+        """
+        Lazy version of `map`. Yields the results in the same order as `items` while
+        at most `prefetch` tasks are running or waiting to be consumed, so memory is
+        bounded. `items` is consumed lazily. Tasks aren't reordered by size.
+
+        function: Function receiving an item
+        items: Items to process
+        prefetch: Max tasks submitted ahead of the consumer. Defaults to twice the workers
+
+        returns: Iterator of the results
+        """
+        prefetch = max(1, prefetch if prefetch else 2*self.max_workers)
+        items = enumerate(items)
+        self.timings = []
+        self.__seconds = 0.0
+        # Only the labels of the pending items are kept. The timings are a min heap of the
+        # slowest ones, sorted at the end
+        pending: Deque[Tuple[Any, Future]] = deque()
+
+        exe = BACKENDS[self.backend](max_workers=max(1, min(self.max_workers, prefetch)))
+        try:
+            for i, item in islice(items, prefetch):
+                pending.append((self.label(item, i), exe.submit(_timed_call, function, item)))
+            while pending:
+                label, future = pending.popleft()
+                exception = future.exception()
+                if exception:
+                    raise Exception([exception]) from exception
+                result, seconds = future.result()
+                self.__seconds += seconds
+                timing = TaskTiming(label, seconds)
+                if len(self.timings) < self.TIMINGS_KEPT:
+                    heapq.heappush(self.timings, timing)
+                else:
+                    heapq.heappushpop(self.timings, timing)
+                for i, next_item in islice(items, 1):
+                    pending.append((self.label(next_item, i), exe.submit(_timed_call, function, next_item)))
+                yield result
+            self.timings.sort(key=lambda timing: timing.seconds, reverse=True)
+        finally:
+            # Also reached when the consumer stops iterating
+            for _, future in pending:
+                future.cancel()
+            exe.shutdown(wait=True)
+
+    def __create_executor(self, tasks: int) -> Executor:
+        return BACKENDS[self.backend](max_workers=max(1, min(self.max_workers, tasks)))
+
+    def total_seconds(self) -> float:
+        """
+        Returns the sum of the task times of the last `map` or `imap`
+        """
+        return self.__seconds
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+def content_hash(*contents: bytes) -> str:
+    """
+    Returns the sha256 hex digest of `contents`. Each content is prefixed by its
+    length, so splitting the same bytes differently gives a different hash.
+    """
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update(len(content).to_bytes(8, "little"))
+        digest.update(content)
+    return digest.hexdigest()
+
+@contextmanager
+def atomic_path(file: Path) -> Iterator[Path]:
+    """
+    Yields a temporary path in the directory of `file` that replaces `file` when the
+    block finishes without errors, so readers never see a partially written file.
+    """
+    # Not created with mkstemp, so the file gets the default permissions
+    temp = file.with_name(f".{file.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield temp
+        os.replace(temp, file)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+def atomic_write(file: Path, data: bytes):
+    """
+    Writes `data` into `file` through a temporary file and a rename
+    """
+    with atomic_path(file) as temp:
+        temp.write_bytes(data)
+
+class ExportManifest:
+    """
+    Manifest of an exported corpus directory, saved as `.manifest.json` inside it.
+
+    Keeps the content hash, size and modification time of every written file, used to
+    skip files whose content didn't change, and the content hash of every document,
+    used by later stages to know which documents must be recomputed.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """
+        directory: Exported corpus directory. The previous manifest is loaded if it exists
+        """
+        self.directory = directory
+        self.file = directory / MANIFEST_NAME
+        previous = self.load(directory)
+        self.previous_files: Dict[str, dict] = previous.get("files", {})
+        self.previous_documents: Dict[str, str] = previous.get("documents", {})
+        self.files: Dict[str, dict] = {}
+        self.documents: Dict[str, str] = {}
+
+    @staticmethod
+    def load(directory: Path) -> dict:
+        """
+        Returns the manifest saved in `directory` or an empty one if it doesn't exist
+        or it was written by another version
+        """
+        file = directory / MANIFEST_NAME
+        if not file.exists():
+            return {}
+        try:
+            manifest = json.loads(file.read_text())
+        except ValueError:
+            return {}
+        return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+    @staticmethod
+    def document_hashes(directory: Path) -> Dict[str, str]:
+        """
+        Returns the content hash of every document of the corpus exported in `directory`
+        """
+        return ExportManifest.load(directory).get("documents", {})
+
+    def is_unchanged(self, name: str, digest: str) -> bool:
+        """
+        Returns if the file `name` already exists with the content of hash `digest`.
+        A file modified after the manifest was written, by size or modification time,
+        is considered changed.
+        """
+        entry = self.previous_files.get(name)
+        if entry is None or entry["hash"] != digest:
+            return False
+        try:
+            stat = (self.directory / name).stat()
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def add_file(self, name: str, digest: str):
+        """
+        Records the file `name`, already written in the directory, with the hash of its content
+        """
+        stat = (self.directory / name).stat()
+        self.files[name] = {
+            "hash": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def keep_file(self, name: str):
+        """
+        Records the unchanged file `name` with its previous entry
+        """
+        self.files[name] = self.previous_files[name]
+
+    def add_document(self, document: str, digest: str):
+        self.documents[document] = digest
+
+    def changed_documents(self) -> Dict[str, str]:
+        """
+        Returns the documents added or modified compared with the previous manifest
+        """
+        return {document: digest for document, digest in self.documents.items() if self.previous_documents.get(document) != digest}
+
+    def save(self):
+        atomic_write(self.file, json.dumps({
+            "version": MANIFEST_VERSION,
+            "files": self.files,
+            "documents": self.documents,
+        }, indent=1, sort_keys=True).encode())
@@ -0,0 +1,133 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import gc
+import threading
+import time
+import weakref
+import pytest
+from utils.executor_utils import DynamicExecutor
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def test_map_order():
+    calls = []
+    def function(x):
+        calls.append(x)
+        # The largest items run first but take the least time
+        time.sleep(0.001 * (10 - x))
+        return x * 2
+
+    items = [3, 9, 1, 7, 5, 0, 8, 2, 6, 4]
+    executor = DynamicExecutor(max_workers=1)
+    assert executor.map(function, items, size=lambda x: x) == [x * 2 for x in items]
+    assert calls == sorted(items, reverse=True)
+    assert sorted(timing.item for timing in executor.timings) == sorted(items)
+
+    executor = DynamicExecutor(max_workers=4)
+    assert executor.map(function, items, size=lambda x: x) == [x * 2 for x in items]
+    assert executor.map(function, []) == []
+
+
+def test_map_fail_fast():
+    calls = []
+    lock = threading.Lock()
+    def function(x):
+        with lock:
+            calls.append(x)
+        if x == 9:
+            raise ValueError("failed")
+        time.sleep(0.05)
+        return x
+
+    items = list(range(10))
+    with pytest.raises(Exception) as error:
+        DynamicExecutor(max_workers=1).map(function, items, size=lambda x: x)
+    assert isinstance(error.value.__cause__, ValueError)
+    # The largest item fails first, at most the next one starts before the cancellation
+    assert calls[0] == 9
+    assert len(calls) <= 2
+
+    calls.clear()
+    with pytest.raises(Exception):
+        DynamicExecutor(max_workers=2, fail_fast=False).map(function, items)
+    assert sorted(calls) == items
+
+
+def test_process_backend():
+    items = list(range(20))
+    executor = DynamicExecutor(max_workers=2, backend="process")
+    assert executor.map(square, items, size=lambda x: x % 3) == [x * x for x in items]
+    assert list(executor.imap(square, items, prefetch=3)) == [x * x for x in items]
+
+    with pytest.raises(ValueError):
+        DynamicExecutor(backend="unknown")
+
+
+def test_imap_prefetch():
+    pulled = 0
+    def items():
+        nonlocal pulled
+        for i in range(20):
+            pulled += 1
+            yield i
+
+    executor = DynamicExecutor(max_workers=2)
+    for consumed, result in enumerate(executor.imap(square, items(), prefetch=3)):
+        assert result == consumed * consumed
+        # The tasks of the consumed items plus `prefetch` ahead
+        assert pulled <= consumed + 1 + 3
+    assert pulled == 20
+
+    # Stopping early doesn't read the rest of the items
+    pulled = 0
+    results = executor.imap(square, items(), prefetch=3)
+    assert [next(results) for _ in range(2)] == [0, 1]
+    results.close()
+    assert pulled <= 5
+
+
+class Item:
+    pass
+
+
+def test_imap_releases_items():
+    refs = []
+    def items():
+        for _ in range(50):
+            item = Item()
+            refs.append(weakref.ref(item))
+            yield item
+
+    executor = DynamicExecutor(max_workers=2)
+    executor.TIMINGS_KEPT = 5
+    for _ in executor.imap(lambda item: time.sleep(0.001), items(), prefetch=3):
+        gc.collect()
+        # The prefetched items and the last one read by each generator
+        assert sum(ref() is not None for ref in refs) <= 3 + 2
+    assert len(executor.timings) == 5
+    assert all(isinstance(timing.item, int) for timing in executor.timings)
+    assert [timing.seconds for timing in executor.timings] == sorted((timing.seconds for timing in executor.timings), reverse=True)
+    assert executor.total_seconds() >= sum(timing.seconds for timing in executor.timings)
+
+    executor = DynamicExecutor(max_workers=2, label=lambda item, i: f"item {i}")
+    executor.map(lambda item: None, [Item() for _ in range(3)])
+    assert sorted(timing.item for timing in executor.timings) == ["item 0", "item 1", "item 2"]
+
+
+def test_imap_error():
+    def function(x):
+        if x == 3:
+            raise ValueError("failed")
+        return x
+
+    results = DynamicExecutor(max_workers=2).imap(function, range(10), prefetch=2)
+    assert [next(results) for _ in range(3)] == [0, 1, 2]
+    with pytest.raises(Exception) as error:
+        next(results)
+    assert isinstance(error.value.__cause__, ValueError)
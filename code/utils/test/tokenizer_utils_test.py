@@ -0,0 +1,134 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str((Path(__file__)/".."/".."/"..").resolve()))
+
+import os
+import re
+from utils.tokenizer_utils import TokenizerService, sent_span_tokenize_batch
+
+
+def split_words(text, language="english"):
+    return re.findall(r"\w+|[^\w\s]+", text)
+
+
+def split_sentences(text, language="english"):
+    return re.split(r"(?<=[.!?]) ", text)
+
+
+class CountedTokenizer:
+    """
+    Stub tokenizer recording the texts it tokenizes
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.texts = []
+
+    def __call__(self, text, language="english"):
+        self.texts.append(text)
+        return self.tokenizer(text, language)
+
+
+def counted_service(**kwargs):
+    words, sentences = CountedTokenizer(split_words), CountedTokenizer(split_sentences)
+    return TokenizerService(word_tokenizer=words, sent_tokenizer=sentences, **kwargs), words, sentences
+
+
+def test_counters():
+    service, words, sentences = counted_service()
+    assert service.word_tokenize("The cat sat.") == ["The", "cat", "sat", "."]
+    assert service.word_tokenize("The cat sat.") == ["The", "cat", "sat", "."]
+    assert service.sent_tokenize("The cat sat. It slept.") == ["The cat sat.", "It slept."]
+    # Same text, different language
+    service.word_tokenize("The cat sat.", language="spanish")
+    assert words.texts == ["The cat sat.", "The cat sat."]
+    assert sentences.texts == ["The cat sat. It slept."]
+    assert service.stats() == {"hits": 1, "disk_hits": 0, "misses": 3, "size": 3}
+
+    # The returned lists are copies
+    service.word_tokenize("The cat sat.").append("changed")
+    assert service.word_tokenize("The cat sat.") == ["The", "cat", "sat", "."]
+
+    service.clear()
+    assert service.stats() == {"hits": 0, "disk_hits": 0, "misses": 0, "size": 0}
+
+
+def test_lru_eviction():
+    service, words, _ = counted_service(max_size=2)
+    service.word_tokenize("a")
+    service.word_tokenize("b")
+    # Using "a" makes "b" the least recently used
+    service.word_tokenize("a")
+    service.word_tokenize("c")
+    assert service.stats()["size"] == 2
+    service.word_tokenize("a")
+    service.word_tokenize("c")
+    assert words.texts == ["a", "b", "c"]
+    service.word_tokenize("b")
+    assert words.texts == ["a", "b", "c", "b"]
+    assert service.stats() == {"hits": 3, "disk_hits": 0, "misses": 4, "size": 2}
+
+
+def test_cache_file(tmp_path):
+    cache_file = tmp_path / "cache" / "tokens.sqlite"
+    with counted_service(cache_file=cache_file, flush_every=100)[0] as service:
+        service.word_tokenize("The cat sat.")
+        service.sent_tokenize("The cat sat. It slept.")
+    assert cache_file.exists()
+
+    service, words, sentences = counted_service(cache_file=cache_file, max_size=1)
+    with service:
+        assert service.word_tokenize("The cat sat.") == ["The", "cat", "sat", "."]
+        assert service.sent_tokenize("The cat sat. It slept.") == ["The cat sat.", "It slept."]
+        # Evicted from memory, read again from the file
+        assert service.word_tokenize("The cat sat.") == ["The", "cat", "sat", "."]
+        service.word_tokenize("New text")
+        assert service.stats() == {"hits": 0, "disk_hits": 3, "misses": 1, "size": 1}
+        service.flush()
+    assert words.texts == ["New text"]
+    assert sentences.texts == []
+
+    # Entries committed with flush_every survive without closing the service
+    service = counted_service(cache_file=cache_file, flush_every=1)[0]
+    service.word_tokenize("Flushed text")
+    service, words, _ = counted_service(cache_file=cache_file)
+    with service:
+        service.word_tokenize("Flushed text")
+        service.word_tokenize("New text")
+    assert words.texts == []
+
+
+def test_tokenize_batch():
+    service, words, sentences = counted_service()
+    texts = ["b a", "a b", "b a", "c", "a b"]
+    assert service.word_tokenize_batch(texts) == [split_words(text) for text in texts]
+    assert words.texts == ["b a", "a b", "c"]
+    assert service.stats()["misses"] == 3
+    assert service.stats()["hits"] == 0
+
+    results = service.sent_tokenize_batch(["One. Two.", "One. Two."])
+    assert results == [["One.", "Two."], ["One.", "Two."]]
+    # Each repeated text gets its own list
+    results[0].append("Three.")
+    assert results[1] == ["One.", "Two."]
+    assert sentences.texts == ["One. Two."]
+
+
+PARENT = os.getpid()
+
+
+def worker_split_sentences(text, language="english"):
+    # Module level so the workers can receive it
+    if os.getpid() == PARENT:
+        raise AssertionError("Split outside of the workers")
+    return split_sentences(text, language)
+
+
+def test_sent_span_tokenize_batch_workers():
+    texts = [f"Text {i}. It has {i} words! Or not?" for i in range(20)]
+    texts += texts[:5]
+
+    expected = sent_span_tokenize_batch(texts, sent_tokenizer=split_sentences)
+    assert expected[0] == [(0, 7), (8, 23), (24, 31)]
+    assert sent_span_tokenize_batch(texts, sent_tokenizer=worker_split_sentences, workers=3) == expected
@@ -0,0 +1,296 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import nltk
+
+from utils.executor_utils import DynamicExecutor
+
+Tokenizer = Callable[..., List[str]]
+
+class TokenizerService:
+    """
+    Memoizing wrapper around the nltk word and sentence tokenizers.
+
+    Results are kept in a bounded LRU cache keyed by (text, language). An
+    optional sqlite file keeps the results between runs.
+    """
+
+    def __init__(self, max_size: int = 200000, cache_file: Optional[Path] = None,
+                 word_tokenizer: Tokenizer = nltk.word_tokenize, sent_tokenizer: Tokenizer = nltk.sent_tokenize,
+                 flush_every: int = 1000) -> None:
+        """
+        max_size: Max amount of tokenized texts kept in memory
+        cache_file: Optional sqlite file used as persistent cache
+        word_tokenizer: Function that receives a text and a language and returns its tokens
+        sent_tokenizer: Function that receives a text and a language and returns its sentences
+        flush_every: Amount of new entries written to `cache_file` between commits
+        """
+        self.max_size = max_size
+        self.cache_file = cache_file
+        self.flush_every = flush_every
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.__tokenizers: Dict[str, Tokenizer] = {
+            "word": word_tokenizer,
+            "sent": sent_tokenizer,
+        }
+        self.__cache: "OrderedDict[Tuple[str, str, str], Tuple[str, ...]]" = OrderedDict()
+        self.__lock = threading.RLock()
+        self.__pending_writes = 0
+        self.__connection: Optional[sqlite3.Connection] = None
+        if cache_file is not None:
+            self.__open_cache_file(cache_file)
+
+    def __open_cache_file(self, cache_file: Path):
+        """
+        Opens the persistent cache creating it if it doesn't exist
+        """
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.__connection = sqlite3.connect(str(cache_file), check_same_thread=False)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "kind TEXT, language TEXT, text TEXT, tokens TEXT, "
+            "PRIMARY KEY (kind, language, text))"
+        )
+        self.__connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Commits the pending entries and closes the persistent cache
+        """
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.commit()
+                self.__connection.close()
+                self.__connection = None
+
+    def flush(self):
+        """
+        Commits the pending entries into the persistent cache
+        """
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.commit()
+                self.__pending_writes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters
+        """
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "size": len(self.__cache),
+            }
+
+    def clear(self):
+        """
+        Removes the in memory entries and resets the counters
+        """
+        with self.__lock:
+            self.__cache.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def __remember(self, key: Tuple[str, str, str], tokens: Tuple[str, ...]):
+        """
+        Adds `key` to the in memory cache evicting the least recently used entries
+        """
+        self.__cache[key] = tokens
+        self.__cache.move_to_end(key)
+        while len(self.__cache) > self.max_size:
+            self.__cache.popitem(last=False)
+
+    def __lookup(self, key: Tuple[str, str, str]) -> Optional[Tuple[str, ...]]:
+        """
+        Returns the cached tokens for `key` or None. Must be called holding the lock.
+        """
+        tokens = self.__cache.get(key)
+        if tokens is not None:
+            self.__cache.move_to_end(key)
+            self.hits += 1
+            return tokens
+        if self.__connection is not None:
+            row = self.__connection.execute(
+                "SELECT tokens FROM tokens WHERE kind = ? AND language = ? AND text = ?", key
+            ).fetchone()
+            if row is not None:
+                tokens = tuple(json.loads(row[0]))
+                self.__remember(key, tokens)
+                self.disk_hits += 1
+                return tokens
+        self.misses += 1
+        return None
+
+    def __store(self, key: Tuple[str, str, str], tokens: Tuple[str, ...]):
+        """
+        Saves the tokens in memory and in the persistent cache. Must be called holding the lock.
+        """
+        self.__remember(key, tokens)
+        if self.__connection is not None:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?)", (*key, json.dumps(tokens))
+            )
+            self.__pending_writes += 1
+            if self.__pending_writes >= self.flush_every:
+                self.flush()
+
+    def tokenize(self, kind: str, text: str, language: str = "english") -> List[str]:
+        """
+        Tokenizes `text` with the tokenizer `kind` using the cache
+
+        kind: `word` or `sent`
+        text: Text to tokenize
+        language: Text's language
+
+        returns: A new list with the tokens
+        """
+        key = (kind, language, text)
+        with self.__lock:
+            tokens = self.__lookup(key)
+        if tokens is None:
+            # The tokenization runs outside the lock
+            tokens = tuple(self.__tokenizers[kind](text, language=language))
+            with self.__lock:
+                self.__store(key, tokens)
+        return list(tokens)
+
+    def word_tokenize(self, text: str, language: str = "english") -> List[str]:
+        """
+        Cached equivalent of `nltk.word_tokenize`
+        """
+        return self.tokenize("word", text, language)
+
+    def sent_tokenize(self, text: str, language: str = "english") -> List[str]:
+        """
+        Cached equivalent of `nltk.sent_tokenize`
+        """
+        return self.tokenize("sent", text, language)
+
+    def tokenize_batch(self, kind: str, texts: Iterable[str], language: str = "english") -> List[List[str]]:
+        """
+        Tokenizes all `texts`. Repeated texts are tokenized once.
+
+        kind: `word` or `sent`
+        texts: Texts to tokenize
+        language: Texts' language
+
+        returns: The tokens of each text in the same order
+        """
+        texts = list(texts)
+        results: Dict[str, List[str]] = {}
+        for text in texts:
+            if text not in results:
+                results[text] = self.tokenize(kind, text, language)
+        return [list(results[text]) for text in texts]
+
+    def word_tokenize_batch(self, texts: Iterable[str], language: str = "english") -> List[List[str]]:
+        """
+        Word tokenizes all `texts`, see `tokenize_batch`
+        """
+        return self.tokenize_batch("word", texts, language)
+
+    def sent_tokenize_batch(self, texts: Iterable[str], language: str = "english") -> List[List[str]]:
+        """
+        Sentence tokenizes all `texts`, see `tokenize_batch`
+        """
+        return self.tokenize_batch("sent", texts, language)
+
+__default_tokenizer = TokenizerService()
+
+def get_default_tokenizer() -> TokenizerService:
+    """
+    Returns the TokenizerService used by the module level functions
+    """
+    return __default_tokenizer
+
+def set_default_tokenizer(tokenizer: TokenizerService) -> TokenizerService:
+    """
+    Replaces the TokenizerService used by the module level functions, i.e. to
+    add a persistent cache file.
+
+    returns: The previous TokenizerService
+    """
+    global __default_tokenizer
+    previous = __default_tokenizer
+    __default_tokenizer = tokenizer
+    return previous
+
+def word_tokenize(text: str, language: str = "english") -> List[str]:
+    """
+    Cached equivalent of `nltk.word_tokenize` using the default TokenizerService
+    """
+    return __default_tokenizer.word_tokenize(text, language)
+
+def sent_tokenize(text: str, language: str = "english") -> List[str]:
+    """
+    Cached equivalent of `nltk.sent_tokenize` using the default TokenizerService
+    """
+    return __default_tokenizer.sent_tokenize(text, language)
+
+
+def sentence_spans(text: str, sentences: List[str]) -> List[Tuple[int, int]]:
+    """
+    Locates the `sentences` returned by a sentence tokenizer in `text`. They must
+    be substrings of `text` in order, as Punkt returns them.
+
+    returns: (start, end) character offsets of each sentence
+    """
+    spans = []
+    position = 0
+    for sentence in sentences:
+        start = text.find(sentence, position)
+        if start < 0:
+            raise ValueError(f"Sentence {sentence!r} not found in the text after position {position}")
+        position = start + len(sentence)
+        spans.append((start, position))
+    return spans
+
+def _tokenize_chunk(tokenizer: Tokenizer, texts: List[str], language: str) -> List[List[str]]:
+    """
+    Process pool worker of `sent_span_tokenize_batch`
+    """
+    return [tokenizer(text, language=language) for text in texts]
+
+def sent_span_tokenize_batch(texts: Iterable[str], language: str = "english", sent_tokenizer: Optional[Tokenizer] = None, workers: int = 1) -> List[List[Tuple[int, int]]]:
+    """
+    Splits all `texts` into sentences returning their character offsets. Repeated
+    texts are split once. The tokenizer is still called once per unique text, the
+    batch only saves the repeated texts and lets `workers` split them in parallel.
+
+    texts: Texts to split
+    language: Texts' language
+    sent_tokenizer: Function that receives a text and a language and returns its sentences.
+    Defaults to `sent_tokenize`
+    workers: With more than one, the texts are split in chunks by a process pool. The
+    tokenizer must be picklable
+
+    returns: The (start, end) offsets of the sentences of each text in the same order
+    """
+    texts = list(texts)
+    tokenizer = sent_tokenizer if sent_tokenizer else sent_tokenize
+    unique = list(dict.fromkeys(texts))
+
+    if workers > 1 and len(unique) > workers:
+        size = -(-len(unique) // workers)
+        chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+        sentences = [result for chunk in DynamicExecutor(max_workers=workers, backend="process").map(
+            partial(_tokenize_chunk, tokenizer, language=language), chunks) for result in chunk]
+    else:
+        sentences = [tokenizer(text, language=language) for text in unique]
+
+    spans = {text: sentence_spans(text, text_sentences) for text, text_sentences in zip(unique, sentences)}
+    return [spans[text] for text in texts]